@@ -0,0 +1,541 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from . import main as state
+from .core import columnar
+from .core.amounts import SUMMARY_CENTS_LIMIT, cents_to_float, split_cents, summary_cents
+from .core.records import Transaction, read_transactions, read_transactions_yaml
+
+# transaction types counted by the rent tracker
+RENT_TRACKER_TYPES = ('rent', 'tenantfees')
+# Per-account partial aggregates, under the processed dir
+AGGREGATE_STATE_DIR = '.aggregate'
+
+# Data version per bank account, bumped whenever its classification output is rewritten;
+# the '' entry covers inputs shared by every account (groups)
+_DATA_VERSIONS: Dict[str, int] = {}
+_DATA_VERSIONS_LOCK = threading.Lock()
+
+
+def mark_processed_changed(bank: Optional[str] = None) -> None:
+    """Record that bank's processed output (or, with no bank, something all accounts depend on) changed."""
+    key = (bank or '').strip().lower()
+    with _DATA_VERSIONS_LOCK:
+        _DATA_VERSIONS[key] = _DATA_VERSIONS.get(key, 0) + 1
+
+
+def data_version(accounts: Iterable[str]) -> Tuple[int, ...]:
+    """Versions of the given accounts' processed output, plus the shared inputs' version."""
+    versions = _DATA_VERSIONS
+    return tuple(versions.get(ba, 0) for ba in accounts) + (versions.get('', 0),)
+
+
+def processed_stamps(base_processed: Path, accounts: Iterable[str]) -> Tuple[Optional[List[int]], ...]:
+    """Size and mtime of each account's processed file; catches writes that were not marked."""
+    return tuple(_file_stamp(_source_path(base_processed, ba)) for ba in accounts)
+
+
+@dataclass
+class SummaryAggregates:
+    """Everything the summaries need from the processed rows, built in one scan.
+
+    Amounts are integer cents; callers convert to dollars when they write or serve them.
+    """
+    # property -> transaction_type -> cents (rental rows only)
+    rental: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    # property -> transaction_type -> [{bankaccountname, description, credit}]
+    reverse: Dict[str, Dict[str, List[Dict[str, Any]]]] = field(default_factory=dict)
+    # company -> transaction_type -> cents
+    company: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    # property -> month (1-12) -> cents of rent and tenant fees
+    rent_months: Dict[str, Dict[int, int]] = field(default_factory=dict)
+
+
+def _share_offset(row: Transaction) -> int:
+    """Stable per-transaction offset used to rotate leftover cents of a group split."""
+    try:
+        return int(str(row.tr_id or '0'), 16)
+    except ValueError:
+        return 0
+
+
+def _read_account_rows(base_processed: Path, ba: str) -> List[Transaction]:
+    """Processed rows of one bank account (legacy YAML first, then CSV)."""
+    py = base_processed / f"{ba}.yaml"
+    try:
+        if py.exists():
+            return read_transactions_yaml(py)
+        pc = base_processed / f"{ba}.csv"
+        return read_transactions(pc) if pc.exists() else []
+    except Exception:
+        state.logger.exception(f"Failed reading processed rows for {ba}")
+        return []
+
+
+def _rent_month(dt_raw: str) -> int:
+    """Rent tracker month of a date: rents on or after the 24th count toward the next month; 0 if unparseable."""
+    try:
+        d = datetime.fromisoformat(dt_raw[:10])
+    except Exception:
+        try:
+            d = datetime.strptime(dt_raw[:10], "%Y-%m-%d")
+        except Exception:
+            return 0
+    month_idx = d.month
+    if d.day >= 24:
+        # Move to next month; wrap December to January
+        month_idx = 1 if month_idx == 12 else (month_idx + 1)
+    return month_idx
+
+
+def add_rows(agg: SummaryAggregates, ba: str, rows: List[Transaction]) -> None:
+    """Fold one bank account's processed rows into agg."""
+    if state.SUMMARY_COLUMNAR and columnar.available():
+        part = SummaryAggregates()
+        try:
+            done = _add_rows_columnar(part, ba, rows)
+        except Exception:
+            state.logger.exception(f"Columnar summary failed for {ba}; aggregating row by row")
+            done = False
+        if done:
+            _add_totals(agg.rental, part.rental)
+            _add_totals(agg.company, part.company)
+            _add_totals(agg.rent_months, part.rent_months)
+            for p, by_type in part.reverse.items():
+                for tx_type, items in by_type.items():
+                    agg.reverse.setdefault(p, {}).setdefault(tx_type, []).extend(items)
+            return
+    groups = state.GROUP_DB or {}
+    for r in rows:
+        try:
+            tx_type = (r.transaction_type or '').strip().lower()
+            if not tx_type:
+                continue
+            comp = (r.company or '').strip().lower()
+            rental = (r.tax_category or '').strip().lower() == 'rental'
+            if not comp and not rental:
+                continue
+            credit = summary_cents(r.cents)
+            if comp:
+                totals = agg.company.setdefault(comp, {})
+                totals[tx_type] = totals.get(tx_type, 0) + credit
+            if not rental:
+                continue
+
+            props: List[str] = []
+            prop = (r.property or '').strip().lower()
+            grp = (r.group or '').strip().lower()
+            if prop:
+                props = [prop]
+            elif grp:
+                try:
+                    grp_rec = groups.get(grp) or {}
+                    props = [(p or '').strip().lower() for p in (grp_rec.get('propertylist') or []) if (p or '').strip()]
+                except Exception:
+                    props = []
+            if not props:
+                continue
+            # A group row is split equally across its properties to the cent, so the
+            # shares always add back up to the credit: 100.00 over three properties is
+            # 33.34/33.33/33.33, with the extra cent going to a property picked by tr_id.
+            # (Per-property totals can differ by a cent from the old float split, which
+            # rounded each total on output and could lose or gain a cent overall.)
+            # A single property gets it all
+            if prop and len(props) == 1:
+                shares = [credit]
+            else:
+                shares = split_cents(credit, len(props), _share_offset(r))
+
+            month_idx = 0
+            if tx_type in RENT_TRACKER_TYPES and credit != 0:
+                dt_raw = (r.date or '').strip()
+                month_idx = _rent_month(dt_raw) if dt_raw else 0
+            desc = (r.description or '').strip()
+            for p, share in zip(props, shares):
+                if not p:
+                    continue
+                totals = agg.rental.setdefault(p, {})
+                totals[tx_type] = totals.get(tx_type, 0) + share
+                agg.reverse.setdefault(p, {}).setdefault(tx_type, []).append({
+                    'bankaccountname': ba,
+                    'description': desc,
+                    'credit': cents_to_float(share),
+                })
+                if month_idx:
+                    months = agg.rent_months.setdefault(p, {})
+                    months[month_idx] = months.get(month_idx, 0) + share
+        except Exception:
+            state.logger.exception("Error while aggregating summary row")
+            continue
+
+
+def _group_properties() -> Dict[str, List[str]]:
+    """Normalized property list of each group, as the row-by-row path expands them."""
+    out: Dict[str, List[str]] = {}
+    for name, grp_rec in (state.GROUP_DB or {}).items():
+        try:
+            out[name] = [(p or '').strip().lower() for p in ((grp_rec or {}).get('propertylist') or []) if (p or '').strip()]
+        except Exception:
+            out[name] = []
+    return out
+
+
+def _add_rows_columnar(agg: SummaryAggregates, ba: str, rows: List[Transaction]) -> bool:
+    """add_rows over a columnar store: same results, with the sums done as NumPy group-bys.
+
+    Returns False, leaving agg untouched, when the account's credits could overflow
+    the int64 sums; those accounts are aggregated row by row.
+    """
+    np = columnar.np
+    cols = columnar.TransactionColumns(rows)
+    # every sum is bounded by the total magnitude of the credits (margin for float rounding)
+    if float(np.abs(cols.cents).sum(dtype=np.float64)) >= SUMMARY_CENTS_LIMIT / 2:
+        state.logger.info(f"Credits of {ba} exceed the columnar sums' range; aggregating row by row")
+        return False
+    tx = cols.codes['transaction_type']
+    tx_names = cols.vocab['transaction_type']
+    ntx = len(tx_names)
+    valid = tx != 0
+
+    # company x transaction_type
+    comp = cols.codes['company']
+    sel = np.nonzero(valid & (comp != 0))[0]
+    if len(sel):
+        _fold_grouped(agg.company, cols.vocab['company'], tx_names, comp[sel], tx[sel], cols.cents[sel])
+
+    rental_code = cols.code('tax_category', 'rental')
+    if rental_code < 0:
+        return True
+    rental = valid & (cols.codes['tax_category'] == rental_code)
+    prop = cols.codes['property']
+    grp = cols.codes['group']
+
+    # (row, position in the row's property list, property, share) for every rental share
+    prop_names: List[str] = list(cols.vocab['property'])
+    prop_index = {name: i for i, name in enumerate(prop_names)}
+    row_parts, pos_parts, prop_parts, share_parts = [], [], [], []
+    direct = np.nonzero(rental & (prop != 0))[0]
+    row_parts.append(direct)
+    pos_parts.append(np.zeros(len(direct), dtype=np.int64))
+    prop_parts.append(prop[direct].astype(np.int64))
+    share_parts.append(cols.cents[direct])
+    grouped = rental & (prop == 0) & (grp != 0)
+    if grouped.any():
+        group_props = _group_properties()
+        for gcode in np.unique(grp[grouped]).tolist():
+            plist = group_props.get(cols.vocab['group'][gcode]) or []
+            if not plist:
+                continue
+            idx = np.nonzero(grouped & (grp == gcode))[0]
+            shares = columnar.split_shares(cols.cents[idx], len(plist), cols.share_offsets(idx, len(plist)))
+            for i, (name, share) in enumerate(zip(plist, shares)):
+                code = prop_index.setdefault(name, len(prop_names))
+                if code == len(prop_names):
+                    prop_names.append(name)
+                row_parts.append(idx)
+                pos_parts.append(np.full(len(idx), i, dtype=np.int64))
+                prop_parts.append(np.full(len(idx), code, dtype=np.int64))
+                share_parts.append(share)
+    rows_at = np.concatenate(row_parts)
+    if not len(rows_at):
+        return True
+    # row order, then list order, as the row-by-row path appends them
+    order = np.lexsort((np.concatenate(pos_parts), rows_at))
+    rows_at = rows_at[order]
+    props_at = np.concatenate(prop_parts)[order]
+    shares_at = np.concatenate(share_parts)[order]
+    tx_at = tx[rows_at]
+
+    # property x transaction_type
+    _fold_grouped(agg.rental, prop_names, tx_names, props_at, tx_at, shares_at)
+
+    # property x month of rent and tenant fees
+    rent_codes = [c for c in (cols.code('transaction_type', t) for t in RENT_TRACKER_TYPES) if c >= 0]
+    if rent_codes:
+        month_of_date = np.array([_rent_month(d) if d else 0 for d in cols.dates], dtype=np.int64)
+        months_at = month_of_date[cols.date[rows_at]]
+        sel = np.nonzero(np.isin(tx_at, rent_codes) & (cols.cents[rows_at] != 0) & (months_at != 0))[0]
+        if len(sel):
+            _fold_grouped(agg.rent_months, prop_names, list(range(13)), props_at[sel], months_at[sel], shares_at[sel])
+
+    # reverse map, one entry per share; a stable sort by (property, type) keeps row order in each list
+    keys = props_at * ntx + tx_at
+    by_key = np.argsort(keys, kind='stable')
+    keys = keys[by_key]
+    bounds = [0] + (np.flatnonzero(np.diff(keys)) + 1).tolist() + [len(keys)]
+    rows_l = rows_at[by_key].tolist()
+    # cents / 100 is exactly cents_to_float(cents)
+    credits_l = (shares_at[by_key] / 100).tolist()
+    desc = cols.description
+    for start, end in zip(bounds, bounds[1:]):
+        p, t = divmod(int(keys[start]), ntx)
+        agg.reverse.setdefault(prop_names[p], {})[tx_names[t]] = [
+            {'bankaccountname': ba, 'description': (desc[r] or '').strip(), 'credit': c}
+            for r, c in zip(rows_l[start:end], credits_l[start:end])
+        ]
+    return True
+
+
+def _fold_grouped(
+    out: Dict[Any, Dict[Any, int]], outer_names: List[Any], inner_names: List[Any],
+    outer: Any, inner: Any, cents: Any,
+) -> None:
+    """out[outer][inner] += sum of cents per (outer, inner) code pair."""
+    np = columnar.np
+    width = len(inner_names)
+    keys = outer.astype(np.int64) * width + inner
+    size = len(outer_names) * width
+    sums = columnar.group_sum(keys, cents, size)
+    # pairs with rows appear even when their total is 0, as in the row-by-row path
+    present = np.nonzero(np.bincount(keys, minlength=size))[0]
+    for k, total in zip(present.tolist(), sums[present].tolist()):
+        o, i = divmod(k, width)
+        row = out.setdefault(outer_names[o], {})
+        row[inner_names[i]] = row.get(inner_names[i], 0) + total
+
+
+@dataclass
+class _AccountPartial:
+    """One account's contribution to the summaries and the processed file it came from."""
+    source: str
+    stamp: Optional[List[int]]
+    digest: str
+    groups: str
+    agg: SummaryAggregates
+
+
+class PartialAggregates:
+    """Summary totals kept as the sum of per-account partial aggregates.
+
+    refresh() re-reads only accounts whose processed file changed (by size/mtime,
+    then content digest): their old partial is subtracted from the totals and the
+    new one added. Partials are also saved next to the processed files so a restart
+    does not re-read accounts whose processed output is unchanged.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._base: Optional[Path] = None
+        self._groups = ''
+        self._order: List[str] = []
+        self._partials: Dict[str, _AccountPartial] = {}
+        self._total = SummaryAggregates()
+        self._reads = 0
+
+    def refresh(self, base_processed: Path, accounts: List[str]) -> SummaryAggregates:
+        """Bring the totals up to date with the accounts' processed files; returns a snapshot."""
+        with self._lock:
+            groups = _groups_signature()
+            if base_processed != self._base or groups != self._groups:
+                self._reset(base_processed, groups)
+            touched: Set[str] = set()
+            self._reads = 0
+            for ba in [b for b in self._partials if b not in accounts]:
+                touched |= self._replace(ba, None)
+            for ba in accounts:
+                touched |= self._refresh_account(base_processed, ba)
+            if accounts != self._order:
+                self._order = list(accounts)
+                touched = set(self._total.reverse)
+                for part in self._partials.values():
+                    touched |= set(part.agg.reverse)
+            for p in touched:
+                self._rebuild_reverse(p)
+            if self._reads:
+                state.logger.info(f"Summary aggregates: re-read {self._reads} of {len(accounts)} accounts")
+            return self._snapshot()
+
+    def _reset(self, base: Optional[Path], groups: str) -> None:
+        self._base = base
+        self._groups = groups
+        self._order = []
+        self._partials = {}
+        self._total = SummaryAggregates()
+
+    def _refresh_account(self, base_processed: Path, ba: str) -> Set[str]:
+        src = _source_path(base_processed, ba)
+        name = src.name if src is not None else ''
+        stamp = _file_stamp(src)
+        old = self._partials.get(ba)
+        if old is not None and old.source == name and old.stamp == stamp:
+            return set()
+        digest = _file_digest(src)
+        if old is not None and old.source == name and old.digest == digest:
+            old.stamp = stamp
+            _save_partial(base_processed, ba, old)
+            return set()
+        new = _load_partial(base_processed, ba)
+        if new is None or new.source != name or new.digest != digest or new.groups != self._groups:
+            agg = SummaryAggregates()
+            if src is not None:
+                add_rows(agg, ba, _read_account_rows(base_processed, ba))
+                self._reads += 1
+            new = _AccountPartial(source=name, stamp=stamp, digest=digest, groups=self._groups, agg=agg)
+        new.stamp = stamp
+        _save_partial(base_processed, ba, new)
+        return self._replace(ba, new)
+
+    def _replace(self, ba: str, new: Optional[_AccountPartial]) -> Set[str]:
+        """Swap an account's partial in the totals; returns the properties whose reverse map changed."""
+        touched: Set[str] = set()
+        old = self._partials.pop(ba, None)
+        if old is not None:
+            touched |= set(old.agg.reverse)
+            self._subtract(old.agg)
+        if new is not None:
+            touched |= set(new.agg.reverse)
+            _add_totals(self._total.rental, new.agg.rental)
+            _add_totals(self._total.company, new.agg.company)
+            _add_totals(self._total.rent_months, new.agg.rent_months)
+            self._partials[ba] = new
+        return touched
+
+    def _subtract(self, agg: SummaryAggregates) -> None:
+        for attr in ('rental', 'company', 'rent_months'):
+            total = getattr(self._total, attr)
+            for key, values in getattr(agg, attr).items():
+                row = total.get(key)
+                if row is None:
+                    continue
+                for k, v in values.items():
+                    row[k] = row.get(k, 0) - v
+                    # a key no remaining account contributes to disappears, as in a fresh scan
+                    if row[k] == 0 and not any(k in getattr(p.agg, attr).get(key, ()) for p in self._partials.values()):
+                        del row[k]
+                if not row:
+                    del total[key]
+
+    def _rebuild_reverse(self, prop: str) -> None:
+        """Concatenate the property's reverse map entries in account order."""
+        merged: Dict[str, List[Dict[str, Any]]] = {}
+        for ba in self._order:
+            part = self._partials.get(ba)
+            for tx_type, items in ((part.agg.reverse.get(prop) or {}) if part else {}).items():
+                merged.setdefault(tx_type, []).extend(items)
+        if merged:
+            self._total.reverse[prop] = merged
+        else:
+            self._total.reverse.pop(prop, None)
+
+    def _snapshot(self) -> SummaryAggregates:
+        # Reverse maps are replaced, never modified, when they change, so they are shared
+        return SummaryAggregates(
+            rental={p: dict(v) for p, v in self._total.rental.items()},
+            reverse=dict(self._total.reverse),
+            company={c: dict(v) for c, v in self._total.company.items()},
+            rent_months={p: dict(v) for p, v in self._total.rent_months.items()},
+        )
+
+
+def _add_totals(total: Dict[Any, Dict[Any, int]], part: Dict[Any, Dict[Any, int]]) -> None:
+    for key, values in part.items():
+        row = total.setdefault(key, {})
+        for k, v in values.items():
+            row[k] = row.get(k, 0) + v
+
+
+def _source_path(base_processed: Path, ba: str) -> Optional[Path]:
+    py = base_processed / f"{ba}.yaml"
+    if py.exists():
+        return py
+    pc = base_processed / f"{ba}.csv"
+    return pc if pc.exists() else None
+
+
+def _file_stamp(path: Optional[Path]) -> Optional[List[int]]:
+    if not path:
+        return None
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [int(st.st_size), int(st.st_mtime_ns)]
+
+
+def _file_digest(path: Optional[Path]) -> str:
+    if not path:
+        return ''
+    h = hashlib.sha1()
+    try:
+        with path.open('rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+    except OSError:
+        return ''
+    return h.hexdigest()
+
+
+def _groups_signature() -> str:
+    """Group expansion decides how rows split across properties; partials are only valid for one GROUP_DB."""
+    try:
+        text = json.dumps(state.GROUP_DB or {}, sort_keys=True, default=str)
+    except Exception:
+        text = repr(state.GROUP_DB)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _partial_path(base_processed: Path, ba: str) -> Path:
+    return base_processed / AGGREGATE_STATE_DIR / f"{ba}.json"
+
+
+def _save_partial(base_processed: Path, ba: str, part: _AccountPartial) -> None:
+    path = _partial_path(base_processed, ba)
+    data = {
+        'source': part.source,
+        'stamp': part.stamp,
+        'digest': part.digest,
+        'groups': part.groups,
+        'rental': part.agg.rental,
+        'company': part.agg.company,
+        # JSON object keys are strings; months are turned back into ints on load
+        'rent_months': part.agg.rent_months,
+        'reverse': part.agg.reverse,
+    }
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + '.tmp')
+        with tmp.open('w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp, path)
+    except Exception:
+        state.logger.exception(f"Failed saving summary partial for {ba}")
+
+
+def _load_partial(base_processed: Path, ba: str) -> Optional[_AccountPartial]:
+    path = _partial_path(base_processed, ba)
+    try:
+        with path.open('r', encoding='utf-8') as f:
+            data = json.load(f)
+        agg = SummaryAggregates(
+            rental=data['rental'],
+            reverse=data['reverse'],
+            company=data['company'],
+            rent_months={p: {int(m): c for m, c in months.items()} for p, months in data['rent_months'].items()},
+        )
+        return _AccountPartial(
+            source=data['source'], stamp=data.get('stamp'), digest=data['digest'], groups=data['groups'], agg=agg,
+        )
+    except Exception:
+        return None
+
+
+PARTIALS = PartialAggregates()
+
+
+def aggregate_processed() -> Optional[SummaryAggregates]:
+    """Summary aggregates over every bank account; None when paths are not configured.
+
+    Only accounts whose processed output changed since the last call are re-read.
+    """
+    if not state.ACCOUNTS_DIR_PATH or not state.CURRENT_YEAR:
+        return None
+    base_processed: Path = state.PROCESSED_DIR_PATH
+    if not base_processed:
+        return None
+    return PARTIALS.refresh(base_processed, list(state.BA_DB.keys()))
@@ -1,9 +1,28 @@
 from __future__ import annotations
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
 from pathlib import Path
+import codecs
 import csv
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import hashlib
+import json
+import os
+
+import yaml
+
+from .core.amounts import canonical_amount
+from .core.fileio import temp_path
+from .core.textmatch import AhoCorasick, PrefixTrie
+
+# Bump when the normalized output format changes so existing manifests are invalidated
+NORMALIZER_VERSION = 2
+MANIFEST_NAME = 'manifest.yaml'
+# Below this many ignore patterns a C-level str scan beats walking an automaton in Python
+AUTOMATON_MIN_PATTERNS = 32
+# Bytes read per step while streaming an uploaded statement
+UPLOAD_CHUNK_SIZE = 1 << 20
 
 
 def _py_strptime(fmt: str) -> str:
@@ -14,22 +33,127 @@ def _py_strptime(fmt: str) -> str:
     return m
 
 
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+_FALLBACK_DATE_FMTS = ('%m/%d/%Y', '%Y-%m-%d')
+
+
+def _iso_or_none(y: int, m: int, d: int) -> Optional[str]:
+    if y < 1000 or not (1 <= m <= 12) or d < 1:
+        return None
+    dim = _DAYS_IN_MONTH[m]
+    if m == 2 and (y % 4 == 0 and (y % 100 != 0 or y % 400 == 0)):
+        dim = 29
+    if d > dim:
+        return None
+    return f"{y:04d}-{m:02d}-{d:02d}"
+
+
+def _ascii_digits(p: str, lo: int, hi: int) -> bool:
+    return lo <= len(p) <= hi and p.isascii() and p.isdigit()
+
+
+def _fast_mdy(ss: str) -> Optional[str]:
+    """Hand-rolled M/d/yyyy (and MM/dd/yyyy) parser; None means "let strptime decide"."""
+    parts = ss.split('/')
+    if len(parts) != 3:
+        return None
+    m, d, y = parts
+    if not (_ascii_digits(m, 1, 2) and _ascii_digits(d, 1, 2) and _ascii_digits(y, 4, 4)):
+        return None
+    return _iso_or_none(int(y), int(m), int(d))
+
+
+def _fast_iso(ss: str) -> Optional[str]:
+    """Hand-rolled yyyy-MM-dd parser; None means "let strptime decide"."""
+    parts = ss.split('-')
+    if len(parts) != 3:
+        return None
+    y, m, d = parts
+    if not (_ascii_digits(y, 4, 4) and _ascii_digits(m, 1, 2) and _ascii_digits(d, 1, 2)):
+        return None
+    return _iso_or_none(int(y), int(m), int(d))
+
+
+def _strptime_format_is_usable(py_fmt: str) -> bool:
+    """False for formats strptime rejects outright (e.g. the '%-m' that 'M/d/yyyy' maps to)."""
+    try:
+        datetime.strptime('', py_fmt)
+    except ValueError as e:
+        return str(e).startswith('time data')
+    except Exception:
+        return False
+    return True
+
+
+class DateNormalizer:
+    """Date normalization for one bank date_format, compiled once and memoized.
+
+    Resolution order matches the original per-row strptime loop: the bank's own
+    format (only when strptime can actually use it), then M/d/yyyy and ISO.
+    The two common layouts are parsed by hand; strptime is only the fallback.
+    Results are memoized in a bounded LRU since statements repeat a few hundred
+    distinct dates thousands of times.
+    """
+
+    FAST_MDY = 'M/d/yyyy'
+    FAST_ISO = 'yyyy-MM-dd'
+
+    def __init__(self, raw_fmt: str = '', memo_size: int = 4096) -> None:
+        self.raw_fmt = (raw_fmt or '').strip()
+        py_fmt = _py_strptime(self.raw_fmt) if self.raw_fmt else ''
+        # The fast paths reproduce '%m/%d/%Y' and '%Y-%m-%d' exactly, so only a
+        # different, usable bank format has to be tried before them.
+        if py_fmt and py_fmt not in _FALLBACK_DATE_FMTS and _strptime_format_is_usable(py_fmt):
+            self.custom_fmt = py_fmt
+        else:
+            self.custom_fmt = ''
+        self._resolve = lru_cache(maxsize=memo_size)(self._resolve_uncached)
+
+    def _resolve_uncached(self, s: str) -> Tuple[str, str]:
+        ss = s.strip()
+        if not ss:
+            return '', ''
+        if self.custom_fmt:
+            try:
+                return datetime.strptime(ss, self.custom_fmt).strftime('%Y-%m-%d'), self.custom_fmt
+            except Exception:
+                pass
+        out = _fast_mdy(ss)
+        if out is not None:
+            return out, self.FAST_MDY
+        out = _fast_iso(ss)
+        if out is not None:
+            return out, self.FAST_ISO
+        for f in _FALLBACK_DATE_FMTS:
+            try:
+                return datetime.strptime(ss, f).strftime('%Y-%m-%d'), f
+            except Exception:
+                continue
+        return ss, ''
+
+    def normalize_with_format(self, s: str) -> Tuple[str, str]:
+        """Return (normalized date, format that matched). The format is '' when nothing matched and the input is returned stripped."""
+        if not s:
+            return '', ''
+        return self._resolve(s)
+
+    def normalize(self, s: str) -> str:
+        if not s:
+            return ''
+        return self._resolve(s)[0]
+
+    def cache_info(self):
+        return self._resolve.cache_info()
+
+
+_DATE_NORMALIZERS: Dict[str, DateNormalizer] = {}
+
+
 def _normalize_date(s: str, raw_fmt: str) -> str:
-    if not s:
-        return ''
-    ss = s.strip()
-    if not ss:
-        return ''
-    py_fmt = _py_strptime(raw_fmt) if raw_fmt else ''
-    fmts = [py_fmt] if py_fmt else []
-    fmts += ['%m/%d/%Y', '%-m/%-d/%Y', '%Y-%m-%d']
-    for f in fmts:
-        try:
-            dt = datetime.strptime(ss, f)
-            return dt.strftime('%Y-%m-%d')
-        except Exception:
-            continue
-    return ss
+    dn = _DATE_NORMALIZERS.get(raw_fmt)
+    if dn is None:
+        dn = _DATE_NORMALIZERS[raw_fmt] = DateNormalizer(raw_fmt)
+    return dn.normalize(s)
 
 
 def _parse_amount(s: str) -> str:
@@ -38,6 +162,10 @@ def _parse_amount(s: str) -> str:
     txt = str(s).strip()
     if not txt:
         return ''
+    out = canonical_amount(txt)
+    if out is not None:
+        return out
+    # Exponents, underscores or more than two decimals keep the historical float rendering
     neg = False
     if txt.startswith('(') and txt.endswith(')'):
         neg = True
@@ -65,152 +193,376 @@ def _parse_amount_num(s: str) -> Optional[float]:
         return None
 
 
-def _process_bank_statement_for_account(bankaccountname: str, cfg: Dict[str, Any], src_path: Path, normalized_dir: Path, logger) -> None:
+class IgnoreLineMatcher:
+    """Compiled form of a bank's ignore_lines_startswith / ignore_lines_contains lists.
+
+    Large pattern sets are matched with a prefix trie and an Aho-Corasick
+    automaton so the cost per line depends on the line length, not on the
+    number of patterns. Small sets (the common case) use str.startswith with a
+    tuple and plain substring checks, which run in C and are faster there.
+    """
+
+    __slots__ = ('starts', 'contains', '_trie', '_automaton')
+
+    def __init__(self, starts: Iterable[Any], contains: Iterable[Any]) -> None:
+        # Non-string or empty entries never matched in the original per-line loop
+        self.starts: Tuple[str, ...] = tuple(s for s in (starts or []) if isinstance(s, str) and s)
+        self.contains: Tuple[str, ...] = tuple(c for c in (contains or []) if isinstance(c, str) and c)
+        self._trie: Optional[PrefixTrie] = None
+        self._automaton: Optional[AhoCorasick] = None
+        if len(self.starts) >= AUTOMATON_MIN_PATTERNS:
+            self._trie = PrefixTrie((s, s) for s in self.starts)
+        if len(self.contains) >= AUTOMATON_MIN_PATTERNS:
+            self._automaton = AhoCorasick((c, c) for c in self.contains)
+
+    def ignores(self, line: str) -> bool:
+        if self._trie is not None:
+            if self._trie.matches(line):
+                return True
+        elif self.starts and line.startswith(self.starts):
+            return True
+        if self._automaton is not None:
+            return self._automaton.matches(line)
+        for c in self.contains:
+            if c in line:
+                return True
+        return False
+
+
+class CompiledBankConfig:
+    """A banks.yaml entry prepared once for parsing: delimiter, column indexes and ignore-line matcher."""
+
+    def __init__(self, cfg: Dict[str, Any]) -> None:
+        self.name: str = str(cfg.get('name') or '')
+        self.delim: str = (cfg.get('delim') or ',')
+        colmap: Dict[str, int] = {}
+        for entry in (cfg.get('columns') or []):
+            if isinstance(entry, dict) and entry:
+                colmap = entry
+                break
+        self.colmap: Dict[str, int] = colmap
+        self.date_idx = int(colmap.get('date') or 0)
+        self.desc_idx = int(colmap.get('description') or 0)
+        self.debit_idx = int(colmap.get('debit') or 0)
+        self.credit_idx = int(colmap.get('credit') or 0)
+        self.raw_fmt: str = (cfg.get('date_format') or '').strip()
+        self.dates = DateNormalizer(self.raw_fmt)
+        self.ignore = IgnoreLineMatcher(cfg.get('ignore_lines_startswith') or [], cfg.get('ignore_lines_contains') or [])
+
+    def iter_kept_lines(self, lines: Iterable[str]) -> Iterator[str]:
+        """Yield non-blank lines (trailing newline removed) that no ignore rule matches."""
+        ignores = self.ignore.ignores
+        for raw_line in lines:
+            line = raw_line.rstrip('\n')
+            if not line.strip():
+                continue
+            if ignores(line):
+                continue
+            yield line
+
+
+_COMPILED_CFG_CACHE: Dict[str, CompiledBankConfig] = {}
+
+
+def compile_bank_config(cfg: Dict[str, Any]) -> CompiledBankConfig:
+    """Return the compiled form of a bank config, reusing it while the config is unchanged."""
+    key = _config_digest(cfg)
+    compiled = _COMPILED_CFG_CACHE.get(key)
+    if compiled is None:
+        if len(_COMPILED_CFG_CACHE) >= 64:
+            _COMPILED_CFG_CACHE.clear()
+        compiled = CompiledBankConfig(cfg)
+        _COMPILED_CFG_CACHE[key] = compiled
+    return compiled
+
+
+class _SourceReadError(Exception):
+    """Raised by the pipeline when the raw statement itself cannot be read or parsed."""
+
+
+class StatementValidationError(ValueError):
+    """Raised while ingesting an uploaded statement that does not fit the bank config or CURRENT_YEAR."""
+
+
+def _iter_split(lines: Iterable[str], delim: str) -> Iterator[List[str]]:
+    for parts in csv.reader(lines, delimiter=delim):
+        if not parts:
+            continue
+        yield [p.strip() for p in parts]
+
+
+def _iter_extract(rows: Iterable[List[str]], colmap: Dict[str, int]) -> Iterator[Tuple[str, str, str, str, str, str]]:
+    """Yield (date, description, debit, credit, checkno, memo) using 1-based column indexes."""
+    idxs = [int(colmap.get(k) or 0) for k in ('date', 'description', 'debit', 'credit', 'checkno', 'memo')]
+    for parts in rows:
+        n = len(parts)
+        yield tuple((parts[i-1].strip() if i > 0 and n >= i else '') for i in idxs)
+
+
+def _iter_normalize(
+    fields: Iterable[Tuple[str, str, str, str, str, str]],
+    dates: DateNormalizer,
+    expect_year: str = '',
+) -> Iterator[Tuple[str, str, str]]:
+    """Yield (date, description, amount) with ISO dates, plain amounts and lowercased descriptions.
+
+    With expect_year set, every row's date must fall in that year or
+    StatementValidationError is raised.
+    """
+    normalize_date = dates.normalize
+    row_idx = 0
+    for date_val, desc_val, debit_val, credit_val, check_val, memo_val in fields:
+        row_idx += 1
+        date_out = normalize_date(date_val)
+        if expect_year and date_out[:4] != expect_year:
+            raise StatementValidationError(f"Row {row_idx}: date not in CURRENT_YEAR {expect_year}: '{date_val}' -> '{date_out}'")
+        # Normalize amount by removing currency symbols and commas; preserve inherent sign in text
+        amt_out = ''
+        chosen = debit_val or credit_val
+        if chosen:
+            amt_out = _parse_amount(chosen)
+        if not (date_out and desc_val):
+            continue
+        desc_out = desc_val
+        if check_val:
+            desc_out = f"{desc_out} (check {check_val})"
+        if memo_val:
+            desc_out = f"{desc_out} (memo {memo_val})"
+        # Collapse multiple spaces/tabs to a single space and lowercase
+        desc_out = ' '.join(desc_out.split()).lower()
+        yield date_out, desc_out, amt_out
+
+
+def _iter_dedupe(rows: Iterable[Tuple[str, str, str]]) -> Iterator[Tuple[str, str, str]]:
+    """Make duplicates unique by appending a marker to the description starting with the 2nd occurrence.
+
+    Occurrences are counted per (date, description, amount) under a short digest
+    so the bookkeeping stays small even for very large statements.
+    """
+    dup_counts: Dict[bytes, int] = {}
+    for date_out, desc_out, amt_out in rows:
+        dup_key = hashlib.blake2b(f"{date_out}\x1f{desc_out}\x1f{amt_out}".encode(), digest_size=12).digest()
+        cur = dup_counts.get(dup_key, 0) + 1
+        dup_counts[dup_key] = cur
+        if cur > 1:
+            desc_out = f"{desc_out} makeunique-{cur}"
+        yield date_out, desc_out, amt_out
+
+
+def _iter_with_tr_id(rows: Iterable[Tuple[str, str, str]], bankaccountname: str) -> Iterator[List[str]]:
+    """Yield normalized CSV rows: tr_id, date, description, credit."""
+    for date_out, desc_out, amt_out in rows:
+        s = (bankaccountname + date_out + desc_out + amt_out).lower()
+        s = ''.join(s.split())
+        tr_id = hashlib.sha256(s.encode()).hexdigest()[:10]
+        yield [tr_id, date_out, desc_out, amt_out]
+
+
+def _guard_source(rows: Iterable[List[str]]) -> Iterator[List[str]]:
+    try:
+        yield from rows
+    except Exception as e:
+        raise _SourceReadError(e) from e
+
+
+def _write_normalized_rows(rows: Iterable[List[str]], path: Path) -> int:
+    """Stream rows (with the normalized header) into path. Returns the row count."""
+    count = 0
+    with path.open('w', newline='', encoding='utf-8') as wf:
+        writer = csv.writer(wf)
+        writer.writerow(['tr_id', 'date', 'description', 'credit'])
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def _write_normalized(rows: Iterable[List[str]], out_path: Path) -> int:
+    """Stream rows into a temp file and swap it in atomically. Returns the row count (0 leaves out_path untouched)."""
+    tmp_path = temp_path(out_path)
+    try:
+        count = _write_normalized_rows(rows, tmp_path)
+        if count:
+            os.replace(tmp_path, out_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return count
+
+
+def _process_bank_statement_for_account(bankaccountname: str, cfg: Dict[str, Any], src_path: Path, normalized_dir: Path, logger) -> Optional[int]:
+    """Normalize one raw statement. Returns the number of rows written, or None if nothing was processed.
+
+    The statement is streamed through generator stages
+    (line filter -> csv split -> field extract -> normalize -> dedupe -> tr_id -> writer),
+    so memory does not grow with the size of the statement.
+    """
     if not normalized_dir:
-        return
+        return None
     if not src_path.exists() or not src_path.is_file():
-        return
-    delim = (cfg.get('delim') or ',')
-    starts = cfg.get('ignore_lines_startswith') or []
-    contains = cfg.get('ignore_lines_contains') or []
-    columns_list = cfg.get('columns') or []
-    colmap: Dict[str, int] = {}
-    for entry in columns_list:
-        if isinstance(entry, dict) and entry:
-            colmap = entry
-            break
-    date_idx = int(colmap.get('date') or 0)
-    desc_idx = int(colmap.get('description') or 0)
-    debit_idx = int(colmap.get('debit') or 0)
-    credit_idx = int(colmap.get('credit') or 0)
-    checkno_idx = int(colmap.get('checkno') or 0)
-    memo_idx = int(colmap.get('memo') or 0)
-    print(f"_process_bank_statement_for_account: bankaccountname={bankaccountname} date_idx={date_idx} desc_idx={desc_idx} debit_idx={debit_idx} credit_idx={credit_idx}")
+        return None
+    ccfg = compile_bank_config(cfg)
+    date_idx = ccfg.date_idx
+    desc_idx = ccfg.desc_idx
+    debit_idx = ccfg.debit_idx
+    credit_idx = ccfg.credit_idx
+    logger.info(f"_process_bank_statement_for_account: bankaccountname={bankaccountname} date_idx={date_idx} desc_idx={desc_idx} debit_idx={debit_idx} credit_idx={credit_idx}")
     if not (date_idx and desc_idx and (debit_idx or credit_idx)):
-        return
-    raw_fmt = (cfg.get('date_format') or '').strip()
+        return None
 
-    out_rows: List[Dict[str, str]] = []
-    # Track duplicates by (date, normalized description, amount) within this file
-    dup_counts: Dict[Tuple[str, str, str], int] = {}
+    out_path = normalized_dir / f"{bankaccountname}.csv"
     try:
-        with src_path.open('r', encoding='utf-8') as rf:
-            kept_lines: List[str] = []
-            for raw_line in rf:
-                line = raw_line.rstrip('\n')
-                if not line.strip():
-                    continue
-                skip = False
-                for s in starts:
-                    try:
-                        if s and line.startswith(s):
-                            skip = True; break
-                    except Exception:
-                        continue
-                if skip:
-                    continue
-                for c in contains:
-                    try:
-                        if c and (c in line):
-                            skip = True; break
-                    except Exception:
-                        continue
-                if skip:
-                    continue
-                kept_lines.append(line)
-
-            reader = csv.reader(kept_lines, delimiter=delim)
-            for parts in reader:
-                if not parts:
-                    continue
-                parts = [p.strip() for p in parts]
-                def get_part(idx: int) -> str:
-                    if idx <= 0:
-                        return ''
-                    return (parts[idx-1].strip() if len(parts) >= idx else '')
-                date_val = get_part(date_idx)
-                desc_val = get_part(desc_idx)
-                debit_val = get_part(debit_idx) if debit_idx else ''
-                credit_val = get_part(credit_idx) if credit_idx else ''
-                check_val = get_part(checkno_idx) if checkno_idx else ''
-                memo_val = get_part(memo_idx) if memo_idx else ''
-                date_out = _normalize_date(date_val, raw_fmt)
-                # Normalize amount by removing currency symbols and commas; preserve inherent sign in text
-                amt_out = ''
-                chosen = ''
-                if debit_val:
-                    chosen = debit_val
-                elif credit_val:
-                    chosen = credit_val
-                if chosen:
-                    amt_out = _parse_amount(chosen)
-                #print(f"debit_val={debit_val} credit_val={credit_val} dv={dv} cv={cv} amt_out={amt_out}")
-                if not (date_out and desc_val):
-                    continue
-                desc_out = desc_val
-                if check_val:
-                    desc_out = f"{desc_out} (check {check_val})"
-                if memo_val:
-                    desc_out = f"{desc_out} (memo {memo_val})"
-                # Collapse multiple spaces/tabs to a single space and lowercase
-                try:
-                    desc_out = ' '.join(str(desc_out).split())
-                except Exception:
-                    pass
-                desc_out = str(desc_out).lower()
-                # Make duplicates unique by appending marker to description starting with the 2nd occurrence
-                dup_key = (date_out, desc_out, amt_out)
-                prev = dup_counts.get(dup_key, 0)
-                cur = prev + 1
-                dup_counts[dup_key] = cur
-                if cur > 1:
-                    desc_out = f"{desc_out} makeunique-{cur}"
-
-                s = (bankaccountname + date_out + desc_out + amt_out).lower()
-                s = ''.join(s.split())
-                tr_id = hashlib.sha256(s.encode()).hexdigest()[:10]
-                out_rows.append({
-                    'tr_id': tr_id,
-                    'date': date_out,
-                    'description': desc_out,
-                    'credit': amt_out,
-                })
-    except Exception as e:
+        try:
+            rf = src_path.open('r', encoding='utf-8')
+        except Exception as e:
+            raise _SourceReadError(e) from e
+        with rf:
+            lines = ccfg.iter_kept_lines(rf)
+            fields = _iter_extract(_iter_split(lines, ccfg.delim), ccfg.colmap)
+            rows = _iter_with_tr_id(_iter_dedupe(_iter_normalize(fields, ccfg.dates)), bankaccountname)
+            count = _write_normalized(_guard_source(rows), out_path)
+    except _SourceReadError as e:
         try:
             logger.error(f"Failed reading raw CSV for {bankaccountname}: {e}")
         except Exception:
             pass
-        return
+        return None
+    except Exception as e:
+        try:
+            logger.error(f"Failed to write normalized CSV for {bankaccountname}: {e}")
+        except Exception:
+            pass
+        return None
+    if count:
+        try:
+            logger.info(f"Wrote normalized CSV for {bankaccountname}: {out_path} rows={count}")
+        except Exception:
+            pass
+    return count
 
-    if out_rows:
-        header = ['tr_id','date','description','credit']
-        out_path = normalized_dir / f"{bankaccountname}.csv"
+
+def _iter_upload_lines(stream: BinaryIO, sink: BinaryIO, hasher, chunk_size: int) -> Iterator[str]:
+    """Read stream in chunks, copying the raw bytes to sink, and yield decoded lines.
+
+    Decoding is incremental and newlines are split the way text-mode files are
+    (CRLF and lone CR become LF), so the rows match what a later read of the
+    saved file produces. Invalid UTF-8 raises StatementValidationError as soon as
+    it is reached.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ''
+    offset = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        final = not chunk
+        if chunk:
+            sink.write(chunk)
+            hasher.update(chunk)
         try:
-            with out_path.open('w', newline='', encoding='utf-8') as wf:
-                writer = csv.DictWriter(wf, fieldnames=header, extrasaction='ignore')
-                writer.writeheader()
-                for r in out_rows:
-                    writer.writerow(r)
-            try:
-                logger.info(f"Wrote normalized CSV for {bankaccountname}: {out_path} rows={len(out_rows)}")
-            except Exception:
-                pass
-        except Exception as e:
+            text = pending + decoder.decode(chunk, final)
+        except UnicodeDecodeError as e:
+            raise StatementValidationError(f"Failed to read uploaded file: invalid UTF-8 near byte {offset + e.start}") from e
+        offset += len(chunk)
+        # keep a trailing \r back in case the matching \n is in the next chunk
+        if text.endswith('\r') and not final:
+            text, pending = text[:-1], '\r'
+        else:
+            pending = ''
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+        lines = text.split('\n')
+        tail = lines.pop()
+        for line in lines:
+            yield line + '\n'
+        if final:
+            if tail:
+                yield tail
+            return
+        pending = tail + pending
+
+
+def ingest_statement_stream(
+    bankaccountname: str,
+    cfg: Dict[str, Any],
+    stream: BinaryIO,
+    dest_path: Path,
+    normalized_dir: Optional[Path],
+    current_year: str,
+    logger,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> int:
+    """Validate, persist and normalize an uploaded statement in a single streaming scan.
+
+    The upload is read chunk by chunk and copied to a temp file next to
+    dest_path while its rows flow through the same pipeline used at startup.
+    Every row is checked against current_year, so a bad row aborts the upload
+    without reading the rest. The raw file and the normalized CSV are only
+    swapped in once the whole statement validated; on StatementValidationError
+    nothing is replaced. The raw file goes first: if the normalized swap then
+    fails, the manifest still holds the previous raw file's hash, so the next
+    run renormalizes from the new one. Otherwise the manifest entry is refreshed
+    so the next startup skips this account. Returns the number of normalized rows written.
+    """
+    ccfg = compile_bank_config(cfg)
+    if not ccfg.date_idx:
+        raise StatementValidationError("Bank config is missing date column index")
+    can_normalize = bool(normalized_dir and ccfg.desc_idx and (ccfg.debit_idx or ccfg.credit_idx))
+
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    raw_tmp = temp_path(dest_path)
+    norm_path = normalized_dir / f"{bankaccountname}.csv" if can_normalize else None
+    norm_tmp: Optional[Path] = None
+    hasher = hashlib.sha256()
+    try:
+        if norm_path:
+            norm_tmp = temp_path(norm_path)
+        with raw_tmp.open('wb') as sink:
+            lines = ccfg.iter_kept_lines(_iter_upload_lines(stream, sink, hasher, chunk_size))
+            fields = _iter_extract(_iter_split(lines, ccfg.delim), ccfg.colmap)
+            rows = _iter_normalize(fields, ccfg.dates, expect_year=str(current_year))
+            if norm_tmp:
+                count = _write_normalized_rows(_iter_with_tr_id(_iter_dedupe(rows), bankaccountname), norm_tmp)
+            else:
+                count = 0
+                for _ in rows:
+                    pass
+        os.replace(raw_tmp, dest_path)
+        if count:
+            os.replace(norm_tmp, norm_path)
+    finally:
+        for tmp in (raw_tmp, norm_tmp):
+            if tmp and tmp.exists():
+                tmp.unlink()
+
+    if can_normalize:
+        if count:
             try:
-                logger.error(f"Failed to write normalized CSV for {bankaccountname}: {e}")
+                logger.info(f"Wrote normalized CSV for {bankaccountname}: {norm_path} rows={count}")
             except Exception:
                 pass
+        _record_manifest_entry(bankaccountname, cfg, dest_path, normalized_dir, count, logger, sha256=hasher.hexdigest())
+    return count
 
 
-def process_bank_statements_from_sources(
+class _BufferedLogger:
+    """Collects log calls made inside a worker process so the parent can replay them in order."""
+
+    def __init__(self) -> None:
+        self.records: List[Tuple[str, str]] = []
+
+    def info(self, msg: str) -> None:
+        self.records.append(('info', msg))
+
+    def error(self, msg: str) -> None:
+        self.records.append(('error', msg))
+
+
+def _collect_account_jobs(
     ba_db: Dict[str, Dict[str, Any]],
     banks_cfg_db: Dict[str, Dict[str, Any]],
     current_year: str,
-    normalized_dir: Path,
     logger,
-) -> None:
-    if not (ba_db and banks_cfg_db and normalized_dir and current_year):
-        return
+) -> List[Tuple[str, Dict[str, Any], Path]]:
+    jobs: List[Tuple[str, Dict[str, Any], Path]] = []
     for key, ba in list(ba_db.items()):
         try:
             stmt_loc = (ba.get('statement_location') or '').strip()
@@ -221,9 +573,246 @@ def process_bank_statements_from_sources(
             if not cfg:
                 continue
             src = Path(stmt_loc).expanduser().resolve() / str(current_year) / 'bank_stmts' / f"{key}.csv"
-            _process_bank_statement_for_account(key, cfg, src, normalized_dir, logger)
+            jobs.append((key, cfg, src))
         except Exception as e:
             try:
                 logger.error(f"Failed processing account {key}: {e}")
             except Exception:
                 pass
+    return jobs
+
+
+def _run_account_job(key: str, cfg: Dict[str, Any], src: Path, normalized_dir: Path, logger) -> Optional[int]:
+    try:
+        return _process_bank_statement_for_account(key, cfg, src, normalized_dir, logger)
+    except Exception as e:
+        try:
+            logger.error(f"Failed processing account {key}: {e}")
+        except Exception:
+            pass
+        return None
+
+
+def _normalize_account_worker(job: Tuple[str, Dict[str, Any], Path, Path]) -> Tuple[str, Optional[int], List[Tuple[str, str]]]:
+    """Process-pool entry point: normalize one account and return its buffered log records."""
+    key, cfg, src, normalized_dir = job
+    buf = _BufferedLogger()
+    rows = _run_account_job(key, cfg, src, normalized_dir, buf)
+    return key, rows, buf.records
+
+
+def _replay_records(records: List[Tuple[str, str]], logger) -> None:
+    for level, msg in records:
+        try:
+            getattr(logger, level)(msg)
+        except Exception:
+            pass
+
+
+def _config_digest(cfg: Dict[str, Any]) -> str:
+    payload = json.dumps(cfg, sort_keys=True, default=str)
+    return hashlib.sha256(f"{NORMALIZER_VERSION}|{payload}".encode('utf-8')).hexdigest()
+
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open('rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _load_manifest(path: Path) -> Dict[str, Dict[str, Any]]:
+    try:
+        if not path.exists():
+            return {}
+        with path.open('r', encoding='utf-8') as f:
+            data = yaml.safe_load(f) or {}
+        accounts = data.get('accounts') if isinstance(data, dict) else None
+        return {k: v for k, v in (accounts or {}).items() if isinstance(v, dict)}
+    except Exception:
+        return {}
+
+
+def _save_manifest(path: Path, accounts: Dict[str, Dict[str, Any]], logger) -> None:
+    tmp: Optional[Path] = None
+    try:
+        tmp = temp_path(path)
+        with tmp.open('w', encoding='utf-8') as f:
+            yaml.safe_dump({'version': NORMALIZER_VERSION, 'accounts': accounts}, f, sort_keys=True, allow_unicode=True)
+        os.replace(tmp, path)
+    except Exception as e:
+        try:
+            logger.error(f"Failed to write normalization manifest {path}: {e}")
+        except Exception:
+            pass
+    finally:
+        if tmp and tmp.exists():
+            tmp.unlink()
+
+
+def _record_manifest_entry(
+    key: str,
+    cfg: Dict[str, Any],
+    src: Path,
+    normalized_dir: Path,
+    rows: int,
+    logger,
+    sha256: Optional[str] = None,
+) -> None:
+    """Store the manifest entry for a statement that was just normalized outside the startup pass."""
+    manifest_path = normalized_dir / MANIFEST_NAME
+    try:
+        st = src.stat()
+        manifest = _load_manifest(manifest_path)
+        manifest[key] = {
+            'source': str(src),
+            'size': int(st.st_size),
+            'mtime_ns': int(st.st_mtime_ns),
+            'config': _config_digest(cfg),
+            'sha256': sha256 or _file_sha256(src),
+            'rows': int(rows),
+        }
+        _save_manifest(manifest_path, manifest, logger)
+    except Exception as e:
+        try:
+            logger.error(f"Failed updating normalization manifest for {key}: {e}")
+        except Exception:
+            pass
+
+
+def _fingerprint_source(
+    key: str,
+    cfg: Dict[str, Any],
+    src: Path,
+    normalized_dir: Path,
+    prev: Optional[Dict[str, Any]],
+) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """Return (manifest entry, unchanged) for one account's raw statement.
+
+    The content hash is only computed when size/mtime differ from the previous
+    entry, so a warm restart with untouched statements costs one stat() per account.
+    """
+    try:
+        st = src.stat()
+    except OSError:
+        return None, False
+    entry: Dict[str, Any] = {
+        'source': str(src),
+        'size': int(st.st_size),
+        'mtime_ns': int(st.st_mtime_ns),
+        'config': _config_digest(cfg),
+    }
+    if prev and prev.get('source') == entry['source'] and prev.get('config') == entry['config']:
+        out_ok = int(prev.get('rows') or 0) == 0 or (normalized_dir / f"{key}.csv").exists()
+        if out_ok and prev.get('size') == entry['size']:
+            if prev.get('mtime_ns') == entry['mtime_ns']:
+                return dict(prev), True
+            sha = _file_sha256(src)
+            if sha == prev.get('sha256'):
+                entry['sha256'] = sha
+                entry['rows'] = int(prev.get('rows') or 0)
+                if prev.get('failed'):
+                    entry['failed'] = True
+                return entry, True
+            entry['sha256'] = sha
+            return entry, False
+    entry['sha256'] = _file_sha256(src)
+    return entry, False
+
+
+def process_bank_statements_from_sources(
+    ba_db: Dict[str, Dict[str, Any]],
+    banks_cfg_db: Dict[str, Dict[str, Any]],
+    current_year: str,
+    normalized_dir: Path,
+    logger,
+    workers: int = 0,
+    accounts: Optional[Iterable[str]] = None,
+) -> List[str]:
+    """Normalize every account's raw statement into normalized_dir.
+
+    Accounts whose raw statement and bank config are unchanged since the last
+    run (per normalized_dir/manifest.yaml) are skipped, including those that
+    failed to normalize or produced no rows. With accounts given,
+    only those accounts are considered and the manifest entries of the others
+    are kept as they are. Returns the accounts that were (re)normalized.
+    With workers > 1 the remaining per-account jobs are fanned out over a
+    process pool. Each worker writes its own normalized CSV and returns its log
+    records, which are replayed here in bank account order so output is deterministic.
+    """
+    if not (ba_db and banks_cfg_db and normalized_dir and current_year):
+        return []
+    only = None if accounts is None else set(accounts)
+    if only is not None:
+        ba_db = {k: v for k, v in ba_db.items() if k in only}
+    jobs = _collect_account_jobs(ba_db, banks_cfg_db, current_year, logger)
+    manifest_path = normalized_dir / MANIFEST_NAME
+    prev_manifest = _load_manifest(manifest_path)
+    manifest: Dict[str, Dict[str, Any]] = {}
+    if only is not None:
+        manifest = {k: v for k, v in prev_manifest.items() if k not in only}
+    skipped = 0
+    pending: List[Tuple[str, Dict[str, Any], Path]] = []
+    entries: Dict[str, Dict[str, Any]] = {}
+    for key, cfg, src in jobs:
+        try:
+            entry, unchanged = _fingerprint_source(key, cfg, src, normalized_dir, prev_manifest.get(key))
+        except Exception as e:
+            try:
+                logger.error(f"Failed fingerprinting statement for {key}: {e}")
+            except Exception:
+                pass
+            entry, unchanged = None, False
+        if unchanged and entry is not None:
+            manifest[key] = entry
+            skipped += 1
+            if entry.get('failed'):
+                try:
+                    logger.info(f"Skipping {key}: statement unchanged since it last failed to normalize")
+                except Exception:
+                    pass
+            continue
+        if entry is not None:
+            entries[key] = entry
+        pending.append((key, cfg, src))
+    try:
+        logger.info(f"Normalizing {len(pending)} bank statements ({skipped} unchanged)")
+    except Exception:
+        pass
+
+    results: Optional[List[Tuple[str, Optional[int]]]] = None
+    if workers and workers > 1 and len(pending) > 1:
+        pool_jobs = [(key, cfg, src, normalized_dir) for key, cfg, src in pending]
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+                worker_results = list(pool.map(_normalize_account_worker, pool_jobs))
+        except Exception as e:
+            try:
+                logger.error(f"Parallel normalization failed, falling back to serial: {e}")
+            except Exception:
+                pass
+        else:
+            results = []
+            for key, rows, records in worker_results:
+                _replay_records(records, logger)
+                results.append((key, rows))
+    if results is None:
+        results = [(key, _run_account_job(key, cfg, src, normalized_dir, logger)) for key, cfg, src in pending]
+
+    normalized: List[str] = []
+    for key, rows in results:
+        entry = entries.get(key)
+        if rows is not None:
+            normalized.append(key)
+        if entry is None:
+            continue
+        # Failures are recorded too, so an unusable statement is not re-read on every
+        # startup; it is retried once the statement or its bank config changes
+        entry['rows'] = int(rows or 0)
+        if rows is None:
+            entry['failed'] = True
+        manifest[key] = entry
+    if manifest != prev_manifest:
+        _save_manifest(manifest_path, manifest, logger)
+    return normalized
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import copy
-import re
 import csv
+import dataclasses
+import importlib
 import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List, Optional
@@ -11,6 +14,10 @@ from typing import Any, Dict, List, Optional
 import yaml
 
 from . import main as state
+from .aggregate import mark_processed_changed
+from .core.records import Transaction, read_transactions, write_transactions
+from .core.rule_stats import rule_key, save_year_stats, stats_path
+from .core.rules import RULE_MEMO, CompiledRule, CompiledRuleSet, compile_rule_list, load_compiled_rules
 
 # Configure logging for this module
 logging.basicConfig(
@@ -19,272 +26,589 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-
-@dataclass
-class ProcRow:
-    date: str
-    description: str
-    credit: str
-    tr_id: str = ""
-    ruleid: str = ""
-    comment: str = ""
-    transaction_type: str = ""
-    tax_category: str = ""
-    property: str = ""
-    group: str = ""
-    company: str = ""
-    otherentity: str = ""
-    override: str = ""
-    fromaddendum: str = ""
-
-    @staticmethod
-    def from_dict(d: Dict[str, Any]) -> "ProcRow":
-        return ProcRow(
-            date=str(d.get("date", "")),
-            description=str(d.get("description", "")),
-            credit=str(d.get("credit", "")),
-            tr_id=str(d.get("tr_id", "")),
-            ruleid=str(d.get("ruleid", "")),
-            comment=str(d.get("comment", "")),
-            transaction_type=str(d.get("transaction_type", "")),
-            tax_category=str(d.get("tax_category", "")),
-            property=str(d.get("property", "")),
-            group=str(d.get("group", "")),
-            company=str(d.get("company", "")),
-            otherentity=str(d.get("otherentity", "")),
-            override=str(d.get("override", "")),
-            fromaddendum=str(d.get("fromaddendum", "")),
-        )
-
-    def to_dict(self) -> Dict[str, Any]:
-        return {
-            "date": self.date,
-            "description": self.description,
-            "credit": self.credit,
-            "tr_id": self.tr_id,
-            "ruleid": self.ruleid,
-            "comment": self.comment,
-            "transaction_type": self.transaction_type,
-            "tax_category": self.tax_category,
-            "property": self.property,
-            "group": self.group,
-            "company": self.company,
-            "otherentity": self.otherentity,
-            "override": self.override,
-            "fromaddendum": self.fromaddendum,
-        }
+# Processed columns filled from the matched rule
+RULE_FIELDS = ('ruleid', 'comment', 'transaction_type', 'tax_category', 'property', 'group', 'company', 'otherentity')
+# ruleid of rows classified by a common rule: COMMON_RULEID_PREFIX + the common rule's position (1-based)
+COMMON_RULEID_PREFIX = 'common:'
+# Per-account record of the inputs a processed CSV was built from, under the processed dir
+CLASSIFY_STATE_DIR = '.classify'
 
 
 # --------------------------
 # Public API
 # --------------------------
 
-def classify_all() -> None:
-    """Classify for every bank account in the Bank Accounts table."""
+@dataclass
+class ClassifyJob:
+    """Everything needed to classify one account, independent of the app state (picklable)."""
+    bank: str
+    norm_csv: Path
+    out_csv: Path
+    addendum_csv: Optional[Path] = None
+    bank_rules_path: Optional[Path] = None
+    rule_stats_path: Optional[Path] = None
+    year: str = ""
+    # Common rules apply, interleaved with the bank's own rules, to accounts with an inherit entry
+    common_rules: Optional[List[Dict[str, Any]]] = None
+    inherit: Optional[Dict[str, Any]] = None
+    memo_size: int = 0
+    # Set for process pool jobs: return the rule memo entries added, for the parent's memo
+    share_memo: bool = False
+
+
+@dataclass
+class ClassifyResult:
+    bank: str
+    rows: int = 0
+    matched: int = 0
+    seconds: float = 0.0
+    error: str = ""
+    memo_hits: int = 0
+    memo_misses: int = 0
+    memo_entries: Optional[List[Any]] = None
+
+
+def classify_all(workers: int = 0) -> Dict[str, ClassifyResult]:
+    """Classify for every bank account in the Bank Accounts table.
+
+    Accounts are independent, so with workers > 1 they are classified over a
+    process pool. Returns per-account results (rows, matched, seconds, error).
+    """
     logger.info("Classifying all bank accounts")
+    results: Dict[str, ClassifyResult] = {}
     if not state.BA_DB:
-        return
+        return results
+    jobs: List[ClassifyJob] = []
     for bank in state.BA_DB.keys():
         try:
-            classify_bank(bank)
-        except Exception:
+            job = _build_classify_job(bank)
+        except Exception as e:
+            results[bank] = ClassifyResult(bank=bank, error=f"{e}")
             continue
+        if job is not None:
+            jobs.append(job)
 
+    started = time.perf_counter()
+    done: Optional[List[ClassifyResult]] = None
+    if workers and workers > 1 and len(jobs) > 1:
+        try:
+            # Workers import backend.main first: importing this module on its own would hit
+            # the classify <-> main import cycle under the spawn start method
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(jobs)),
+                initializer=importlib.import_module,
+                initargs=('backend.main',),
+            ) as pool:
+                done = list(pool.map(run_classify_job, [dataclasses.replace(j, share_memo=True) for j in jobs]))
+        except Exception as e:
+            logger.error(f"Parallel classification failed, falling back to serial: {e}")
+            done = None
+    if done is None:
+        done = [run_classify_job(job) for job in jobs]
+    for res in done:
+        if res.memo_entries:
+            # the workers' memos die with the pool; keep what they learned (and persist it)
+            RULE_MEMO.merge(res.memo_entries)
+        res.memo_entries = None
+        results[res.bank] = res
+        mark_processed_changed(res.bank)
+
+    for bank, res in results.items():
+        if res.error:
+            logger.error(f"Classification failed for {bank} after {res.seconds:.3f}s: {res.error}")
+        else:
+            logger.info(
+                f"Classified {bank}: rows={res.rows} matched={res.matched} in {res.seconds:.3f}s"
+                f" (memo hits={res.memo_hits} misses={res.memo_misses})"
+            )
+    failed = sum(1 for r in results.values() if r.error)
+    logger.info(
+        f"Classified {len(results) - failed} bank accounts in {time.perf_counter() - started:.3f}s"
+        + (f" ({failed} failed)" if failed else "")
+    )
+    return results
 
-def classify_bank(bankaccountname: str) -> None:
+
+def classify_bank(bankaccountname: str) -> Optional[ClassifyResult]:
     """Classify a single bank account's normalized rows into processed YAML."""
     logger.info(f"Classifying bank account: {bankaccountname}")
+    job = _build_classify_job(bankaccountname)
+    if job is None:
+        return None
+    res = run_classify_job(job)
+    mark_processed_changed(job.bank)
+    if res.error:
+        logger.error(f"Classification failed for {job.bank}: {res.error}")
+    return res
+
+
+def _build_classify_job(bankaccountname: str) -> Optional[ClassifyJob]:
+    """Resolve an account's input/output paths from the app state; None when there is nothing to classify."""
     bank = (bankaccountname or "").strip().lower()
     if not bank:
         logger.info(f"No bank account found for {bankaccountname}")
-        return
+        return None
     norm_dir: Optional[Path] = state.NORMALIZED_DIR_PATH
     proc_dir: Optional[Path] = state.PROCESSED_DIR_PATH
     if not norm_dir or not proc_dir:
         logger.info(f"No normalized or processed directory found for {bank}")
-        return
-
-    # 1) Seed processed from normalized CSV only
-    processed: Dict[str, List[Dict[str, Any]]] = {}
-    seed_rows: List[ProcRow] = []
+        return None
     norm_csv = norm_dir / f"{bank}.csv"
     if not norm_csv.exists():
         logger.info(f"No normalized CSV found for {bank}")
-        return
-    try:
-        with norm_csv.open("r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                # Expecting columns: tr_id,date,description,credit
-                seed_rows.append(ProcRow.from_dict(row))
-    except Exception as e:
-        logger.exception(f"Error loading normalized CSV for {bank}: {e}")
-        return
-
-    processed[bank] = [r.to_dict() for r in seed_rows]
-
-    # 1b) Append addendum CSV rows if present (date, description, credit)
-    try:
-        add_csv: Optional[Path] = None
-        # Prefer per-bank statement_location
-        try:
-            ba = state.BA_DB.get(bank) or {}
-            sl = (ba.get('statement_location') or '').strip()
-            if sl and state.CURRENT_YEAR:
-                per_bank_add = Path(sl) / state.CURRENT_YEAR / 'addendum' / f"{bank}.csv"
-                if per_bank_add.exists():
-                    add_csv = per_bank_add
-        except Exception:
-            add_csv = None
-        if add_csv and add_csv.exists():
-            with add_csv.open("r", encoding="utf-8") as af:
-                areader = csv.DictReader(af)
-                for row in areader:
-                    pr = ProcRow.from_dict(row)
-                    pr.fromaddendum = "true"
-                    processed[bank].append(pr.to_dict())
-    except Exception:
-        # ignore addendum errors to avoid blocking classification
-        pass
+        return None
 
-    # 2) Apply bank rules if present
-    # Only check per-bank bank_rules under statement_location/CURRENT_YEAR/bank_rules
+    # Addendum and bank rules live under the per-bank statement_location/CURRENT_YEAR
+    add_csv: Optional[Path] = None
     per_bank_candidate: Optional[Path] = None
     bank_rules_path: Optional[Path] = None
-    rules: List[Dict[str, Any]] = []
     try:
         ba = state.BA_DB.get(bank) or {}
         sl = (ba.get('statement_location') or '').strip()
         if sl and state.CURRENT_YEAR:
+            per_bank_add = Path(sl) / state.CURRENT_YEAR / 'addendum' / f"{bank}.csv"
+            if per_bank_add.exists():
+                add_csv = per_bank_add
             per_bank_candidate = Path(sl) / state.CURRENT_YEAR / 'bank_rules' / f"{bank}.yaml"
             if per_bank_candidate.exists():
                 bank_rules_path = per_bank_candidate
     except Exception:
+        add_csv = None
         bank_rules_path = None
-
-    if bank_rules_path and bank_rules_path.exists():
-        try:
-            with bank_rules_path.open("r", encoding="utf-8") as f:
-                rules_raw = yaml.safe_load(f) or []
-                rules = [r for r in rules_raw if isinstance(r, dict)]
-        except Exception:
-            rules = []
-    else:
+    if not bank_rules_path:
         logger.info(
             f"No bank rules found at per-bank path: {per_bank_candidate} (treating as empty rules)"
         )
-    # Apply rules in ascending numeric 'order'
-    def _order_key(r: Dict[str, Any]) -> int:
-        try:
-            return int(r.get('order') or 0)
-        except Exception:
+    common_rules: Optional[List[Dict[str, Any]]] = None
+    inherit = next((dict(v) for v in state.INHERIT_RULES_DB.values() if (v or {}).get('bankaccountname') == bank), None)
+    if inherit is not None:
+        # Sorted by transaction_type as in the old generated rule files (see _common_slots)
+        common_rules = [
+            dict(r, order=i)
+            for i, r in enumerate(sorted(state.COMMON_RULES_DB.values(), key=lambda r: r.get('transaction_type', '')), start=1)
+        ]
+    return ClassifyJob(
+        bank=bank,
+        norm_csv=norm_csv,
+        out_csv=proc_dir / f"{bank}.csv",
+        addendum_csv=add_csv,
+        bank_rules_path=bank_rules_path,
+        rule_stats_path=stats_path(state.ACCOUNTS_DIR_PATH, bank),
+        year=str(state.CURRENT_YEAR or ""),
+        common_rules=common_rules,
+        inherit=inherit,
+        memo_size=state.RULE_MEMO_SIZE,
+    )
+
+
+def run_classify_job(job: ClassifyJob) -> ClassifyResult:
+    """Classify one account from its job description; never raises (errors go into the result)."""
+    started = time.perf_counter()
+    res = ClassifyResult(bank=job.bank)
+    if RULE_MEMO.maxsize != job.memo_size:
+        # pool workers do not run the app startup that sizes the memo
+        RULE_MEMO.resize(job.memo_size)
+    hits, misses = RULE_MEMO.hits, RULE_MEMO.misses
+    if job.share_memo:
+        RULE_MEMO.track_new()
+    try:
+        _classify_job(job, res)
+    except Exception as e:
+        res.error = f"{type(e).__name__}: {e}"
+    if job.share_memo:
+        res.memo_entries = RULE_MEMO.take_new()
+    res.seconds = time.perf_counter() - started
+    res.memo_hits, res.memo_misses = RULE_MEMO.hits - hits, RULE_MEMO.misses - misses
+    return res
+
+
+def _classify_job(job: ClassifyJob, res: ClassifyResult) -> None:
+    bank = job.bank
+
+    # 1) Seed processed from normalized CSV only (tr_id,date,description,credit)
+    try:
+        rows: List[Transaction] = read_transactions(job.norm_csv)
+    except Exception as e:
+        raise RuntimeError(f"Error loading normalized CSV for {bank}: {e}") from e
+
+    # 1b) Append addendum CSV rows if present (date, description, credit)
+    try:
+        add_csv = job.addendum_csv
+        if add_csv and add_csv.exists():
+            for tr in read_transactions(add_csv):
+                tr.fromaddendum = "true"
+                rows.append(tr)
+    except Exception:
+        # ignore addendum errors to avoid blocking classification
+        pass
+
+    # 2) Apply bank rules if present; parsed and compiled once per distinct file content
+    bank_rules_path = job.bank_rules_path
+    if bank_rules_path and bank_rules_path.exists():
+        ruleset = load_compiled_rules(bank_rules_path)
+    else:
+        ruleset = load_compiled_rules(None)
+
+    common = _common_ruleset(job, ruleset)
+    slots = _common_slots(ruleset, common)
+
+    # iterate processed records; for each, take the first rule by order that matches
+    usage = _RuleUsage()
+    for rec in rows:
+        desc_lower = rec.description.lower()
+        credit_cents = rec.cents
+        date = rec.date
+        pos = RULE_MEMO.first_position(ruleset, desc_lower, credit_cents, date)
+        cpos = _common_position(common, slots, pos, desc_lower, credit_cents, date)
+        if cpos is not None:
+            _apply_common(rec, common.compiled[cpos], job.inherit)
+            res.matched += 1
+            continue
+        if pos == len(ruleset):
+            # no rule matched; leave as-is
+            continue
+        hit = ruleset.compiled[pos]
+        _apply_rule(rec, hit)
+        res.matched += 1
+        usage.add(hit, rec)
+
+    # Usage goes to the rule stats store; the bank_rules YAML is left untouched
+    _save_rule_usage(job, usage)
+
+    # 3) Save processed CSV sorted by date, then description, then credit
+    res.rows = len(rows)
+    def _credit_cents(r: Transaction) -> int:
+        cents = r.cents
+        if cents is None:
+            logger.error(f"Error converting credit to cents: {r.credit!r}")
             return 0
-    rules = sorted(rules, key=_order_key)
+        return cents
 
-    def _float_or_none(s: str) -> Optional[float]:
-        try:
-            return float(s)
-        except Exception:
-            return None
-
-    def _matches(rule: Dict[str, Any], rec: Dict[str, Any]) -> bool:
-        patt = str(rule.get("pattern_match_logic", ""))
-        desc = str(rec.get("description", ""))
-        credit = _float_or_none(str(rec.get("credit", "")))
-        # desc_contains
-        m = re.search(r"desc_contains\s*=\s*(.+)", patt, flags=re.IGNORECASE)
-        if m:
-            pattern_val = m.group(1).strip()
-            if pattern_val and pattern_val.lower() in desc.lower():
-                return True
-        # desc_startswith
-        m = re.search(r"desc_startswith\s*=\s*(.+)", patt, flags=re.IGNORECASE)
-        if m:
-            pattern_val = m.group(1).strip()
-            if pattern_val and desc.lower().startswith(pattern_val.lower()):
-                return True
-        # credit_equals
-        m = re.search(r"credit_equals\s*=\s*([-+]?[0-9]*\.?[0-9]+)", patt, flags=re.IGNORECASE)
-        if m and credit is not None:
-            try:
-                pattern_val = float(m.group(1))
-                if abs(credit - pattern_val) < 0.10:
-                    return True
-            except Exception:
-                pass
+    rows.sort(key=lambda r: (r.date, r.description, _credit_cents(r)))
+
+    _write_processed(job.out_csv, rows)
+    logger.info(f"Saved processed CSV for {bank}: {job.out_csv}")
+    _save_classify_state(job, ruleset, common)
+
+
+def reclassify_after_rule_edit(bankaccountname: str, previous_rules: List[Dict[str, Any]]) -> Optional[ClassifyResult]:
+    """Re-apply an account's bank rules after an edit, touching only rows the edit can affect.
+
+    `previous_rules` is the rules list as it was before the edit. Rules ahead of the
+    first changed position are identical in both versions, so rows one of them
+    matched keep their classification; only rows matched at or after that position,
+    and unmatched rows, are re-evaluated against the rules from there on. Falls back
+    to a full classify_bank when the processed CSV was not built from
+    `previous_rules` and the current normalized/addendum files.
+    """
+    job = _build_classify_job(bankaccountname)
+    if job is None:
+        return None
+    started = time.perf_counter()
+    res = ClassifyResult(bank=job.bank)
+    try:
+        previous = CompiledRuleSet([r for r in previous_rules or [] if isinstance(r, dict)])
+        done = _reclassify_job(job, previous, res)
+    except Exception as e:
+        logger.error(f"Incremental reclassification failed for {job.bank}: {e}")
+        done = False
+    if not done:
+        return classify_bank(job.bank)
+    mark_processed_changed(job.bank)
+    res.seconds = time.perf_counter() - started
+    return res
+
+
+def _reclassify_job(job: ClassifyJob, previous: CompiledRuleSet, res: ClassifyResult) -> bool:
+    """Incrementally update job.out_csv; False when a full classification is needed instead."""
+    common = _common_ruleset(job, previous)
+    saved = _load_classify_state(job)
+    if not saved or saved != _classify_state(job, previous, common, processed=_file_stamp(job.out_csv)):
+        logger.info(f"Processed CSV for {job.bank} is not current; classifying in full")
+        return False
+    # Rule positions by order; the processed ruleid column records the matched order
+    positions = {cr.order: pos for pos, cr in enumerate(previous.compiled)}
+    if len(positions) != len(previous.compiled):
         return False
 
-    # iterate processed records; for each, scan rules in the order in file
-    # Track rule usage by 'order'
-    rule_used_counts: Dict[int, int] = {}
-    for rec in processed[bank]:
-        matched = False
-        for rule in rules:
-            if _matches(rule, rec):
-                rec["ruleid"] = str(int(rule.get("order") or 0))
-                rec["transaction_type"] = str(rule.get("transaction_type", ""))
-                rec["tax_category"] = str(rule.get("tax_category", ""))
-                rec["property"] = str(rule.get("property", ""))
-                rec["group"] = str(rule.get("group", ""))
-                rec["company"] = str(rule.get("company", ""))
-                rec["otherentity"] = str(rule.get("otherentity", ""))
-                try:
-                    cm = str(rule.get("comment", "")).strip()
-                    if cm:
-                        rec["comment"] = cm
-                except Exception:
-                    pass
-                try:
-                    o = int(rule.get("order") or 0)
-                    if o > 0:
-                        rule_used_counts[o] = rule_used_counts.get(o, 0) + 1
-                except Exception:
-                    pass
-                matched = True
-                break
-        if not matched:
-            # leave as-is when no match
-            pass
-
-    # Persist updated usedcount back into bank_rules YAML (only if file exists and rules present)
-    if bank_rules_path and bank_rules_path.exists() and rules:
-        try:
-            updated_rules: List[Dict[str, Any]] = []
-            for r in rules:
-                try:
-                    o = int(r.get("order") or 0)
-                except Exception:
-                    o = 0
-                r = dict(r)
-                r["usedcount"] = int(rule_used_counts.get(o, 0))
-                updated_rules.append(r)
-            # Keep the same order as sorted above
-            with bank_rules_path.open("w", encoding="utf-8") as wf:
-                yaml.safe_dump(updated_rules, wf, sort_keys=True, allow_unicode=True)
-        except Exception:
-            # non-fatal
-            pass
+    ruleset = load_compiled_rules(job.bank_rules_path if job.bank_rules_path and job.bank_rules_path.exists() else None)
+    start = previous.first_difference(ruleset)
+    if _signature(_common_ruleset(job, ruleset)) != _signature(common):
+        # the edit added or removed an expanded copy of a common rule
+        return False
+    # A common rule's slot only depends on the bank rules ahead of it, so slots below
+    # start are the same for both versions and the rows those rules matched stay as they are
+    previous_slots = _common_slots(previous, common)
+    slots = _common_slots(ruleset, common)
+    common_positions = {cr.order: pos for pos, cr in enumerate(common.compiled)} if common is not None else {}
+    rows = read_transactions(job.out_csv)
+
+    usage = _RuleUsage()
+    changed = 0
+    for rec in rows:
+        ruleid = rec.ruleid.strip()
+        if ruleid.startswith(COMMON_RULEID_PREFIX):
+            try:
+                cpos = common_positions[int(ruleid[len(COMMON_RULEID_PREFIX):])]
+            except (KeyError, ValueError):
+                return False
+            if previous_slots[cpos] < start:
+                res.matched += 1
+                continue
+        elif ruleid:
+            try:
+                pos = positions[int(ruleid)]
+            except (KeyError, ValueError):
+                return False
+            if pos < start:
+                res.matched += 1
+                usage.add(ruleset.compiled[pos], rec)
+                continue
+        before = tuple(getattr(rec, k) for k in RULE_FIELDS)
+        for k in RULE_FIELDS:
+            setattr(rec, k, "")
+        desc_lower = rec.description.lower()
+        credit_cents = rec.cents
+        date = rec.date
+        pos = ruleset.first_position(desc_lower, credit_cents, date, start=start)
+        cpos = _common_position(common, slots, pos, desc_lower, credit_cents, date)
+        if cpos is not None:
+            _apply_common(rec, common.compiled[cpos], job.inherit)
+            res.matched += 1
+        elif pos < len(ruleset):
+            hit = ruleset.compiled[pos]
+            _apply_rule(rec, hit)
+            res.matched += 1
+            usage.add(hit, rec)
+        if tuple(getattr(rec, k) for k in RULE_FIELDS) != before:
+            changed += 1
+    res.rows = len(rows)
+
+    _save_rule_usage(job, usage)
+    if changed:
+        _write_processed(job.out_csv, rows)
+    _save_classify_state(job, ruleset, common)
+    logger.info(
+        f"Reclassified {job.bank} from rule position {start + 1}: {changed} of {len(rows)} rows changed"
+    )
+    return True
+
+
+def _apply_rule(rec: Transaction, hit: CompiledRule) -> None:
+    rule = hit.rule
+    rec.ruleid = str(hit.order)
+    rec.transaction_type = str(rule.get("transaction_type", ""))
+    rec.tax_category = str(rule.get("tax_category", ""))
+    rec.property = str(rule.get("property", ""))
+    rec.group = str(rule.get("group", ""))
+    rec.company = str(rule.get("company", ""))
+    rec.otherentity = str(rule.get("otherentity", ""))
+    try:
+        cm = str(rule.get("comment", "")).strip()
+        if cm:
+            rec.comment = cm
+    except Exception:
+        pass
+
+
+def _common_ruleset(job: ClassifyJob, ruleset: CompiledRuleSet) -> Optional[CompiledRuleSet]:
+    """The shared common rules, compiled once per distinct content; None when the account inherits none.
+
+    Rule files generated before the common rules were shared may still hold their
+    expanded copies (the common rule with the account's inherit attributes and no
+    company). Those copies classify the row themselves, as they always did, so the
+    matching common rules are left out rather than evaluated a second time.
+    """
+    if job.inherit is None or not job.common_rules:
+        return None
+    inherit = [_norm(job.inherit.get(k)) for k in _INHERIT_FIELDS]
+    # the generator writes no company on the copies, so a rule that sets one is the bank's own
+    expanded = {
+        _expanded_key(cr.rule) for cr in ruleset.compiled
+        if [_norm(cr.rule.get(k)) for k in _INHERIT_FIELDS] == inherit and not _norm(cr.rule.get("company"))
+    }
+    rules = [r for r in job.common_rules if _expanded_key(r) not in expanded] if expanded else job.common_rules
+    return compile_rule_list(rules) if rules else None
 
-    # 3) Save processed CSV sorted by date, then description, then credit
-    out_rows = processed.get(bank, [])
-    def _credit_as_float(v: Any) -> float:
-        try:
-            return float(v)
-        except Exception as e:
-            logger.exception(f"Error converting credit to float: {v} {e}")
-            return 0.0
 
-    out_rows.sort(key=lambda r: (str(r.get("date", "")), str(r.get("description", "")), _credit_as_float(r.get("credit", 0))))
+# Attributes an expanded common rule takes from the account's inherit entry
+_INHERIT_FIELDS = ('tax_category', 'property', 'group', 'otherentity')
 
-    proc_dir.mkdir(parents=True, exist_ok=True)
-    out_csv = proc_dir / f"{bank}.csv"
-    header = ['tr_id','date','description','credit','ruleid','comment','transaction_type','tax_category','property','group','company','otherentity','override','fromaddendum']
+
+def _norm(value: Any) -> str:
+    return str(value or "").strip().lower()
+
+
+def _expanded_key(rule: Dict[str, Any]) -> tuple:
+    """transaction_type and whitespace-collapsed pattern, as scripts/generate_bank_rules.py compares them."""
+    return _norm(rule.get("transaction_type")), " ".join(str(rule.get("pattern_match_logic") or "").split()).lower()
+
+
+def _signature(ruleset: Optional[CompiledRuleSet]) -> str:
+    return ruleset.signature if ruleset is not None else ""
+
+
+def _common_slots(ruleset: CompiledRuleSet, common: Optional[CompiledRuleSet]) -> List[int]:
+    """For each common rule, the number of the bank's own rules that take precedence over it.
+
+    The generated rule files held both kinds in one list, stably sorted by
+    transaction_type with the common rules first. Merging the bank's rules (in
+    their order) with the common rules the same way gives that precedence back;
+    when the bank's rules are sorted by transaction_type it is exactly the old order.
+    """
+    if common is None:
+        return []
+    bank_types = [_rule_type(cr) for cr in ruleset.compiled]
+    slots: List[int] = []
+    i = 0
+    for cr in common.compiled:
+        ttype = _rule_type(cr)
+        while i < len(bank_types) and bank_types[i] < ttype:
+            i += 1
+        slots.append(i)
+    return slots
+
+
+def _rule_type(cr: CompiledRule) -> str:
+    return str(cr.rule.get("transaction_type") or "").strip().lower()
+
+
+def _common_position(
+    common: Optional[CompiledRuleSet], slots: List[int], bank_pos: int,
+    desc_lower: str, credit_cents: Optional[int], date: str,
+) -> Optional[int]:
+    """Position of the common rule that wins over the bank's first match at bank_pos, if any.
+
+    bank_pos is len(ruleset) when none of the bank's rules matched. Slots never
+    decrease, so the first matching common rule is also the earliest one overall.
+    """
+    if common is None or not slots or slots[0] > bank_pos:
+        return None
+    cpos = RULE_MEMO.first_position(common, desc_lower, credit_cents, date)
+    if cpos < len(slots) and slots[cpos] <= bank_pos:
+        return cpos
+    return None
+
+
+def _apply_common(rec: Transaction, hit: CompiledRule, inherit: Optional[Dict[str, Any]]) -> None:
+    """Classify rec with a common rule and the account's inherit attributes.
+
+    The fields are those the expanded rule (the common rule merged with the inherit
+    entry) would have set through _apply_rule.
+    """
+    inherit = inherit or {}
+    rule = hit.rule
+    rec.ruleid = f"{COMMON_RULEID_PREFIX}{hit.order}"
+    rec.transaction_type = str(rule.get("transaction_type", ""))
+    rec.tax_category = str(inherit.get("tax_category", ""))
+    rec.property = str(inherit.get("property", ""))
+    rec.group = str(inherit.get("group", ""))
+    rec.company = str(inherit.get("company") or rule.get("company", ""))
+    rec.otherentity = str(inherit.get("otherentity", ""))
     try:
-        with out_csv.open("w", newline='', encoding="utf-8") as wf:
-            writer = csv.DictWriter(wf, fieldnames=header, extrasaction='ignore')
-            writer.writeheader()
-            for r in out_rows:
-                writer.writerow(r)
-        logger.info(f"Saved processed CSV for {bank}: {out_csv}")
+        cm = str(rule.get("comment", "")).strip()
+        if cm:
+            rec.comment = cm
+    except Exception:
+        pass
+
+
+class _RuleUsage:
+    """Matches and latest matched date per rule during one classification."""
+
+    def __init__(self) -> None:
+        self.hits: Dict[str, int] = {}
+        self.last: Dict[str, str] = {}
+
+    def add(self, hit: CompiledRule, rec: Transaction) -> None:
+        key = rule_key(hit.rule)
+        self.hits[key] = self.hits.get(key, 0) + 1
+        date = rec.date
+        if date > self.last.get(key, ""):
+            self.last[key] = date
+
+
+def _save_rule_usage(job: ClassifyJob, usage: _RuleUsage) -> None:
+    try:
+        save_year_stats(
+            job.rule_stats_path, job.year,
+            ((key, hits, usage.last.get(key, "")) for key, hits in usage.hits.items()),
+        )
+    except Exception:
+        # non-fatal
+        logger.exception(f"Failed saving rule usage for {job.bank}")
+
+
+def _write_processed(out_csv: Path, rows: List[Transaction]) -> None:
+    out_csv.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        write_transactions(out_csv, rows)
     except Exception as e:
-        logger.exception(f"Error saving processed CSV for {bank}: {e}")
+        raise RuntimeError(f"Error saving processed CSV for {out_csv.stem}: {e}") from e
+
+
+# --------------------------
+# Classification state
+# --------------------------
+
+def _file_stamp(path: Optional[Path]) -> Optional[List[int]]:
+    if not path:
+        return None
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [int(st.st_size), int(st.st_mtime_ns)]
+
+
+def _seed_has_rule_fields(path: Optional[Path]) -> bool:
+    """True when an input CSV already carries classification columns (they seed processed rows)."""
+    if not path:
+        return False
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            header = next(csv.reader(f), [])
+    except Exception:
+        return True
+    return any(k in header for k in RULE_FIELDS)
+
+
+def _classify_state_path(job: ClassifyJob) -> Path:
+    return job.out_csv.parent / CLASSIFY_STATE_DIR / f"{job.bank}.yaml"
+
+
+def _classify_state(
+    job: ClassifyJob, ruleset: CompiledRuleSet, common: Optional[CompiledRuleSet], processed: Optional[List[int]],
+) -> Dict[str, Any]:
+    return {
+        'normalized': _file_stamp(job.norm_csv),
+        'addendum': _file_stamp(job.addendum_csv),
+        'processed': processed,
+        'rules': ruleset.signature,
+        'common': common.signature if common is not None else '',
+        'inherit': dict(job.inherit) if common is not None else {},
+    }
+
+
+def _load_classify_state(job: ClassifyJob) -> Optional[Dict[str, Any]]:
+    try:
+        with _classify_state_path(job).open("r", encoding="utf-8") as f:
+            data = yaml.safe_load(f)
+        return data if isinstance(data, dict) else None
+    except Exception:
+        return None
+
+
+def _save_classify_state(job: ClassifyJob, ruleset: CompiledRuleSet, common: Optional[CompiledRuleSet]) -> None:
+    """Record what job.out_csv was just built from, so rule edits can update it incrementally."""
+    path = _classify_state_path(job)
+    try:
+        if _seed_has_rule_fields(job.norm_csv) or _seed_has_rule_fields(job.addendum_csv):
+            # Unmatched rows would need their seeded values back; always classify in full
+            path.unlink(missing_ok=True)
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as f:
+            yaml.safe_dump(_classify_state(job, ruleset, common, processed=_file_stamp(job.out_csv)), f, sort_keys=True)
+    except Exception:
+        logger.exception(f"Failed saving classification state for {job.bank}")
@@ -1,95 +1,38 @@
 from pathlib import Path
-from typing import Dict, List, Any
-import csv
+from typing import Dict, Optional
 import yaml
 
 from . import main as state
+from .aggregate import SummaryAggregates, aggregate_processed
+from .property_sum import build_property_summary
+from .core.amounts import cents_to_float
 
 
-def _read_processed_csv(path: Path) -> List[Dict[str, Any]]:
-    rows: List[Dict[str, Any]] = []
-    try:
-        with path.open('r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                rows.append({
-                    'credit': row.get('credit',''),
-                    'transaction_type': row.get('transaction_type',''),
-                    'company': row.get('company',''),
-                })
-    except Exception:
-        pass
-    return rows
-
-
-def _read_processed_yaml(path: Path) -> List[Dict[str, Any]]:
-    rows: List[Dict[str, Any]] = []
-    try:
-        with path.open('r', encoding='utf-8') as f:
-            data = yaml.safe_load(f) or []
-            if isinstance(data, list):
-                for item in data:
-                    if isinstance(item, dict):
-                        rows.append({
-                            'credit': item.get('credit',''),
-                            'transaction_type': item.get('transaction_type',''),
-                            'company': item.get('company',''),
-                        })
-    except Exception:
-        pass
-    return rows
-
-
-def _to_float(val: Any) -> float:
-    try:
-        s = str(val).strip()
-        if not s:
-            return 0.0
-        return round(float(s), 2)
-    except Exception:
-        return 0.0
-
-
-def prepare_and_save_company_sum() -> None:
+def prepare_and_save_company_sum(
+    agg: Optional[SummaryAggregates] = None, rental_summary: Optional[Dict[str, Dict[str, float]]] = None,
+) -> None:
     """
     Build company summary per company by summing credits by transaction_type for
     any transaction that has a non-empty company field.
     Writes one YAML file per company at ACCOUNTS_DIR/CURRENT_YEAR/companysummary/<company>.yaml
     with a mapping { transaction_type: total }.
+    `agg` is a scan already made by aggregate_processed(); without it the processed files are read.
+    `rental_summary` is the property summary just built by prepare_and_save_property_sum();
+    without it the property summary is built here in memory.
     """
-    if not state.ACCOUNTS_DIR_PATH or not state.CURRENT_YEAR:
+    if agg is None:
+        agg = aggregate_processed()
+    if agg is None:
         return
-    base_processed: Path = state.PROCESSED_DIR_PATH
-    if not base_processed:
-        return
-
-    summary: Dict[str, Dict[str, float]] = {}
+    if rental_summary is None:
+        rental_summary = build_property_summary(agg)
+    summary: Dict[str, Dict[str, float]] = {
+        c: {t: cents_to_float(v) for t, v in totals.items()} for c, totals in agg.company.items()
+    }
 
-    for ba in list(state.BA_DB.keys()):
-        py = base_processed / f"{ba}.yaml"
-        if py.exists():
-            rows = _read_processed_yaml(py)
-        else:
-            pc = base_processed / f"{ba}.csv"
-            rows = _read_processed_csv(pc) if pc.exists() else []
-        for r in rows:
-            try:
-                comp = (r.get('company') or '').strip().lower()
-                if not comp:
-                    continue
-                tx_type = (r.get('transaction_type') or '').strip().lower()
-                if not tx_type:
-                    continue
-                credit = _to_float(r.get('credit'))
-                if comp not in summary:
-                    summary[comp] = {}
-                summary[comp][tx_type] = summary[comp].get(tx_type, 0.0) + credit
-            except Exception:
-                continue
-
-    # Augment company summary with rentpassedtoowners and income derived from rentalsummary
+    # Augment company summary with rentpassedtoowners and income derived from the rental summary
     try:
-        calculate_income_rentpassed(summary)
+        calculate_income_rentpassed(summary, rental_summary)
     except Exception:
         pass
 
@@ -143,15 +86,14 @@ def calc_profit(summary: Dict[str, Dict[str, float]]) -> None:
             continue
 
 
-def calculate_income_rentpassed(summary: Dict[str, Dict[str, float]]) -> None:
+def calculate_income_rentpassed(summary: Dict[str, Dict[str, float]], rental_summary: Dict[str, Dict[str, float]]) -> None:
     """
     For each company in summary, compute:
-    - rentpassedtoowners: sum of 'rent' from property rental summaries for properties managed by the company
+    - rentpassedtoowners: sum of 'rent' from the property rental summary for properties managed by the company
     - income: rentpassedtoowners + (rentpassedtoowners * company.rentPercentage/100)
     Writes the values into summary[company]['rentpassedtoowners'] and summary[company]['income'].
     """
     try:
-        rentals_dir: Path = state.ACCOUNTS_DIR_PATH / (state.CURRENT_YEAR or '') / 'rentalsummary'
         props = dict(getattr(state, 'DB', {}) or {})
         comps = dict(getattr(state, 'COMP_DB', {}) or {})
     except Exception:
@@ -166,31 +108,29 @@ def calculate_income_rentpassed(summary: Dict[str, Dict[str, float]]) -> None:
         summary[key]['rentpassedtoowners'] = 0.0
         summary[key]['income'] = 0.0
 
-    # Aggregate rentpassedtoowners from property rental summaries
+    # Aggregate rentpassedtoowners from the property rental summary
     try:
-        if rentals_dir.exists() and rentals_dir.is_dir():
-            for pkey, prec in props.items():
-                prop_id = (pkey or '').strip().lower()
-                if not prop_id:
-                    continue
-                comp_key = (prec.get('propMgmtComp') or '').strip().lower()
-                if not comp_key:
-                    continue
-                p_yaml = rentals_dir / f"{prop_id}.yaml"
-                if not p_yaml.exists():
-                    continue
-                try:
-                    with p_yaml.open('r', encoding='utf-8') as pf:
-                        pdata = yaml.safe_load(pf) or {}
-                    rent_val = float((pdata.get('rent', 0.0) or 0.0))
-                except Exception:
-                    rent_val = 0.0
-                if comp_key not in summary:
-                    summary[comp_key] = {}
-                summary[comp_key]['rentpassedtoowners'] += rent_val
+        for pkey, prec in props.items():
+            prop_id = (pkey or '').strip().lower()
+            if not prop_id:
+                continue
+            comp_key = (prec.get('propMgmtComp') or '').strip().lower()
+            if not comp_key:
+                continue
+            ptotals = rental_summary.get(prop_id)
+            if ptotals is None:
+                continue
+            try:
+                # rounded as written to rentalsummary/<property>.yaml
+                rent_val = round(float(ptotals.get('rent', 0.0) or 0.0), 2)
+            except Exception:
+                rent_val = 0.0
+            if comp_key not in summary:
+                summary[comp_key] = {}
+            summary[comp_key]['rentpassedtoowners'] += rent_val
 
-            for comp_key in summary:
-                summary[comp_key]['rentpassedtoowners'] = -round(summary[comp_key].get('rentpassedtoowners', 0.0) or 0.0, 2)
+        for comp_key in summary:
+            summary[comp_key]['rentpassedtoowners'] = -round(summary[comp_key].get('rentpassedtoowners', 0.0) or 0.0, 2)
     except Exception:
         pass
 
@@ -0,0 +1,123 @@
+import re
+from functools import lru_cache
+from decimal import Decimal, InvalidOperation, ROUND_HALF_EVEN
+from typing import Any, List, Optional, Tuple
+
+# Currency symbols and thousands separators are dropped while decoding an amount
+_DROP_CHARS = str.maketrans('', '', '$€£¥, ')
+_AMOUNT_RE = re.compile(r'([+-]?)([0-9]*)(?:\.([0-9]*))?')
+# Longest integer part whose 2-decimal value a float still renders exactly
+_MAX_EXACT_INT_DIGITS = 13
+# Summaries count amounts in int64 cents; anything at or beyond this magnitude counts as 0
+SUMMARY_CENTS_LIMIT = 2 ** 63
+
+
+def _split_amount(txt: str) -> Optional[Tuple[bool, str, str]]:
+    """Decode a stripped amount string into (negative, integer digits, fraction digits), or None."""
+    neg = False
+    if txt.startswith('(') and txt.endswith(')'):
+        neg = True
+        txt = txt[1:-1]
+    m = _AMOUNT_RE.fullmatch(txt.translate(_DROP_CHARS))
+    if m is None:
+        return None
+    sign, int_part, frac_part = m.groups()
+    if not (int_part or frac_part):
+        return None
+    if sign == '-':
+        neg = not neg
+    return neg, int_part, frac_part or ''
+
+
+def parse_cents(val: Any) -> Optional[int]:
+    """Decode an amount such as '$1,234.50', '(45.00)' or '-12' into integer cents.
+
+    Returns None when val is empty or not a number. Amounts with more than two
+    decimals are rounded half-to-even.
+    """
+    if val is None:
+        return None
+    if isinstance(val, int) and not isinstance(val, bool):
+        return val * 100
+    return _parse_cents_text(str(val))
+
+
+# Statements repeat the same amounts (rent, HOA, autopays) many times
+@lru_cache(maxsize=8192)
+def _parse_cents_text(val: str) -> Optional[int]:
+    txt = val.strip()
+    if not txt:
+        return None
+    parts = _split_amount(txt)
+    if parts is None:
+        return None
+    neg, int_part, frac_part = parts
+    if len(frac_part) <= 2:
+        cents = int((int_part or '0') + frac_part.ljust(2, '0'))
+    else:
+        try:
+            dec = Decimal(f"{int_part or '0'}.{frac_part}")
+        except InvalidOperation:
+            return None
+        cents = int((dec * 100).quantize(Decimal(1), rounding=ROUND_HALF_EVEN))
+    return -cents if neg else cents
+
+
+@lru_cache(maxsize=8192)
+def canonical_amount(txt: str) -> Optional[str]:
+    """Render a raw amount the way normalized CSVs always have ('1500', '-1234.5', '0.1').
+
+    Built straight from the decoded digits, which matches the historical
+    float-based rendering for every amount with at most two decimals. Returns
+    None for anything else so callers can keep their legacy handling.
+    """
+    parts = _split_amount(txt)
+    if parts is None:
+        return None
+    neg, int_part, frac_part = parts
+    if len(frac_part) > 2:
+        return None
+    int_txt = int_part.lstrip('0') or '0'
+    if len(int_txt) > _MAX_EXACT_INT_DIGITS:
+        return None
+    frac_txt = frac_part.rstrip('0')
+    out = f"{int_txt}.{frac_txt}" if frac_txt else int_txt
+    if neg and out != '0':
+        out = '-' + out
+    return out
+
+
+def format_cents(cents: int) -> str:
+    """Inverse of parse_cents for canonical amounts: 1200 -> '12', -1250 -> '-12.5'."""
+    sign = '-' if cents < 0 else ''
+    whole, frac = divmod(abs(cents), 100)
+    if not frac:
+        return f"{sign}{whole}"
+    return f"{sign}{whole}.{frac:02d}".rstrip('0')
+
+
+def summary_cents(cents: Optional[int]) -> int:
+    """cents as the summaries count it: 0 when missing or outside int64 (SUMMARY_CENTS_LIMIT)."""
+    if cents is None or not -SUMMARY_CENTS_LIMIT < cents < SUMMARY_CENTS_LIMIT:
+        return 0
+    return cents
+
+
+def cents_to_float(cents: int) -> float:
+    return round(cents / 100, 2)
+
+
+def split_cents(cents: int, parts: int, offset: int = 0) -> List[int]:
+    """Split cents into `parts` integer shares that add back up to cents exactly.
+
+    The leftover cents go to consecutive shares starting at `offset`, so callers
+    can rotate them (e.g. by tr_id) instead of always favouring the first share.
+    """
+    if parts <= 1:
+        return [cents]
+    base, rem = divmod(cents, parts)
+    shares = [base] * parts
+    start = offset % parts
+    for i in range(rem):
+        shares[(start + i) % parts] += 1
+    return shares
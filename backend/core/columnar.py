@@ -0,0 +1,149 @@
+"""Columnar (NumPy) form of a list of transactions, for vectorized summaries.
+
+NumPy is optional: `np` is None when it is not installed, and callers keep the
+row-by-row path. Text columns are stored as categorical codes into a per-column
+vocabulary of normalized (stripped, lowercased) values, with code 0 always
+meaning ''. Normalizing and parsing happen once per distinct value, not per row.
+"""
+from operator import attrgetter
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from .amounts import parse_cents, summary_cents
+from .records import Transaction
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+# Columns kept as categorical codes
+CATEGORY_FIELDS = ('property', 'group', 'company', 'tax_category', 'transaction_type')
+
+
+def available() -> bool:
+    return np is not None
+
+
+def _encode(values: Sequence[str], normalize: Callable[[str], Any]) -> Tuple[Any, List[Any]]:
+    """Codes per value and the vocabulary of normalized values (code 0 is the empty value)."""
+    distinct = list(dict.fromkeys(values))
+    lookup = {v: i for i, v in enumerate(distinct)}
+    codes = np.fromiter(map(lookup.__getitem__, values), dtype=np.int32, count=len(values))
+    vocab: List[Any] = [normalize('')]
+    index: Dict[Any, int] = {vocab[0]: 0}
+    remap = np.empty(len(distinct), dtype=np.int32)
+    for i, v in enumerate(distinct):
+        key = normalize(v)
+        code = index.get(key)
+        if code is None:
+            code = index[key] = len(vocab)
+            vocab.append(key)
+        remap[i] = code
+    return remap[codes], vocab
+
+
+def parse_cents_array(values: Sequence[str]) -> Any:
+    """summary_cents(parse_cents(v)) over a column, as int64 cents.
+
+    Plain ASCII decimals with at most two places (what normalization writes)
+    are decoded digit by digit straight into integer cents, one byte column at
+    a time; anything else goes through parse_cents.
+    """
+    n = len(values)
+    out = np.zeros(n, dtype=np.int64)
+    if not n:
+        return out
+    try:
+        lengths = np.fromiter(map(len, values), dtype=np.int64, count=n)
+        raw = np.array(values, dtype='S')
+    except (TypeError, UnicodeEncodeError):
+        # None and non-ASCII values become a lone NUL, which is left to parse_cents
+        text = [v if isinstance(v, str) and v.isascii() else '\0' for v in values]
+        lengths = np.fromiter(map(len, text), dtype=np.int64, count=n)
+        raw = np.array(text, dtype='S')
+    chars = raw.view(np.uint8).reshape(n, raw.itemsize)
+    plain = np.char.str_len(raw) == lengths  # no NUL bytes
+    digits = np.zeros(n, dtype=np.int64)
+    decimals = np.zeros(n, dtype=np.int64)
+    dots = np.zeros(n, dtype=np.int64)
+    ended = np.zeros(n, dtype=bool)
+    for j in range(raw.itemsize):
+        c = chars[:, j]
+        pad = c == 0
+        digit = (c - 48) < 10  # uint8 wraps below '0'
+        dot = c == 46
+        allowed = digit | dot | pad | (c == 45) if j == 0 else digit | dot | pad
+        plain &= allowed & (pad | ~ended)
+        ended |= pad
+        decimals += digit & (dots > 0)
+        dots += dot
+        digits += digit
+        np.copyto(out, out * 10 + (c - 48), where=digit)
+    scale = 2 - decimals
+    # int64 holds any 18-digit number of cents
+    plain &= (dots <= 1) & (scale >= 0) & (digits > 0) & (digits + scale <= 18)
+    out = np.where(plain, out * 10 ** np.maximum(scale, 0), 0)
+    out = np.where(chars[:, 0] == 45, -out, out)
+    for i in np.nonzero(~plain & (lengths > 0))[0].tolist():
+        out[i] = summary_cents(parse_cents(values[i]))
+    return out
+
+
+def _norm(v: str) -> str:
+    return (v or '').strip().lower()
+
+
+class TransactionColumns:
+    """One account's transactions as parallel arrays.
+
+    cents          int64 credit in cents (0 when empty, not a number or beyond int64)
+    date           int32 codes into dates, the distinct raw date strings
+    codes[field]   int32 codes into vocab[field] for each CATEGORY_FIELDS column
+    tr_id          the raw tr_ids (see share_offsets)
+    description    the raw descriptions, for per-row output such as the reverse map
+    """
+
+    __slots__ = ('size', 'cents', 'date', 'dates', 'codes', 'vocab', 'tr_id', 'description')
+
+    def __init__(self, rows: Sequence[Transaction]) -> None:
+        self.size = len(rows)
+        self.cents = parse_cents_array(list(map(attrgetter('credit'), rows)))
+        self.date, self.dates = _encode(list(map(attrgetter('date'), rows)), lambda v: (v or '').strip())
+        self.codes: Dict[str, Any] = {}
+        self.vocab: Dict[str, List[str]] = {}
+        for name in CATEGORY_FIELDS:
+            self.codes[name], self.vocab[name] = _encode(list(map(attrgetter(name), rows)), _norm)
+        self.tr_id = list(map(attrgetter('tr_id'), rows))
+        self.description = list(map(attrgetter('description'), rows))
+
+    def code(self, name: str, value: str) -> int:
+        """Code of a normalized value in a category column; -1 when no row has it."""
+        try:
+            return self.vocab[name].index(value)
+        except ValueError:
+            return -1
+
+    def share_offsets(self, idx: Any, parts: int) -> Any:
+        """Group-split offsets (tr_id read as hex, as in the row-by-row path) of rows idx, modulo parts."""
+        return np.fromiter((_hex_mod(self.tr_id[i], parts) for i in idx.tolist()), dtype=np.int64, count=len(idx))
+
+
+def _hex_mod(tr_id: str, modulus: int) -> int:
+    try:
+        return int(str(tr_id or '0'), 16) % modulus
+    except ValueError:
+        return 0
+
+
+def group_sum(keys: Any, weights: Any, size: int) -> Any:
+    """Sum int64 weights per key in [0, size) (vectorized group-by)."""
+    out = np.zeros(size, dtype=np.int64)
+    np.add.at(out, keys, weights)
+    return out
+
+
+def split_shares(cents: Any, parts: int, offset: Any) -> List[Any]:
+    """Vectorized core.amounts.split_cents: the `parts` share arrays for each credit."""
+    base, rem = np.divmod(cents, parts)
+    start = offset % parts
+    return [base + (((i - start) % parts) < rem) for i in range(parts)]
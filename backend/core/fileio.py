@@ -0,0 +1,38 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+# Process umask as recorded by read_umask() at startup
+_UMASK: Optional[int] = None
+_DEFAULT_UMASK = 0o022
+
+
+def read_umask() -> int:
+    """Record the process umask for temp_path().
+
+    os.umask can only be read by setting it, so call this once at startup, before
+    any other thread creates files.
+    """
+    global _UMASK
+    mask = os.umask(_DEFAULT_UMASK)
+    os.umask(mask)
+    _UMASK = mask
+    return mask
+
+
+def temp_path(path: Path) -> Path:
+    """A new, uniquely named temp file next to path, so concurrent writers of path never share one.
+
+    mkstemp creates it 0600; it takes path's mode when path exists and the usual
+    umask-based mode otherwise, so swapping it in with os.replace leaves the same
+    permissions an in-place write would.
+    """
+    fd, name = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix='.tmp')
+    os.close(fd)
+    try:
+        shutil.copymode(path, name)
+    except OSError:
+        os.chmod(name, 0o666 & ~(_UMASK if _UMASK is not None else _DEFAULT_UMASK))
+    return Path(name)
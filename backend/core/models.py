@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import Dict, List
 
 class Property(BaseModel):
     property: str = Field(..., description="Unique property identifier")
@@ -64,3 +64,5 @@ class ClassifyRuleRecord(BaseModel):
 
 class ClassifyRuleRecordOut(ClassifyRuleRecord):
     usedcount: int = Field(0, description="Number of times this rule matched in the latest classification run")
+    last_matched: str = Field('', description="Date of the latest transaction this rule matched, over all years")
+    usedcount_by_year: Dict[str, int] = Field(default_factory=dict, description="Matches per year")
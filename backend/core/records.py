@@ -0,0 +1,180 @@
+import csv
+import gc
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+import yaml
+
+from .amounts import parse_cents
+from .fileio import temp_path
+
+# Column order of processed CSVs (and of the transaction rows served by the API)
+TRANSACTION_FIELDS: Tuple[str, ...] = (
+    'tr_id', 'date', 'description', 'credit', 'ruleid', 'comment', 'transaction_type', 'tax_category',
+    'property', 'group', 'company', 'otherentity', 'override', 'fromaddendum',
+)
+_FIELD_SET = frozenset(TRANSACTION_FIELDS)
+
+
+class Transaction:
+    """One transaction row from normalization through classification, summaries and the API.
+
+    Slotted (no per-row dict): a year of processed rows is held as these instead of
+    14-key dicts. Fields are always strings, as in the CSV files. get() and item
+    access by column name keep code written against csv.DictReader rows working.
+    The credit is also carried as integer cents (see cents).
+    """
+
+    __slots__ = TRANSACTION_FIELDS + ('_cents', '_cents_of')
+
+    def __init__(
+        self, tr_id: str = '', date: str = '', description: str = '', credit: str = '', ruleid: str = '',
+        comment: str = '', transaction_type: str = '', tax_category: str = '', property: str = '',
+        group: str = '', company: str = '', otherentity: str = '', override: str = '', fromaddendum: str = '',
+    ) -> None:
+        self.tr_id = tr_id
+        self.date = date
+        self.description = description
+        self.credit = credit
+        self.ruleid = ruleid
+        self.comment = comment
+        self.transaction_type = transaction_type
+        self.tax_category = tax_category
+        self.property = property
+        self.group = group
+        self.company = company
+        self.otherentity = otherentity
+        self.override = override
+        self.fromaddendum = fromaddendum
+        self._cents_of: Optional[str] = None
+
+    @property
+    def cents(self) -> Optional[int]:
+        """credit in integer cents (None when empty or not a number).
+
+        Decoded on first use and kept with the row, so classification, the
+        processed sort and the summaries share one decode; assigning a new
+        credit decodes again.
+        """
+        if self._cents_of is not self.credit:
+            self._cents = parse_cents(self.credit)
+            self._cents_of = self.credit
+        return self._cents
+
+    @classmethod
+    def from_mapping(cls, d: Mapping[str, Any]) -> 'Transaction':
+        return cls(*(_text(d.get(k)) for k in TRANSACTION_FIELDS))
+
+    def get(self, key: str, default: Any = '') -> Any:
+        return getattr(self, key) if key in _FIELD_SET else default
+
+    def __getitem__(self, key: str) -> str:
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        setattr(self, key, _text(value))
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Transaction) and self.values() == other.values()
+
+    def __repr__(self) -> str:
+        return f"Transaction({', '.join(f'{k}={getattr(self, k)!r}' for k in TRANSACTION_FIELDS if getattr(self, k))})"
+
+    def values(self) -> Tuple[str, ...]:
+        """Field values in TRANSACTION_FIELDS order (a processed CSV row)."""
+        return (
+            self.tr_id, self.date, self.description, self.credit, self.ruleid, self.comment,
+            self.transaction_type, self.tax_category, self.property, self.group, self.company,
+            self.otherentity, self.override, self.fromaddendum,
+        )
+
+    def to_dict(self) -> Dict[str, str]:
+        return dict(zip(TRANSACTION_FIELDS, self.values()))
+
+
+def _text(v: Any) -> str:
+    return '' if v is None else str(v)
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    """Hold off cyclic GC while building rows.
+
+    Rows and their interned tails hold only strings, so they never form cycles,
+    but the collections triggered while a year of them is built keep re-walking
+    the rows already made; on a million rows that costs more than parsing them.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def read_transactions(path: Path) -> List[Transaction]:
+    """Read a normalized, addendum or processed CSV; columns it lacks are left empty."""
+    with path.open('r', newline='', encoding='utf-8') as f, _gc_paused():
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return []
+        width = len(header)
+        out: List[Transaction] = []
+        if tuple(header) == TRANSACTION_FIELDS:
+            # Dates and the rule-derived columns repeat across rows; keep one copy of each
+            dates: Dict[str, str] = {}
+            tails: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+            for row in reader:
+                if len(row) != width:
+                    if row:
+                        out.append(_from_short(row, header))
+                    continue
+                tail = tuple(row[4:])
+                date = row[1]
+                out.append(Transaction(
+                    row[0], dates.setdefault(date, date), row[2], row[3], *tails.setdefault(tail, tail)
+                ))
+            return out
+        # Map each Transaction field to its column (or to a padded empty cell)
+        cols = [header.index(k) if k in header else width for k in TRANSACTION_FIELDS]
+        for row in reader:
+            if not row:
+                continue
+            padded = (row + [''] * width)[:width] + ['']
+            out.append(Transaction(*(padded[i] for i in cols)))
+        return out
+
+
+def _from_short(row: List[str], header: List[str]) -> Transaction:
+    return Transaction.from_mapping(dict(zip(header, row)))
+
+
+def read_transactions_yaml(path: Path) -> List[Transaction]:
+    """Read a legacy processed YAML list."""
+    with path.open('r', encoding='utf-8') as f:
+        data = yaml.safe_load(f) or []
+    if not isinstance(data, list):
+        return []
+    return [Transaction.from_mapping(item) for item in data if isinstance(item, dict)]
+
+
+def write_transactions(path: Path, rows: Iterable[Transaction]) -> None:
+    """Write rows as a processed CSV (header TRANSACTION_FIELDS), replacing path atomically."""
+    tmp = temp_path(path)
+    try:
+        with tmp.open('w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(TRANSACTION_FIELDS)
+            writer.writerows(r.values() for r in rows)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
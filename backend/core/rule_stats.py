@@ -0,0 +1,108 @@
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+import os
+import yaml
+
+from .fileio import temp_path
+
+# Rule usage lives next to the per-year folders: ACCOUNTS_DIR/rule_stats/<bankaccountname>.yaml
+STATS_DIR_NAME = 'rule_stats'
+
+
+def pattern_key(pattern_match_logic: Any) -> str:
+    """Stats key of a rule: its pattern_match_logic, whitespace-collapsed and lowercased."""
+    return ' '.join(str(pattern_match_logic or '').split()).lower()
+
+
+def rule_key(rule: Dict[str, Any]) -> str:
+    """Stats key of a rule: the fields that identify it within a bank, as in generate_bank_rules.py.
+
+    Rules sharing a pattern but differing in type, property, group, tax category or other entity
+    are counted separately.
+    """
+    def norm(value: Any) -> str:
+        return str(value or '').strip().lower()
+    return '|'.join([
+        norm(rule.get('transaction_type')),
+        norm(rule.get('property')),
+        norm(rule.get('group')),
+        pattern_key(rule.get('pattern_match_logic')),
+        norm(rule.get('tax_category')),
+        str(rule.get('otherentity') or '').strip(),
+    ])
+
+
+def stats_path(accounts_dir: Optional[Path], bankaccountname: str) -> Optional[Path]:
+    if not accounts_dir:
+        return None
+    return accounts_dir / STATS_DIR_NAME / f"{bankaccountname}.yaml"
+
+
+def load_rule_stats(path: Optional[Path]) -> Optional[Dict[str, Dict[str, Dict[str, Any]]]]:
+    """Read a stats file as {rule key: {year: {'hits': n, 'last_matched': 'YYYY-MM-DD'}}}; None when missing."""
+    if not path:
+        return None
+    try:
+        with path.open('r', encoding='utf-8') as f:
+            data = yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return None
+    except Exception:
+        return {}
+    out: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    if isinstance(data, dict):
+        for key, years in data.items():
+            if isinstance(years, dict):
+                out[str(key)] = {str(y): v for y, v in years.items() if isinstance(v, dict)}
+    return out
+
+
+def save_year_stats(path: Optional[Path], year: str, usage: Iterable[Tuple[str, int, str]]) -> bool:
+    """Replace one year's usage in a stats file with (rule key, hits, last matched date) entries.
+
+    Other years are kept. The file is only rewritten when its content changes;
+    returns True when it was.
+    """
+    if not path or not year:
+        return False
+    year = str(year)
+    current = load_rule_stats(path) or {}
+    merged: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for key, years in current.items():
+        rest = {y: v for y, v in years.items() if y != year}
+        if rest:
+            merged[key] = rest
+    for key, hits, last in usage:
+        if hits <= 0:
+            continue
+        entry = merged.setdefault(key, {}).setdefault(year, {'hits': 0, 'last_matched': ''})
+        entry['hits'] += int(hits)
+        entry['last_matched'] = max(entry['last_matched'], last or '')
+    if merged == current:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = temp_path(path)
+    try:
+        with tmp.open('w', encoding='utf-8') as f:
+            yaml.safe_dump(merged, f, sort_keys=True, allow_unicode=True)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return True
+
+
+def usage_for(stats: Dict[str, Dict[str, Dict[str, Any]]], rule: Dict[str, Any], year: str) -> Dict[str, Any]:
+    """Usage of one rule as shown by the API: usedcount for `year`, last_matched over all years, per-year hits.
+
+    Stats files written before usage was keyed by rule identity hold pattern keys; those are
+    used only when the rule has no entry of its own.
+    """
+    years = stats.get(rule_key(rule)) or stats.get(pattern_key(rule.get('pattern_match_logic'))) or {}
+    by_year = {y: int(v.get('hits', 0) or 0) for y, v in years.items()}
+    last = max((str(v.get('last_matched') or '') for v in years.values()), default='')
+    return {
+        'usedcount': by_year.get(str(year), 0),
+        'last_matched': last,
+        'usedcount_by_year': by_year,
+    }
@@ -0,0 +1,294 @@
+"""Expression form of a bank rule's pattern_match_logic.
+
+    desc_contains="amazon" AND NOT desc_regex="refund|return"
+    (credit_between=-2000..-1500 OR credit_equals=-1234.56) AND date_between=2024-01-01..2024-06-30
+    desc_startswith='zelle from' AND date_between=12-15..01-15
+
+Predicates:
+    desc_contains="text"       lowercased description contains text
+    desc_startswith="text"     lowercased description starts with text
+    desc_regex="pattern"       case-insensitive regular expression search
+    credit_equals=N            credit within CREDIT_TOLERANCE_CENTS of N
+    credit_between=A..B        A <= credit <= B; either end may be left open
+    date_between=D1..D2        inclusive; YYYY-MM-DD dates, or MM-DD for a window
+                               that repeats every year (may wrap past new year)
+
+Predicates combine with NOT, AND, OR (in decreasing precedence, case-insensitive)
+and parentheses. String values must be quoted; a backslash escapes a quote or a
+backslash, and desc_regex patterns are otherwise kept as written. Text that does
+not parse this way keeps the original meaning of pattern_match_logic (see
+core/rules.py), and so does a lone desc_contains, desc_startswith or credit_equals
+predicate: `desc_contains="foo"` still matches the quotes. Wrap a lone predicate
+in parentheses to have it read as an expression.
+
+Expressions are compiled into nested closures `(desc_lower, credit_cents, date) -> bool`
+that short-circuit like Python's and/or.
+"""
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+
+from .amounts import parse_cents
+
+# credit_equals matches within this many cents
+CREDIT_TOLERANCE_CENTS = 10
+
+Evaluator = Callable[[str, Optional[int], str], bool]
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<lparen>\()
+  | (?P<rparen>\))
+  | (?P<eq>=)
+  | (?P<range>\.\.)
+  | (?P<str>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<date>\d{4}-\d{2}-\d{2}|\d{2}-\d{2}(?!\d))
+  | (?P<num>[-+]?(?:\d+(?:\.\d+)?|\.\d+))
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+""", re.VERBOSE)
+_KEYWORDS = ('and', 'or', 'not')
+_STRING_FIELDS = ('desc_contains', 'desc_startswith', 'desc_regex')
+_UNESCAPE_RE = re.compile(r"""\\([\\"'])""")
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Pred:
+    field: str
+    value: Union[str, int, Tuple[Optional[object], Optional[object]]]
+
+
+@dataclass(frozen=True)
+class And:
+    items: Tuple['Node', ...]
+
+
+@dataclass(frozen=True)
+class Or:
+    items: Tuple['Node', ...]
+
+
+@dataclass(frozen=True)
+class Not:
+    item: 'Node'
+
+
+Node = Union[Pred, And, Or, Not]
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    tokens: List[Tuple[str, str]] = []
+    pos = 0
+    while pos < len(text):
+        m = _TOKEN_RE.match(text, pos)
+        if m is None:
+            raise ExpressionError(f"Unexpected character at {pos}: {text[pos]!r}")
+        pos = m.end()
+        kind = m.lastgroup
+        if kind == 'ws':
+            continue
+        val = m.group()
+        if kind == 'name' and val.lower() in _KEYWORDS:
+            kind, val = val.lower(), val.lower()
+        tokens.append((kind, val))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens: List[Tuple[str, str]]) -> None:
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> str:
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else ''
+
+    def take(self, kind: str) -> str:
+        if self.peek() != kind:
+            raise ExpressionError(f"Expected {kind} at token {self.pos}")
+        val = self.tokens[self.pos][1]
+        self.pos += 1
+        return val
+
+    def parse(self) -> Node:
+        node = self.parse_or()
+        if self.pos != len(self.tokens):
+            raise ExpressionError(f"Unexpected token at {self.pos}")
+        return node
+
+    def parse_or(self) -> Node:
+        items = [self.parse_and()]
+        while self.peek() == 'or':
+            self.pos += 1
+            items.append(self.parse_and())
+        return items[0] if len(items) == 1 else Or(tuple(items))
+
+    def parse_and(self) -> Node:
+        items = [self.parse_not()]
+        while self.peek() == 'and':
+            self.pos += 1
+            items.append(self.parse_not())
+        return items[0] if len(items) == 1 else And(tuple(items))
+
+    def parse_not(self) -> Node:
+        if self.peek() == 'not':
+            self.pos += 1
+            return Not(self.parse_not())
+        if self.peek() == 'lparen':
+            self.pos += 1
+            node = self.parse_or()
+            self.take('rparen')
+            return node
+        return self.parse_pred()
+
+    def parse_pred(self) -> Pred:
+        field = self.take('name').lower()
+        self.take('eq')
+        if field in _STRING_FIELDS:
+            raw = self.take('str')[1:-1]
+            if field == 'desc_regex':
+                # Passed to re as written; re reads an escaped quote as the quote itself
+                text = raw
+                try:
+                    re.compile(text)
+                except re.error as e:
+                    raise ExpressionError(f"Invalid desc_regex: {e}") from e
+                return Pred(field, text)
+            text = _UNESCAPE_RE.sub(r"\1", raw)
+            return Pred(field, text.lower())
+        if field == 'credit_equals':
+            return Pred(field, self.cents())
+        if field == 'credit_between':
+            lo = self.cents() if self.peek() == 'num' else None
+            self.take('range')
+            hi = self.cents() if self.peek() == 'num' else None
+            if lo is None and hi is None:
+                raise ExpressionError("credit_between needs at least one bound")
+            return Pred(field, (lo, hi))
+        if field == 'date_between':
+            lo = self.take('date') if self.peek() == 'date' else None
+            self.take('range')
+            hi = self.take('date') if self.peek() == 'date' else None
+            if lo is None and hi is None:
+                raise ExpressionError("date_between needs at least one bound")
+            if lo is not None and hi is not None and len(lo) != len(hi):
+                raise ExpressionError("date_between bounds must both be YYYY-MM-DD or both MM-DD")
+            if len(lo or hi or '') == 5 and (lo is None or hi is None):
+                raise ExpressionError("MM-DD windows need both bounds")
+            return Pred(field, (lo, hi))
+        raise ExpressionError(f"Unknown predicate {field}")
+
+    def cents(self) -> int:
+        cents = parse_cents(self.take('num'))
+        if cents is None:
+            raise ExpressionError("Invalid amount")
+        return cents
+
+
+@lru_cache(maxsize=4096)
+def parse_expression(text: str) -> Optional[Node]:
+    """Parse pattern_match_logic as an expression; None when it is not one."""
+    try:
+        tokens = _tokenize(text)
+        if not tokens:
+            return None
+        return _Parser(tokens).parse()
+    except ExpressionError:
+        return None
+
+
+def compile_expression(node: Node) -> Evaluator:
+    """Compile an expression tree into a single closure over (desc_lower, credit_cents, date)."""
+    if isinstance(node, And):
+        fn = compile_expression(node.items[0])
+        for item in node.items[1:]:
+            fn = _and(fn, compile_expression(item))
+        return fn
+    if isinstance(node, Or):
+        fn = compile_expression(node.items[0])
+        for item in node.items[1:]:
+            fn = _or(fn, compile_expression(item))
+        return fn
+    if isinstance(node, Not):
+        inner = compile_expression(node.item)
+        return lambda d, c, t: not inner(d, c, t)
+    return _compile_pred(node)
+
+
+def _and(a: Evaluator, b: Evaluator) -> Evaluator:
+    return lambda d, c, t: a(d, c, t) and b(d, c, t)
+
+
+def _or(a: Evaluator, b: Evaluator) -> Evaluator:
+    return lambda d, c, t: a(d, c, t) or b(d, c, t)
+
+
+def _compile_pred(pred: Pred) -> Evaluator:
+    field, value = pred.field, pred.value
+    if field == 'desc_contains':
+        return lambda d, c, t: value in d
+    if field == 'desc_startswith':
+        return lambda d, c, t: d.startswith(value)
+    if field == 'desc_regex':
+        search = re.compile(value, re.IGNORECASE).search
+        return lambda d, c, t: search(d) is not None
+    if field == 'credit_equals':
+        return lambda d, c, t: c is not None and abs(c - value) < CREDIT_TOLERANCE_CENTS
+    if field == 'credit_between':
+        lo, hi = value
+        if lo is None:
+            return lambda d, c, t: c is not None and c <= hi
+        if hi is None:
+            return lambda d, c, t: c is not None and lo <= c
+        return lambda d, c, t: c is not None and lo <= c <= hi
+    # date_between; dates are ISO (YYYY-MM-DD) strings, so string comparison orders them
+    lo, hi = value
+    if len(lo or hi) == 5:
+        if lo <= hi:
+            return lambda d, c, t: lo <= t[5:10] <= hi if t else False
+        return lambda d, c, t: (t[5:10] >= lo or t[5:10] <= hi) if t else False
+    if lo is None:
+        return lambda d, c, t: bool(t) and t[:10] <= hi
+    if hi is None:
+        return lambda d, c, t: bool(t) and lo <= t[:10]
+    return lambda d, c, t: bool(t) and lo <= t[:10] <= hi
+
+
+def required_literals(node: Node) -> Optional[List[Tuple[str, str]]]:
+    """Literals at least one of which a description must have for node to match.
+
+    Returns ('contains' | 'startswith', literal) alternatives, or None when no such
+    necessary condition exists (e.g. under NOT or for amount/date-only clauses).
+    Used to index expression rules alongside plain ones.
+    """
+    if isinstance(node, Pred):
+        if node.field == 'desc_contains' and node.value:
+            return [('contains', node.value)]
+        if node.field == 'desc_startswith' and node.value:
+            return [('startswith', node.value)]
+        return None
+    if isinstance(node, And):
+        options = [req for req in (required_literals(i) for i in node.items) if req]
+        return min(options, key=len) if options else None
+    if isinstance(node, Or):
+        out: List[Tuple[str, str]] = []
+        for item in node.items:
+            req = required_literals(item)
+            if not req:
+                return None
+            out.extend(req)
+        return out
+    return None
+
+
+def iter_predicates(node: Node) -> Iterator[Pred]:
+    if isinstance(node, Pred):
+        yield node
+    elif isinstance(node, (And, Or)):
+        for item in node.items:
+            yield from iter_predicates(item)
+    elif isinstance(node, Not):
+        yield from iter_predicates(node.item)
@@ -0,0 +1,431 @@
+import csv
+import hashlib
+import json
+import os
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import yaml
+
+from .amounts import parse_cents
+from .fileio import temp_path
+from .ruleexpr import (
+    CREDIT_TOLERANCE_CENTS, Evaluator, Node, Pred, compile_expression, iter_predicates, parse_expression, required_literals,
+)
+from .textmatch import AhoCorasick, PrefixTrie
+
+# Each predicate is introduced by its keyword anywhere in pattern_match_logic; the value runs to end of line
+_DESC_CONTAINS_RE = re.compile(r"desc_contains\s*=\s*(.+)", re.IGNORECASE)
+_DESC_STARTSWITH_RE = re.compile(r"desc_startswith\s*=\s*(.+)", re.IGNORECASE)
+_CREDIT_EQUALS_RE = re.compile(r"credit_equals\s*=\s*([-+]?[0-9]*\.?[0-9]+)", re.IGNORECASE)
+# A pattern that is one of these predicates and nothing else keeps its original meaning,
+# even when it would also parse as an expression (e.g. desc_contains="foo" matches the quotes)
+_LEGACY_PREDICATE_RE = re.compile(r"\s*(?:desc_contains|desc_startswith|credit_equals)\s*=(.*)", re.IGNORECASE | re.DOTALL)
+_PREDICATE_NAME_RE = re.compile(
+    r"\b(?:desc_contains|desc_startswith|desc_regex|credit_equals|credit_between|date_between)\s*=", re.IGNORECASE,
+)
+# Single-predicate expressions that map onto CompiledRule's literal attributes
+_LITERAL_FIELDS = {'desc_contains': 'contains', 'desc_startswith': 'startswith', 'credit_equals': 'credit_cents'}
+# Below this many literals a plain scan (C-level `in`/startswith) beats the pure-Python automaton
+INDEX_MIN_PATTERNS = 32
+
+
+def rule_order(rule: Dict[str, Any]) -> int:
+    try:
+        return int(rule.get('order') or 0)
+    except Exception:
+        return 0
+
+
+class CompiledRule:
+    """One bank rule with its pattern_match_logic compiled.
+
+    pattern_match_logic written as an expression (see core/ruleexpr.py) becomes the
+    `expr` closure. Otherwise it is parsed into literal predicates and the rule
+    matches when any of them does: the lowercased description contains `contains`,
+    starts with `startswith`, or the credit is within CREDIT_TOLERANCE_CENTS of
+    `credit_cents`. A lone desc_contains, desc_startswith or credit_equals predicate
+    is always read the original way, so its value is matched as written, quotes included.
+    """
+
+    __slots__ = ('order', 'rule', 'contains', 'startswith', 'credit_cents', 'expr', 'node', 'required')
+
+    def __init__(self, rule: Dict[str, Any]) -> None:
+        self.rule = rule
+        self.order = rule_order(rule)
+        patt = str(rule.get('pattern_match_logic', ''))
+        self.contains: Optional[str] = None
+        self.startswith: Optional[str] = None
+        self.credit_cents: Optional[int] = None
+        self.expr: Optional[Evaluator] = None
+        self.node: Optional[Node] = None
+        # For expressions: literals one of which the description must have, when there are any
+        self.required: Optional[List[Tuple[str, str]]] = None
+        node = None if _is_legacy_predicate(patt) else parse_expression(patt.strip())
+        if isinstance(node, Pred) and node.field in _LITERAL_FIELDS and (node.value or node.field == 'credit_equals'):
+            # A single plain predicate stays a literal so it is indexed exactly
+            setattr(self, _LITERAL_FIELDS[node.field], node.value)
+            return
+        if node is not None:
+            self.node = node
+            self.expr = compile_expression(node)
+            self.required = required_literals(node)
+            return
+        m = _DESC_CONTAINS_RE.search(patt)
+        if m and m.group(1).strip():
+            self.contains = m.group(1).strip().lower()
+        m = _DESC_STARTSWITH_RE.search(patt)
+        if m and m.group(1).strip():
+            self.startswith = m.group(1).strip().lower()
+        m = _CREDIT_EQUALS_RE.search(patt)
+        if m:
+            self.credit_cents = parse_cents(m.group(1))
+
+    def matches(self, desc_lower: str, credit_cents: Optional[int], date: str = '') -> bool:
+        if self.expr is not None:
+            return self.expr(desc_lower, credit_cents, date)
+        if self.contains is not None and self.contains in desc_lower:
+            return True
+        if self.startswith is not None and desc_lower.startswith(self.startswith):
+            return True
+        if self.credit_cents is not None and credit_cents is not None:
+            return abs(credit_cents - self.credit_cents) < CREDIT_TOLERANCE_CENTS
+        return False
+
+
+def _is_legacy_predicate(patt: str) -> bool:
+    """True when patt is a single desc_contains/desc_startswith/credit_equals predicate with no other predicate after it."""
+    m = _LEGACY_PREDICATE_RE.fullmatch(patt)
+    return m is not None and _PREDICATE_NAME_RE.search(m.group(1)) is None
+
+
+class CompiledRuleSet:
+    """A bank's rules sorted by `order` and compiled once; first match by order wins.
+
+    With enough literals the rules are indexed: desc_contains literals go into an
+    Aho-Corasick automaton, desc_startswith literals into a prefix trie, and
+    credit_equals amounts into a sorted array searched with bisect. Each index
+    yields rule positions; the lowest position (i.e. lowest order, ties in file
+    order) over all of them is the match, exactly as the linear scan would find it.
+    Expression rules are indexed under their required literals and verified on a
+    hit; expressions without one are evaluated for every row.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]]) -> None:
+        self.rules: List[Dict[str, Any]] = sorted(rules, key=rule_order)
+        self.compiled: List[CompiledRule] = [CompiledRule(r) for r in self.rules]
+        contains = [(cr.contains, pos) for pos, cr in enumerate(self.compiled) if cr.contains is not None]
+        starts = [(cr.startswith, pos) for pos, cr in enumerate(self.compiled) if cr.startswith is not None]
+        # Expression rules: indexed hits only make them candidates, checked with their closure
+        self._verify: List[bool] = [cr.expr is not None for cr in self.compiled]
+        self._always: List[int] = []
+        for pos, cr in enumerate(self.compiled):
+            if cr.expr is None:
+                continue
+            if not cr.required:
+                self._always.append(pos)
+                continue
+            for kind, literal in cr.required:
+                (contains if kind == 'contains' else starts).append((literal, pos))
+        # credit_equals amount -> ascending positions of the rules using it
+        credit_positions: Dict[int, List[int]] = {}
+        for pos, cr in enumerate(self.compiled):
+            if cr.credit_cents is not None:
+                credit_positions.setdefault(cr.credit_cents, []).append(pos)
+        self._indexed = len(contains) + len(starts) + len(credit_positions) >= INDEX_MIN_PATTERNS
+        self._contains = AhoCorasick(contains) if self._indexed and contains else None
+        self._starts = PrefixTrie(starts) if self._indexed and starts else None
+        self._credit_cents: List[int] = sorted(credit_positions)
+        self._credit_pos: List[List[int]] = [credit_positions[c] for c in self._credit_cents]
+        self._signature: Optional[str] = None
+        self._credit_breaks, self.uses_date = _credit_breaks_and_dates(self.compiled)
+
+    def __len__(self) -> int:
+        return len(self.compiled)
+
+    @property
+    def signature(self) -> str:
+        """Digest of the rules' content in order, ignoring usedcount."""
+        if self._signature is None:
+            payload = json.dumps(
+                [{k: v for k, v in r.items() if k != 'usedcount'} for r in self.rules],
+                sort_keys=True, default=str,
+            )
+            self._signature = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        return self._signature
+
+    def first_difference(self, other: 'CompiledRuleSet') -> int:
+        """Lowest position where the two rulesets differ (ignoring usedcount); len() when identical."""
+        n = min(len(self.rules), len(other.rules))
+        for pos in range(n):
+            a, b = self.rules[pos], other.rules[pos]
+            if a is b:
+                continue
+            if {k: v for k, v in a.items() if k != 'usedcount'} != {k: v for k, v in b.items() if k != 'usedcount'}:
+                return pos
+        return n
+
+    def credit_bucket(self, credit_cents: Optional[int]) -> int:
+        """Bucket of credit_cents such that every credit in a bucket matches the same rules."""
+        if credit_cents is None:
+            return -1
+        return bisect_right(self._credit_breaks, credit_cents)
+
+    def first_match(
+        self, desc_lower: str, credit_cents: Optional[int], date: str = '', start: int = 0,
+    ) -> Optional[CompiledRule]:
+        """First rule by order that matches, considering only positions >= start."""
+        pos = self.first_position(desc_lower, credit_cents, date, start)
+        return self.compiled[pos] if pos < len(self.compiled) else None
+
+    def first_position(self, desc_lower: str, credit_cents: Optional[int], date: str = '', start: int = 0) -> int:
+        """Position of the first matching rule at or after start; len(self) when none matches."""
+        if not self._indexed:
+            for pos, cr in enumerate(self.compiled[start:] if start else self.compiled, start):
+                if cr.matches(desc_lower, credit_cents, date):
+                    return pos
+            return len(self.compiled)
+        best = len(self.compiled)
+        verify = self._verify
+        candidates: List[int] = []
+        if self._contains is not None:
+            for pos in self._contains.iter_values(desc_lower):
+                if start <= pos < best:
+                    if verify[pos]:
+                        candidates.append(pos)
+                    else:
+                        best = pos
+        if self._starts is not None:
+            for pos in self._starts.iter_values(desc_lower):
+                if start <= pos < best:
+                    if verify[pos]:
+                        candidates.append(pos)
+                    else:
+                        best = pos
+        if credit_cents is not None and self._credit_cents:
+            # amounts strictly within the tolerance window around credit_cents
+            lo = bisect_left(self._credit_cents, credit_cents - CREDIT_TOLERANCE_CENTS + 1)
+            hi = bisect_right(self._credit_cents, credit_cents + CREDIT_TOLERANCE_CENTS - 1)
+            for positions in self._credit_pos[lo:hi]:
+                i = bisect_left(positions, start) if start else 0
+                if i < len(positions) and positions[i] < best:
+                    best = positions[i]
+        if self._always:
+            i = bisect_left(self._always, start) if start else 0
+            candidates.extend(self._always[i:bisect_left(self._always, best)])
+        if candidates:
+            for pos in sorted(set(candidates)):
+                if pos >= best:
+                    break
+                if self.compiled[pos].expr(desc_lower, credit_cents, date):
+                    best = pos
+                    break
+        return best
+
+
+def _credit_breaks_and_dates(compiled: List[CompiledRule]) -> Tuple[List[int], bool]:
+    """Sorted amounts where some rule's credit condition can flip, and whether any rule looks at dates."""
+    tol = CREDIT_TOLERANCE_CENTS - 1
+    breaks = set()
+    uses_date = False
+    for cr in compiled:
+        if cr.credit_cents is not None:
+            breaks.update((cr.credit_cents - tol, cr.credit_cents + tol + 1))
+        if cr.node is None:
+            continue
+        for pred in iter_predicates(cr.node):
+            if pred.field == 'credit_equals':
+                breaks.update((pred.value - tol, pred.value + tol + 1))
+            elif pred.field == 'credit_between':
+                lo, hi = pred.value
+                if lo is not None:
+                    breaks.add(lo)
+                if hi is not None:
+                    breaks.add(hi + 1)
+            elif pred.field == 'date_between':
+                uses_date = True
+    return sorted(breaks), uses_date
+
+
+_MISSING = object()
+
+
+MemoKey = Tuple[str, str, int, str]
+
+
+class RuleMatchMemo:
+    """Bounded LRU memo of first-match results, shared by every account and call.
+
+    Keyed by (ruleset signature, lowercased description, credit bucket, date when
+    the ruleset has date clauses). Credit buckets split amounts only where some
+    rule's outcome can change, so a memoized result is exact, and any ruleset
+    edit changes the signature. Descriptions that recur across months and
+    accounts (autopays, HOA drafts, mortgage payments) are then matched once.
+
+    A process pool worker's memo is its own copy: track_new()/take_new() collect
+    the entries it adds so the parent can merge() them.
+    """
+
+    def __init__(self, maxsize: int = 100_000) -> None:
+        self.maxsize = max(0, maxsize)
+        self.hits = 0
+        self.misses = 0
+        self._data: 'OrderedDict[MemoKey, int]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._new: Optional[List[Tuple[MemoKey, int]]] = None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def resize(self, maxsize: int) -> None:
+        with self._lock:
+            self.maxsize = max(0, maxsize)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def first_match(
+        self, ruleset: CompiledRuleSet, desc_lower: str, credit_cents: Optional[int], date: str = '',
+    ) -> Optional[CompiledRule]:
+        """ruleset.first_match through the memo."""
+        pos = self.first_position(ruleset, desc_lower, credit_cents, date)
+        return ruleset.compiled[pos] if pos < len(ruleset.compiled) else None
+
+    def first_position(
+        self, ruleset: CompiledRuleSet, desc_lower: str, credit_cents: Optional[int], date: str = '',
+    ) -> int:
+        """ruleset.first_position through the memo."""
+        if not self.maxsize or not ruleset.compiled:
+            return ruleset.first_position(desc_lower, credit_cents, date)
+        key = (ruleset.signature, desc_lower, ruleset.credit_bucket(credit_cents), date if ruleset.uses_date else '')
+        with self._lock:
+            pos = self._data.get(key, _MISSING)
+            if pos is not _MISSING:
+                self._data.move_to_end(key)
+                self.hits += 1
+        if pos is _MISSING:
+            pos = ruleset.first_position(desc_lower, credit_cents, date)
+            with self._lock:
+                self.misses += 1
+                self._data[key] = pos
+                if len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                if self._new is not None:
+                    self._new.append((key, pos))
+        return pos
+
+    def track_new(self) -> None:
+        """Start collecting the entries added from now on (see take_new)."""
+        with self._lock:
+            self._new = []
+
+    def take_new(self) -> List[Tuple[MemoKey, int]]:
+        """Entries added since track_new(); stops collecting."""
+        with self._lock:
+            new, self._new = self._new or [], None
+        return new
+
+    def merge(self, entries: Iterable[Tuple[MemoKey, int]]) -> int:
+        """Add entries (e.g. from take_new() in a worker) as the most recent ones; returns how many."""
+        count = 0
+        with self._lock:
+            for key, pos in entries:
+                self._data[key] = pos
+                self._data.move_to_end(key)
+                count += 1
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return count
+
+    def save(self, path: Path) -> None:
+        """Write the memo (oldest first) so a restart can warm it with load()."""
+        with self._lock:
+            items = list(self._data.items())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = temp_path(path)
+        try:
+            with tmp.open('w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['ruleset', 'description', 'credit_bucket', 'date', 'position'])
+                for (sig, desc, bucket, date), pos in items:
+                    writer.writerow([sig, desc, bucket, date, pos])
+            os.replace(tmp, path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    def load(self, path: Path) -> int:
+        """Add entries saved by save(); returns how many were read."""
+        with path.open('r', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            return self.merge(((row[0], row[1], int(row[2]), row[3]), int(row[4])) for row in reader if len(row) == 5)
+
+
+# Process-wide memo used by classification; sized from RULE_MEMO_SIZE at startup
+RULE_MEMO = RuleMatchMemo()
+
+
+_RULESET_CACHE: Dict[str, CompiledRuleSet] = {}
+_RULESET_CACHE_MAX = 64
+
+
+def compile_rules_text(data: bytes) -> CompiledRuleSet:
+    """Compile a bank_rules YAML document, reusing the result for identical content."""
+    digest = hashlib.sha256(data).hexdigest()
+    cached = _RULESET_CACHE.get(digest)
+    if cached is not None:
+        return cached
+    try:
+        rules_raw = yaml.safe_load(data) or []
+        rules = [r for r in rules_raw if isinstance(r, dict)] if isinstance(rules_raw, list) else []
+    except Exception:
+        rules = []
+    ruleset = CompiledRuleSet(rules)
+    if len(_RULESET_CACHE) >= _RULESET_CACHE_MAX:
+        _RULESET_CACHE.clear()
+    _RULESET_CACHE[digest] = ruleset
+    return ruleset
+
+
+def compile_rule_list(rules: List[Dict[str, Any]]) -> CompiledRuleSet:
+    """Compile an in-memory rules list, reusing the result for identical content."""
+    payload = json.dumps(rules, sort_keys=True, default=str).encode('utf-8')
+    digest = 'list:' + hashlib.sha256(payload).hexdigest()
+    cached = _RULESET_CACHE.get(digest)
+    if cached is not None:
+        return cached
+    ruleset = CompiledRuleSet([r for r in rules if isinstance(r, dict)])
+    if len(_RULESET_CACHE) >= _RULESET_CACHE_MAX:
+        _RULESET_CACHE.clear()
+    _RULESET_CACHE[digest] = ruleset
+    return ruleset
+
+
+def load_compiled_rules(path: Optional[Path]) -> CompiledRuleSet:
+    """Compiled rules for a bank_rules YAML file (empty when missing or unreadable)."""
+    if not path:
+        return CompiledRuleSet([])
+    try:
+        data = path.read_bytes()
+    except Exception:
+        return CompiledRuleSet([])
+    return compile_rules_text(data)
@@ -0,0 +1,118 @@
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+
+class PrefixTrie:
+    """Character trie over literal prefixes.
+
+    iter_values(text) walks at most len(longest prefix) characters of text and
+    yields the value of every stored prefix that text starts with.
+    """
+
+    __slots__ = ('_root', '_size')
+
+    def __init__(self, items: Iterable[Tuple[str, Any]] = ()) -> None:
+        self._root: Dict[str, Any] = {}
+        self._size = 0
+        for word, value in items:
+            self.add(word, value)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, word: str, value: Any = True) -> None:
+        if not word:
+            return
+        node = self._root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node.setdefault('', []).append(value)
+        self._size += 1
+
+    def iter_values(self, text: str) -> Iterator[Any]:
+        node = self._root
+        for ch in text:
+            node = node.get(ch)
+            if node is None:
+                return
+            vals = node.get('')
+            if vals:
+                yield from vals
+
+    def matches(self, text: str) -> bool:
+        for _ in self.iter_values(text):
+            return True
+        return False
+
+
+class AhoCorasick:
+    """Multi-pattern substring automaton (goto/fail/output form).
+
+    iter_values(text) makes one pass over text and yields the value of every
+    stored pattern occurring in it, so the cost is O(len(text) + matches)
+    regardless of how many patterns were added.
+    """
+
+    __slots__ = ('_goto', '_fail', '_out', '_built')
+
+    def __init__(self, items: Iterable[Tuple[str, Any]] = ()) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[Any, ...]] = [()]
+        self._built = False
+        for word, value in items:
+            self.add(word, value)
+
+    def __len__(self) -> int:
+        return sum(1 for o in self._out if o)
+
+    def add(self, word: str, value: Any = True) -> None:
+        if not word:
+            return
+        state = 0
+        for ch in word:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+                self._goto[state][ch] = nxt
+            state = nxt
+        self._out[state] = self._out[state] + (value,)
+        self._built = False
+
+    def _build(self) -> None:
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+        for s in queue:
+            fail[s] = 0
+        while queue:
+            r = queue.popleft()
+            for ch, s in goto[r].items():
+                queue.append(s)
+                f = fail[r]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                nxt = goto[f].get(ch, 0)
+                fail[s] = nxt if nxt != s else 0
+                if out[fail[s]]:
+                    out[s] = out[s] + out[fail[s]]
+        self._built = True
+
+    def iter_values(self, text: str) -> Iterator[Any]:
+        if not self._built:
+            self._build()
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                yield from out[state]
+
+    def matches(self, text: str) -> bool:
+        for _ in self.iter_values(text):
+            return True
+        return False
@@ -0,0 +1,44 @@
+import asyncio
+import functools
+import threading
+from typing import Any, Awaitable, Callable, List
+
+# Held while a year's derived files are rewritten (normalized and processed CSVs, the
+# normalization manifest, .classify state, the tr_id index, the summaries): by each
+# statement watcher pass and by the API routes that edit statements, addenda,
+# transactions or rules. Passes run one at a time instead of interleaving writes.
+PROCESSING_LOCK = threading.Lock()
+# How often a waiting route retries the lock
+_LOCK_POLL_SECONDS = 0.05
+# Run under the lock around every locked route: each hook is called before the route and
+# returns a function called after it (the statement watcher uses this to skip the files
+# the route wrote, which the route has already processed)
+ROUTE_HOOKS: List[Callable[[], Callable[[], None]]] = []
+
+
+def processing_locked(route: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Run an async route while holding PROCESSING_LOCK.
+
+    The lock is waited for without blocking the event loop, and stays held across
+    the route's own awaits (e.g. run_in_threadpool), so other locked routes wait too.
+    """
+    @functools.wraps(route)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        while not PROCESSING_LOCK.acquire(blocking=False):
+            await asyncio.sleep(_LOCK_POLL_SECONDS)
+        afters: List[Callable[[], None]] = []
+        try:
+            for hook in list(ROUTE_HOOKS):
+                try:
+                    afters.append(hook())
+                except Exception:
+                    pass
+            return await route(*args, **kwargs)
+        finally:
+            for after in afters:
+                try:
+                    after()
+                except Exception:
+                    pass
+            PROCESSING_LOCK.release()
+    return wrapper
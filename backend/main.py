@@ -29,8 +29,12 @@ if __name__ == "__main__":
 from backend.bank_statement_parser import process_bank_statements_from_sources as process_bank_stmts
 from backend import load_entities as loaders
 from backend.classify import classify_all
-from backend.property_sum import prepare_and_save_property_sum
-from backend.company_sum import prepare_and_save_company_sum
+from backend.core import columnar
+from backend.core.fileio import read_umask
+from backend.core.rules import RULE_MEMO
+from backend.summaries import prepare_and_save_summaries
+from backend.tr_index import build_tr_index
+from backend.watcher import start_statement_watcher, stop_statement_watcher
 import uvicorn
 
 ALNUM_LOWER_RE = re.compile(r"^[a-z0-9]+$")
@@ -78,6 +82,20 @@ PROCESSED_DIR_PATH: Optional[Path] = None
 NORMALIZED_DIR_PATH: Optional[Path] = None
 ADDENDUM_DIR_PATH: Optional[Path] = None
 
+# Optional performance tuning (0 or 1 means serial)
+NORMALIZE_WORKERS: int = 0
+CLASSIFY_WORKERS: int = 0
+# Background watcher for statement_location trees: "" (off), "auto" (inotify, else polling) or "poll"
+WATCH_STATEMENTS: str = ""
+WATCH_DEBOUNCE_SECONDS: float = 2.0
+WATCH_POLL_SECONDS: float = 5.0
+# Entries in the cross-account rule match memo (0 disables it); RULE_MEMO_PERSIST keeps it across restarts
+RULE_MEMO_SIZE: int = 100_000
+RULE_MEMO_PERSIST: bool = False
+RULE_MEMO_FILE = 'rule_memo.csv'
+# Compute summaries with NumPy group-bys over a columnar store (needs numpy)
+SUMMARY_COLUMNAR: bool = False
+
 # Companies list loaded from env
 COMPANIES: List[str] = []
 
@@ -247,6 +265,8 @@ def _init_fs_and_env() -> Path:
     env_path = project_root / ".env"
     load_dotenv(env_path)
     logger.info(f"ENV path: {env_path} exists={env_path.exists()}")
+    # Read while startup is still single-threaded; temp files swapped into place use it
+    read_umask()
     return project_root
 
 
@@ -283,6 +303,61 @@ def _read_mandatory_envs() -> None:
     logger.info(f"CURRENT_YEAR={CURRENT_YEAR}")
 
 
+def _read_int_env(name: str, default: int) -> int:
+    raw = (os.getenv(name, "") or "").strip()
+    if not raw:
+        return default
+    if raw.lower() == "auto":
+        return os.cpu_count() or default
+    try:
+        return max(0, int(raw))
+    except ValueError:
+        logger.error(f"Invalid {name}={raw!r}; using {default}")
+        return default
+
+
+def _read_float_env(name: str, default: float) -> float:
+    raw = (os.getenv(name, "") or "").strip()
+    if not raw:
+        return default
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        logger.error(f"Invalid {name}={raw!r}; using {default}")
+        return default
+
+
+def _read_optional_envs() -> None:
+    global NORMALIZE_WORKERS, CLASSIFY_WORKERS, WATCH_STATEMENTS, WATCH_DEBOUNCE_SECONDS, WATCH_POLL_SECONDS
+    global RULE_MEMO_SIZE, RULE_MEMO_PERSIST, SUMMARY_COLUMNAR
+    NORMALIZE_WORKERS = _read_int_env("NORMALIZE_WORKERS", 0)
+    logger.info(f"NORMALIZE_WORKERS={NORMALIZE_WORKERS}")
+    CLASSIFY_WORKERS = _read_int_env("CLASSIFY_WORKERS", 0)
+    logger.info(f"CLASSIFY_WORKERS={CLASSIFY_WORKERS}")
+    watch = (os.getenv("WATCH_STATEMENTS", "") or "").strip().lower()
+    if watch in ("1", "true", "yes", "on", "inotify"):
+        watch = "auto"
+    elif watch in ("0", "false", "no", "off"):
+        watch = ""
+    if watch not in ("", "auto", "poll"):
+        logger.error(f"Invalid WATCH_STATEMENTS={watch!r}; watcher disabled")
+        watch = ""
+    WATCH_STATEMENTS = watch
+    WATCH_DEBOUNCE_SECONDS = _read_float_env("WATCH_DEBOUNCE_SECONDS", 2.0)
+    WATCH_POLL_SECONDS = _read_float_env("WATCH_POLL_SECONDS", 5.0)
+    if WATCH_STATEMENTS:
+        logger.info(f"WATCH_STATEMENTS={WATCH_STATEMENTS} debounce={WATCH_DEBOUNCE_SECONDS}s poll={WATCH_POLL_SECONDS}s")
+    RULE_MEMO_SIZE = _read_int_env("RULE_MEMO_SIZE", 100_000)
+    RULE_MEMO_PERSIST = (os.getenv("RULE_MEMO_PERSIST", "") or "").strip().lower() in ("1", "true", "yes", "on")
+    RULE_MEMO.resize(RULE_MEMO_SIZE)
+    logger.info(f"RULE_MEMO_SIZE={RULE_MEMO_SIZE} persist={RULE_MEMO_PERSIST}")
+    SUMMARY_COLUMNAR = (os.getenv("SUMMARY_COLUMNAR", "") or "").strip().lower() in ("1", "true", "yes", "on")
+    if SUMMARY_COLUMNAR and not columnar.available():
+        logger.error("SUMMARY_COLUMNAR needs numpy (pip install numpy); computing summaries row by row")
+        SUMMARY_COLUMNAR = False
+    logger.info(f"SUMMARY_COLUMNAR={SUMMARY_COLUMNAR}")
+
+
 def _ensure_year_dirs() -> None:
     try:
         global PROCESSED_DIR_PATH, NORMALIZED_DIR_PATH, ADDENDUM_DIR_PATH
@@ -366,15 +441,49 @@ def _emit_yaml_snapshots() -> None:
 
 def _process_statements() -> None:
     try:
-        process_bank_stmts(BA_DB, BANKS_CFG_DB, CURRENT_YEAR, NORMALIZED_DIR_PATH, logger)
+        process_bank_stmts(BA_DB, BANKS_CFG_DB, CURRENT_YEAR, NORMALIZED_DIR_PATH, logger, workers=NORMALIZE_WORKERS)
     except Exception as e:
         logger.error(f"Failed processing bank statements from sources: {e}")
 
 
+def _build_tr_index() -> None:
+    try:
+        build_tr_index()
+    except Exception as e:
+        logger.error(f"Failed building tr_id index: {e}")
+
+
+def _rule_memo_path() -> Optional[Path]:
+    if not (RULE_MEMO_PERSIST and RULE_MEMO_SIZE and ACCOUNTS_DIR_PATH):
+        return None
+    return ACCOUNTS_DIR_PATH / 'rule_stats' / RULE_MEMO_FILE
+
+
+def _load_rule_memo() -> None:
+    path = _rule_memo_path()
+    if not path or not path.exists():
+        return
+    try:
+        logger.info(f"Loaded {RULE_MEMO.load(path)} rule memo entries from {path}")
+    except Exception as e:
+        logger.error(f"Failed loading rule memo {path}: {e}")
+
+
+def _save_rule_memo() -> None:
+    path = _rule_memo_path()
+    if not path:
+        return
+    try:
+        RULE_MEMO.save(path)
+    except Exception as e:
+        logger.error(f"Failed saving rule memo {path}: {e}")
+
+
 @app.on_event("startup")
 async def startup_event():
     _init_fs_and_env()
     _read_mandatory_envs()
+    _read_optional_envs()
     entities_dir = _resolve_entities_dir()
     _ensure_year_dirs()
     _compute_entity_paths(entities_dir)
@@ -382,21 +491,30 @@ async def startup_event():
     _load_manual_rules()
     _emit_yaml_snapshots()
     _process_statements()
+    _build_tr_index()
+    _load_rule_memo()
     # Classify all bank accounts based on normalized files and bank rules
     try:
-        classify_all()
+        classify_all(workers=CLASSIFY_WORKERS)
     except Exception as e:
         logger.error(f"Failed to classify on startup: {e}")
-    # Build initial rental summaries
-    try:
-        prepare_and_save_property_sum()
-    except Exception as e:
-        logger.error(f"Failed to build rental summary on startup: {e}")
-    # Build initial company summaries
+    _save_rule_memo()
+    # Build initial rental and company summaries
     try:
-        prepare_and_save_company_sum()
+        prepare_and_save_summaries()
     except Exception as e:
-        logger.error(f"Failed to build company summary on startup: {e}")
+        logger.error(f"Failed to build summaries on startup: {e}")
+    if WATCH_STATEMENTS:
+        try:
+            start_statement_watcher(WATCH_STATEMENTS, WATCH_DEBOUNCE_SECONDS, WATCH_POLL_SECONDS)
+        except Exception as e:
+            logger.error(f"Failed to start statement watcher: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    stop_statement_watcher()
+    _save_rule_memo()
 
 
 # Minimal SPA fallback for Classify Rules client routes
@@ -1,137 +1,60 @@
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, Optional
 from datetime import datetime, date
-import csv
+import hashlib
 import yaml
 
 from . import main as state
+from .aggregate import SummaryAggregates, aggregate_processed
+from .core.amounts import cents_to_float
 
+# sha256 of the content last written to each rentalsummary_reverse file
+_WRITTEN_REVERSE: Dict[Path, str] = {}
 
-def _read_processed_csv(path: Path) -> List[Dict[str, Any]]:
-    rows: List[Dict[str, Any]] = []
-    try:
-        with path.open('r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                rows.append({
-                    'date': row.get('date',''),
-                    'description': row.get('description',''),
-                    'credit': row.get('credit',''),
-                    'transaction_type': row.get('transaction_type',''),
-                    'tax_category': row.get('tax_category',''),
-                    'property': row.get('property',''),
-                    'group': row.get('group',''),
-                })
-    except Exception:
-        state.logger.exception(f"Failed reading processed CSV: {path}")
-    return rows
 
+def build_property_summary(agg: SummaryAggregates) -> Dict[str, Dict[str, float]]:
+    """
+    Rental summary per property in dollars: the aggregated totals by transaction_type
+    with rent adjusted for the management company's share, depreciation and profit.
+    """
+    summary: Dict[str, Dict[str, float]] = {
+        p: {t: cents_to_float(c) for t, c in totals.items()} for p, totals in agg.rental.items()
+    }
 
-def _read_processed_yaml(path: Path) -> List[Dict[str, Any]]:
-    rows: List[Dict[str, Any]] = []
+    # Adjust rent using property management company rentPercentage
     try:
-        with path.open('r', encoding='utf-8') as f:
-            data = yaml.safe_load(f) or []
-            if isinstance(data, list):
-                for item in data:
-                    if isinstance(item, dict):
-                        rows.append({
-                            'date': item.get('date',''),
-                            'description': item.get('description',''),
-                            'credit': item.get('credit',''),
-                            'transaction_type': item.get('transaction_type',''),
-                            'tax_category': item.get('tax_category',''),
-                            'property': item.get('property',''),
-                            'group': item.get('group',''),
-                        })
+        rent_from_company(summary)
     except Exception:
-        pass
-    return rows
+        state.logger.exception("rent_from_company failed")
 
+    # Augment summary with depreciation numbers before dumping
+    try:
+        calculate_depreciation(summary)
+    except Exception:
+        state.logger.exception("calculate_depreciation failed")
 
-def _to_float(val: Any) -> float:
+    # Compute profit per property
     try:
-        s = str(val).strip()
-        if not s:
-            return 0.0
-        return round(float(s), 2)
+        calculate_profit(summary)
     except Exception:
-        return 0.0
+        state.logger.exception("calculate_profit failed")
+    return summary
 
 
-def prepare_and_save_property_sum() -> None:
+def prepare_and_save_property_sum(agg: Optional[SummaryAggregates] = None) -> Optional[Dict[str, Dict[str, float]]]:
     """
     Build rental summary per property by summing credits by transaction_type for
     transactions with tax_category == 'rental'.
     Writes one YAML file per property at ACCOUNTS_DIR/CURRENT_YEAR/rentalsummary/<property>.yaml
-    with a mapping { transaction_type: total }.
+    with a mapping { transaction_type: total }, and returns the summary for the
+    company summary to use.
+    `agg` is a scan already made by aggregate_processed(); without it the processed files are read.
     """
-    if not state.ACCOUNTS_DIR_PATH or not state.CURRENT_YEAR:
-        return
-    base_processed: Path = state.PROCESSED_DIR_PATH
-    if not base_processed:
-        return
-
-    summary: Dict[str, Dict[str, float]] = {}
-    # reverse map: property -> transaction_type -> list of {bankaccountname, description, credit}
-    reverse_map: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
-
-    # Iterate all bank accounts from state to know filenames
-    for ba in list(state.BA_DB.keys()):
-        py = base_processed / f"{ba}.yaml"
-        if py.exists():
-            rows = _read_processed_yaml(py)
-        else:
-            pc = base_processed / f"{ba}.csv"
-            rows = _read_processed_csv(pc) if pc.exists() else []
-        for r in rows:
-            try:
-                if (r.get('tax_category') or '').strip().lower() != 'rental':
-                    continue
-                tx_type = (r.get('transaction_type') or '').strip().lower()
-                if not tx_type:
-                    continue
-                credit = _to_float(r.get('credit'))
-                desc = (r.get('description') or '').strip()
-                props: List[str] = []
-                prop = (r.get('property') or '').strip().lower()
-                grp = (r.get('group') or '').strip().lower()
-                if prop:
-                    props = [prop]
-                elif grp:
-                    try:
-                        grp_rec = state.GROUP_DB.get(grp) or {}
-                        props = [ (p or '').strip().lower() for p in (grp_rec.get('propertylist') or []) if (p or '').strip() ]
-                    except Exception:
-                        props = []
-                if not props:
-                    continue
-                # If this row points to a group, split the credit equally across all properties
-                # Otherwise (single property), use the full credit
-                share = 0.0
-                try:
-                    share = credit if (prop and len(props) == 1) else (credit / float(len(props)))
-                except Exception:
-                    share = 0.0
-                for p in props:
-                    if not p:
-                        continue
-                    if p not in summary:
-                        summary[p] = {}
-                    summary[p][tx_type] = summary[p].get(tx_type, 0.0) + share
-                    # build reverse map entry
-                    if p not in reverse_map:
-                        reverse_map[p] = {}
-                    if tx_type not in reverse_map[p]:
-                        reverse_map[p][tx_type] = []
-                    reverse_map[p][tx_type].append({
-                        'bankaccountname': ba,
-                        'description': desc,
-                        'credit': round(share, 2),
-                    })
-            except Exception:
-                state.logger.exception("Error while aggregating rental summary row")
-                continue
+    if agg is None:
+        agg = aggregate_processed()
+    if agg is None:
+        return None
+    reverse_map = agg.reverse
 
     # Ensure rentalsummary dir
     out_dir: Path = state.ACCOUNTS_DIR_PATH / state.CURRENT_YEAR / 'rentalsummary'
@@ -141,25 +64,9 @@ def prepare_and_save_property_sum() -> None:
         rev_dir.mkdir(parents=True, exist_ok=True)
     except Exception:
         state.logger.exception("Failed to create rentalsummary directories")
-        return
+        return None
 
-    # Adjust rent using property management company rentPercentage
-    try:
-        rent_from_company(summary)
-    except Exception:
-        state.logger.exception("rent_from_company failed")
-
-    # Augment summary with depreciation numbers before dumping
-    try:
-        calculate_depreciation(summary)
-    except Exception:
-        state.logger.exception("calculate_depreciation failed")
-
-    # Compute profit per property
-    try:
-        calculate_profit(summary)
-    except Exception:
-        state.logger.exception("calculate_profit failed")
+    summary = build_property_summary(agg)
 
     # Dump one YAML per property and corresponding reverse map
     for p, totals in summary.items():
@@ -169,14 +76,21 @@ def prepare_and_save_property_sum() -> None:
             out_path = out_dir / f"{p}.yaml"
             with out_path.open('w', encoding='utf-8') as yf:
                 yaml.safe_dump(ordered, yf, sort_keys=True, allow_unicode=True)
-            # dump reverse map for this property (keep list order as encountered)
+            # dump reverse map for this property (keep list order as encountered);
+            # a file whose content is unchanged since we last wrote it is left alone
             rev = reverse_map.get(p) or {}
             rev_out = rev_dir / f"{p}.yaml"
+            rev_text = yaml.safe_dump(rev, sort_keys=True, allow_unicode=True)
+            digest = hashlib.sha256(rev_text.encode('utf-8')).hexdigest()
+            if _WRITTEN_REVERSE.get(rev_out) == digest and rev_out.exists():
+                continue
             with rev_out.open('w', encoding='utf-8') as rf:
-                yaml.safe_dump(rev, rf, sort_keys=True, allow_unicode=True)
+                rf.write(rev_text)
+            _WRITTEN_REVERSE[rev_out] = digest
         except Exception:
             state.logger.exception(f"Failed to write rentalsummary YAML for {p}")
             continue
+    return summary
 
 
 def calculate_depreciation(summary: Dict[str, Dict[str, float]]):
@@ -4,11 +4,13 @@ from typing import Dict
 from pathlib import Path
 import csv
 import hashlib
+import io
 
 from .. import main as state
 from .. import classify as classifier
-from ..property_sum import prepare_and_save_property_sum
-from ..company_sum import prepare_and_save_company_sum
+from ..summaries import prepare_and_save_summaries
+from ..tr_index import SOURCE_ADDENDUM, get_tr_index
+from ..locks import processing_locked
 
 router = APIRouter(prefix="/api", tags=["addendum"]) 
 
@@ -18,6 +20,7 @@ class AddendumRow(BaseModel):
     credit: str
 
 @router.post("/addendum/{bankaccountname}")
+@processing_locked
 async def add_addendum_row(bankaccountname: str, payload: AddendumRow) -> Dict[str, str]:
     bank = (bankaccountname or '').strip().lower()
     if not bank:
@@ -45,24 +48,37 @@ async def add_addendum_row(bankaccountname: str, payload: AddendumRow) -> Dict[s
         s = (bank + (payload.date or '') + (payload.description or '') + tr_credit).lower()
         s = ''.join(s.split())
         tr_id = hashlib.sha256(s.encode()).hexdigest()[:10]
-        # Enforce uniqueness by tr_id only
-        if file_exists:
+        # Enforce uniqueness by tr_id only (indexed lookup; full scan if no index is available)
+        index = get_tr_index()
+        if index is not None:
+            if index.contains(tr_id, bank, SOURCE_ADDENDUM):
+                raise HTTPException(status_code=409, detail="Duplicate addendum row (tr_id already exists)")
+        elif file_exists:
             with out_path.open('r', encoding='utf-8') as rf:
                 reader = csv.DictReader(rf)
                 for row in reader:
                     existing_tr_id = (row.get('tr_id') or '').strip()
                     if existing_tr_id and existing_tr_id == tr_id:
                         raise HTTPException(status_code=409, detail="Duplicate addendum row (tr_id already exists)")
-        with out_path.open('a', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=['tr_id','date','description','credit'])
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow({
-                'tr_id': tr_id,
-                'date': payload.date or '',
-                'description': (payload.description or ''),
-                'credit': tr_credit,
-            })
+        # Format the new lines first and append them as bytes, so the index gets the row's byte offset
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=['tr_id','date','description','credit'])
+        if not file_exists:
+            writer.writeheader()
+        header_bytes = len(buf.getvalue().encode('utf-8'))
+        writer.writerow({
+            'tr_id': tr_id,
+            'date': payload.date or '',
+            'description': (payload.description or ''),
+            'credit': tr_credit,
+        })
+        with out_path.open('ab') as f:
+            row_offset = f.tell() + header_bytes
+            f.write(buf.getvalue().encode('utf-8'))
+        if index is not None:
+            index.append(bank, SOURCE_ADDENDUM, tr_id, row_offset)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to write addendum CSV: {e}")
 
@@ -73,11 +89,7 @@ async def add_addendum_row(bankaccountname: str, payload: AddendumRow) -> Dict[s
         # Do not fail request on classifier errors
         pass
     try:
-        prepare_and_save_property_sum()
-    except Exception:
-        pass
-    try:
-        prepare_and_save_company_sum()
+        prepare_and_save_summaries()
     except Exception:
         pass
     return {"ok": "true", "path": str(out_path)}
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from typing import List
 from pathlib import Path
 import csv
@@ -6,9 +7,10 @@ import csv
 from .. import main as state
 from ..core.models import BankAccountRecord
 from ..core.utils import dump_yaml_entities
-from ..bank_statement_parser import _normalize_date, _process_bank_statement_for_account
+from ..bank_statement_parser import StatementValidationError, ingest_statement_stream
 from ..classify import classify_bank
 from ..property_sum import prepare_and_save_property_sum
+from ..locks import processing_locked
 
 router = APIRouter(prefix="/api", tags=["bankaccounts"])
 
@@ -159,6 +161,7 @@ async def delete_bankaccount(bankaccountname: str):
 
 
 @router.post("/bankaccounts/{bankaccountname}/upload-statement")
+@processing_locked
 async def upload_bank_statement(bankaccountname: str, file: UploadFile = File(...)):
     key = (bankaccountname or '').strip().lower()
     if not key or key not in state.BA_DB:
@@ -172,93 +175,28 @@ async def upload_bank_statement(bankaccountname: str, file: UploadFile = File(..
     if not cfg:
         raise HTTPException(status_code=400, detail=f"Missing bank config for {bankname}")
 
-    # Read uploaded CSV into memory as text
+    # Stream the upload in chunks into a temp file next to
+    # statement_location/CURRENT_YEAR/bank_stmts/<bankaccountname>.csv while validating that
+    # every row belongs to CURRENT_YEAR and building its normalized CSV in the same scan.
+    # The first bad row aborts the upload and nothing is replaced.
+    dest_path = Path(stmt_loc).expanduser().resolve() / str(state.CURRENT_YEAR) / 'bank_stmts' / f"{key}.csv"
+    normalized_dir = state.NORMALIZED_DIR_PATH
     try:
-        raw = await file.read()
-        text = raw.decode('utf-8')
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to read uploaded file: {e}")
-
-    # Parse CSV using bank config and validate dates belong to CURRENT_YEAR
-    delim = (cfg.get('delim') or ',')
-    starts = cfg.get('ignore_lines_startswith') or []
-    contains = cfg.get('ignore_lines_contains') or []
-    columns_list = cfg.get('columns') or []
-    colmap = {}
-    for entry in columns_list:
-        if isinstance(entry, dict) and entry:
-            colmap = entry
-            break
-    date_idx = int(colmap.get('date') or 0)
-    if not date_idx:
-        raise HTTPException(status_code=400, detail="Bank config is missing date column index")
-    raw_fmt = (cfg.get('date_format') or '').strip()
-    year_expected = str(state.CURRENT_YEAR)
-
-    # Filter lines according to ignore rules
-    filtered_lines = []
-    for raw_line in text.splitlines():
-        line = raw_line.rstrip('\n')
-        if not line.strip():
-            continue
-        skip = False
-        for s in starts:
-            try:
-                if s and line.startswith(s):
-                    skip = True; break
-            except Exception:
-                continue
-        if skip:
-            continue
-        for c in contains:
-            try:
-                if c and (c in line):
-                    skip = True; break
-            except Exception:
-                continue
-        if skip:
-            continue
-        filtered_lines.append(line)
-
-    # Validate year on each row
-    try:
-        reader = csv.reader(filtered_lines, delimiter=delim)
-        row_idx = 0
-        for parts in reader:
-            row_idx += 1
-            if not parts:
-                continue
-            parts = [p.strip() for p in parts]
-            if date_idx <= 0:
-                continue
-            date_val = parts[date_idx-1] if len(parts) >= date_idx else ''
-            date_out = _normalize_date(date_val, raw_fmt)
-            # Expect date_out like YYYY-MM-DD; validate year
-            if not date_out or len(date_out) < 4 or date_out[:4] != year_expected:
-                raise HTTPException(status_code=400, detail=f"Row {row_idx}: date not in CURRENT_YEAR {year_expected}: '{date_val}' -> '{date_out}'")
-    except HTTPException:
-        raise
-    except Exception as e:
+        await file.seek(0)
+        await run_in_threadpool(
+            ingest_statement_stream, key, cfg, file.file, dest_path, normalized_dir, str(state.CURRENT_YEAR), state.logger,
+        )
+    except StatementValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except csv.Error as e:
         raise HTTPException(status_code=400, detail=f"Failed to parse CSV: {e}")
-
-    # Save file to statement_location/CURRENT_YEAR/bank_stmts/<bankaccountname>.csv
-    try:
-        dest_dir = Path(stmt_loc).expanduser().resolve() / str(state.CURRENT_YEAR) / 'bank_stmts'
-        dest_dir.mkdir(parents=True, exist_ok=True)
-        dest_path = dest_dir / f"{key}.csv"
-        with dest_path.open('w', encoding='utf-8', newline='') as wf:
-            wf.write(text)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save uploaded file: {e}")
 
-    # After saving the raw statement, prepare normalized CSV and classify
+    # Classify this bank account using the freshly normalized data
     try:
-        normalized_dir = state.NORMALIZED_DIR_PATH
         if not normalized_dir:
             raise RuntimeError("NORMALIZED_DIR_PATH is not configured")
-        # Build normalized CSV for this specific bank account
-        _process_bank_statement_for_account(key, cfg, dest_path, normalized_dir, state.logger)
-        # Classify this bank account using the freshly normalized data
         classify_bank(key)
         # Recompute per-property rental summaries after classification
         try:
@@ -1,13 +1,15 @@
 from fastapi import APIRouter, HTTPException, Query
-from typing import List
+from typing import List, Optional
 
 from .. import main as state
 from .. import classify as classifier
-from ..property_sum import prepare_and_save_property_sum
-from ..company_sum import prepare_and_save_company_sum
+from ..summaries import prepare_and_save_summaries
 from ..core.models import ClassifyRuleRecord, ClassifyRuleRecordOut, InheritRuleRecord
 from pydantic import BaseModel
 from ..core.utils import dump_yaml_entities
+from ..core.rule_stats import load_rule_stats, stats_path, usage_for
+from ..core.rules import RULE_MEMO
+from ..locks import processing_locked
 from pathlib import Path
 import yaml
 
@@ -32,6 +34,12 @@ async def list_common_rules():
     return list(state.COMMON_RULES_DB.values())
 
 
+@router.get("/classify-memo")
+async def get_classify_memo_stats():
+    """Hit/miss counters and size of the cross-account rule match memo (this process)."""
+    return RULE_MEMO.stats()
+
+
 @router.get("/inherit-common-to-bank", response_model=List[InheritRuleRecord])
 async def list_inherit_common_to_bank():
     """Return derived inherit rules (built on startup)."""
@@ -76,6 +84,7 @@ async def get_bank_rules(bankaccountname: str = Query("")):
     rules_path: Path = _bank_rules_path_for(bank)
     if not rules_path.exists():
         return []
+    stats = load_rule_stats(stats_path(state.ACCOUNTS_DIR_PATH, bank))
     try:
         with rules_path.open('r', encoding='utf-8') as f:
             data = yaml.safe_load(f) or []
@@ -99,6 +108,9 @@ async def get_bank_rules(bankaccountname: str = Query("")):
                 'order': int(item.get('order', 0) or 0),
                 'usedcount': int(item.get('usedcount', 0) or 0),
             }
+            # Usage comes from the rule stats store; usedcount in older rule files is the fallback
+            if stats is not None:
+                rec.update(usage_for(stats, rec, state.CURRENT_YEAR))
             out.append(rec)
         return out
     except Exception:
@@ -148,21 +160,51 @@ def _read_bank_rules_list(bank: str):
 def _write_bank_rules_list(bank: str, items: list):
     path = _bank_rules_path_for(bank)
     path.parent.mkdir(parents=True, exist_ok=True)
+    # Usage counts are kept in the rule stats store, not in the rule file
+    items = [{k: v for k, v in it.items() if k != 'usedcount'} if isinstance(it, dict) else it for it in items]
     with path.open('w', encoding='utf-8') as f:
         yaml.safe_dump(items, f, sort_keys=True, allow_unicode=True)
 
 
-def _recompute(bank: str):
+def _with_usage(bank: str, rec: dict) -> dict:
+    stats = load_rule_stats(stats_path(state.ACCOUNTS_DIR_PATH, bank)) or {}
+    rec.update(usage_for(stats, rec, state.CURRENT_YEAR))
+    return rec
+
+
+def _recompute(bank: str, previous_rules: Optional[list] = None):
+    """Reclassify a bank after a rule edit and rebuild the summaries.
+
+    With the rules as they were before the edit, only rows the edit can affect are re-evaluated.
+    """
     try:
-        classifier.classify_bank(bank)
+        if previous_rules is None:
+            classifier.classify_bank(bank)
+        else:
+            classifier.reclassify_after_rule_edit(bank, previous_rules)
     except Exception:
         pass
     try:
-        prepare_and_save_property_sum()
+        prepare_and_save_summaries()
     except Exception:
         pass
+
+
+def _inheriting_banks() -> List[str]:
+    return sorted({(v or {}).get('bankaccountname') for v in state.INHERIT_RULES_DB.values()} & set(state.BA_DB.keys()))
+
+
+def _recompute_banks(banks: List[str]):
+    """Fully reclassify the given banks (after common or inherit rule changes) and rebuild the summaries."""
+    for bank in banks:
+        try:
+            classifier.classify_bank(bank)
+        except Exception:
+            pass
+    if not banks:
+        return
     try:
-        prepare_and_save_company_sum()
+        prepare_and_save_summaries()
     except Exception:
         pass
 
@@ -173,6 +215,7 @@ class UpdateOrderPayload(BaseModel):
 
 
 @router.post("/bank-rules/update-order")
+@processing_locked
 async def update_bank_rule_order(bankaccountname: str = Query(""), payload: UpdateOrderPayload = None):
     bank = (bankaccountname or '').strip().lower()
     if not bank:
@@ -194,7 +237,8 @@ async def update_bank_rule_order(bankaccountname: str = Query(""), payload: Upda
         raise HTTPException(status_code=400, detail="currentorder and updatedorder must be integers")
     if cur < 1 or new < 1:
         raise HTTPException(status_code=400, detail="orders must be >= 1")
-    items = [dict(x) for x in _read_bank_rules_list(bank)]
+    previous = _read_bank_rules_list(bank)
+    items = [dict(x) for x in previous]
     if not items:
         raise HTTPException(status_code=404, detail="No rules found for this bank")
     # Determine max order (>0)
@@ -231,7 +275,7 @@ async def update_bank_rule_order(bankaccountname: str = Query(""), payload: Upda
     for i, it in enumerate(items, start=1):
         it['order'] = i
     _write_bank_rules_list(bank, items)
-    _recompute(bank)
+    _recompute(bank, previous)
     return {"ok": True, "max_order": max_order}
 
 
@@ -253,6 +297,7 @@ def _rule_key(rec: dict) -> str:
 
 
 @router.post("/bank-rules", response_model=ClassifyRuleRecordOut, status_code=201)
+@processing_locked
 async def add_bank_rule(payload: ClassifyRuleRecord):
     bank = (payload.bankaccountname or '').strip().lower()
     ttype = (payload.transaction_type or '').strip().lower()
@@ -302,7 +347,8 @@ async def add_bank_rule(payload: ClassifyRuleRecord):
         'order': order,
         'usedcount': 0,
     }
-    items = [dict(x) for x in _read_bank_rules_list(bank) if isinstance(x, dict)]
+    previous = _read_bank_rules_list(bank)
+    items = [dict(x) for x in previous if isinstance(x, dict)]
     new_key = _rule_key(rec)
     # Map existing items by key for quick lookup
     key_to_item = { _rule_key(x): x for x in items }
@@ -352,18 +398,13 @@ async def add_bank_rule(payload: ClassifyRuleRecord):
         for idx, it in enumerate(merged_list, start=1):
             it['order'] = idx
         _write_bank_rules_list(bank, merged_list)
-        _recompute(bank)
-        return updated
+        _recompute(bank, previous)
+        return _with_usage(bank, updated)
 
     if new_key in key_to_item:
         # Update existing: keep original order, ignore payload order
         existing = key_to_item[new_key]
         rec['order'] = int(existing.get('order') or 0) or 1
-        # Preserve existing usedcount when updating an existing rule
-        try:
-            rec['usedcount'] = int(existing.get('usedcount', 0) or 0)
-        except Exception:
-            rec['usedcount'] = 0
         # Replace fields except we keep order as above
         key_to_item[new_key] = rec
         merged_list = list(key_to_item.values())
@@ -406,11 +447,12 @@ async def add_bank_rule(payload: ClassifyRuleRecord):
         it['order'] = idx
 
     _write_bank_rules_list(bank, merged_list)
-    _recompute(bank)
-    return rec
+    _recompute(bank, previous)
+    return _with_usage(bank, rec)
 
 
 @router.delete("/bank-rules", status_code=204)
+@processing_locked
 async def delete_bank_rule(
     bankaccountname: str = Query(""),
     transaction_type: str = Query(""),
@@ -462,7 +504,7 @@ async def delete_bank_rule(
     for idx, it in enumerate(remaining, start=1):
         it['order'] = idx
     _write_bank_rules_list(bank, remaining)
-    _recompute(bank)
+    _recompute(bank, items)
     return
 
 
@@ -471,6 +513,7 @@ async def delete_bank_rule(
 
 # Common Rules CRUD
 @router.post("/common-rules", response_model=ClassifyRuleRecord, status_code=201)
+@processing_locked
 async def add_common_rule(payload: ClassifyRuleRecord):
     ttype = (payload.transaction_type or "").strip().lower()
     patt = (payload.pattern_match_logic or "").strip()
@@ -492,10 +535,12 @@ async def add_common_rule(payload: ClassifyRuleRecord):
     if state.CLASSIFY_CSV_PATH:
         base_dir = state.CLASSIFY_CSV_PATH.parent
         dump_yaml_entities(base_dir / 'common_rules.yaml', list(state.COMMON_RULES_DB.values()), key_field='transaction_type')
+    _recompute_banks(_inheriting_banks())
     return rec
 
 
 @router.delete("/common-rules", status_code=204)
+@processing_locked
 async def delete_common_rule(
     transaction_type: str = Query(""),
     pattern_match_logic: str = Query("")
@@ -509,11 +554,13 @@ async def delete_common_rule(
     if state.CLASSIFY_CSV_PATH:
         base_dir = state.CLASSIFY_CSV_PATH.parent
         dump_yaml_entities(base_dir / 'common_rules.yaml', list(state.COMMON_RULES_DB.values()), key_field='transaction_type')
+    _recompute_banks(_inheriting_banks())
     return
 
 
 # Inherit Common To Bank CRUD
 @router.post("/inherit-common-to-bank", response_model=InheritRuleRecord, status_code=201)
+@processing_locked
 async def add_inherit_rule(payload: InheritRulePayload):
     bank = (payload.bankaccountname or "").strip().lower()
     tax = (payload.tax_category or "").strip().lower()
@@ -542,10 +589,12 @@ async def add_inherit_rule(payload: InheritRulePayload):
     if state.CLASSIFY_CSV_PATH:
         base_dir = state.CLASSIFY_CSV_PATH.parent
         dump_yaml_entities(base_dir / 'inherit_common_to_bank.yaml', list(state.INHERIT_RULES_DB.values()), key_field='bankaccountname')
+    _recompute_banks([bank] if bank in state.BA_DB else [])
     return rec
 
 
 @router.delete("/inherit-common-to-bank", status_code=204)
+@processing_locked
 async def delete_inherit_rule(
     bankaccountname: str = Query(""),
     property: str = Query(""),
@@ -565,4 +614,5 @@ async def delete_inherit_rule(
     if state.CLASSIFY_CSV_PATH:
         base_dir = state.CLASSIFY_CSV_PATH.parent
         dump_yaml_entities(base_dir / 'inherit_common_to_bank.yaml', list(state.INHERIT_RULES_DB.values()), key_field='bankaccountname')
+    _recompute_banks([bank] if bank in state.BA_DB else [])
     return
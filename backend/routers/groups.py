@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException
 from typing import List
 
 from .. import main as state
+from ..aggregate import mark_processed_changed
 from ..core.models import GroupRecord
 from ..core.utils import dump_yaml_entities
 import os
@@ -21,6 +22,8 @@ async def add_group(payload: GroupRecord):
     if key in state.GROUP_DB:
         raise HTTPException(status_code=409, detail="Group already exists")
     state.GROUP_DB[key] = {"groupname": key, "propertylist": [p.strip().lower() for p in payload.propertylist]}
+    # group rows now split across these properties
+    mark_processed_changed()
     # persist YAML
     try:
         if state.GROUPS_CSV_PATH:
@@ -36,6 +39,7 @@ async def delete_group(groupname: str):
     if key not in state.GROUP_DB:
         raise HTTPException(status_code=404, detail="Group not found")
     del state.GROUP_DB[key]
+    mark_processed_changed()
     # persist YAML
     try:
         if state.GROUPS_CSV_PATH:
@@ -1,93 +1,41 @@
 from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
-from datetime import datetime
 
 from .. import main as state
-from ..property_sum import _read_processed_csv, _read_processed_yaml, _to_float
+from ..aggregate import SummaryAggregates, aggregate_processed, data_version, processed_stamps
+from ..core.amounts import cents_to_float
 
 router = APIRouter(prefix="/api", tags=["rent-tracker"])
 
+# Materialized rent tracker: (processed dir, accounts, their data versions and processed
+# file stamps) -> response rows. Rebuilt only after classification output (or the groups) change.
+_VIEW: Optional[Tuple[Tuple[Any, ...], List[Dict[str, Any]]]] = None
+
 
 @router.get("/rent-tracker")
 async def get_rent_tracker() -> List[Dict[str, Any]]:
+    global _VIEW
     if not state.ACCOUNTS_DIR_PATH or not state.CURRENT_YEAR:
         raise HTTPException(status_code=500, detail="ACCOUNTS_DIR or CURRENT_YEAR is not configured")
     base_processed: Path = state.PROCESSED_DIR_PATH
     if not base_processed:
         raise HTTPException(status_code=500, detail="Processed directory is not configured")
 
-    summary: Dict[str, Dict[int, float]] = {}
+    accounts = list(state.BA_DB.keys())
+    # taken before reading, so a change made while the view is rebuilt invalidates it again
+    key = (str(base_processed), tuple(accounts), data_version(accounts), processed_stamps(base_processed, accounts))
+    view = _VIEW
+    if view is not None and view[0] == key:
+        return view[1]
+    out = _rent_matrix(aggregate_processed())
+    _VIEW = (key, out)
+    return out
+
 
-    for ba in list(state.BA_DB.keys()):
-        py = base_processed / f"{ba}.yaml"
-        if py.exists():
-            rows = _read_processed_yaml(py)
-        else:
-            pc = base_processed / f"{ba}.csv"
-            rows = _read_processed_csv(pc) if pc.exists() else []
-        for r in rows:
-            try:
-                tax = (r.get("tax_category") or "").strip().lower()
-                if tax != "rental":
-                    continue
-                tx = (r.get("transaction_type") or "").strip().lower()
-                if tx not in ("rent", "tenantfees"):
-                    continue
-                dt_raw = (r.get("date") or "").strip()
-                if not dt_raw:
-                    continue
-                month_idx = 0
-                try:
-                    # Parse the date and then shift rents on or after the 24th to the next month
-                    d = datetime.fromisoformat(dt_raw[:10])
-                except Exception:
-                    try:
-                        d = datetime.strptime(dt_raw[:10], "%Y-%m-%d")
-                    except Exception:
-                        continue
-                month_idx = d.month
-                try:
-                    day = d.day
-                    if day >= 24:
-                        # Move to next month; wrap December to January
-                        month_idx = 1 if month_idx == 12 else (month_idx + 1)
-                except Exception:
-                    pass
-                if month_idx < 1 or month_idx > 12:
-                    continue
-                credit = _to_float(r.get("credit"))
-                if credit == 0.0:
-                    continue
-                props: List[str] = []
-                prop = (r.get("property") or "").strip().lower()
-                grp = (r.get("group") or "").strip().lower()
-                if prop:
-                    props = [prop]
-                elif grp:
-                    try:
-                        grp_rec = state.GROUP_DB.get(grp) or {}
-                        props = [ (p or "").strip().lower() for p in (grp_rec.get("propertylist") or []) if (p or "").strip() ]
-                    except Exception:
-                        props = []
-                if not props:
-                    continue
-                share = 0.0
-                try:
-                    if prop and len(props) == 1:
-                        share = credit
-                    else:
-                        share = credit / float(len(props))
-                except Exception:
-                    share = 0.0
-                for p in props:
-                    if not p:
-                        continue
-                    if p not in summary:
-                        summary[p] = {}
-                    summary[p][month_idx] = summary[p].get(month_idx, 0.0) + share
-            except Exception:
-                continue
+def _rent_matrix(agg: Optional[SummaryAggregates]) -> List[Dict[str, Any]]:
+    # per property, per month totals in integer cents
+    summary: Dict[str, Dict[int, int]] = agg.rent_months if agg is not None else {}
 
     month_keys = {
         1: "jan", 2: "feb", 3: "mar", 4: "apr", 5: "may", 6: "jun",
@@ -98,8 +46,6 @@ async def get_rent_tracker() -> List[Dict[str, Any]]:
         row: Dict[str, Any] = {"property": prop}
         months = summary.get(prop) or {}
         for idx, key in month_keys.items():
-            val = float(months.get(idx, 0.0) or 0.0)
-            row[key] = round(val, 2) if val != 0.0 else 0.0
+            row[key] = cents_to_float(months.get(idx, 0))
         out.append(row)
-
     return out
@@ -5,6 +5,7 @@ from pydantic import BaseModel
 from .. import main as state
 from ..core.utils import dump_yaml_entities
 from ..core.models import TransactionTypeRecord
+from ..locks import processing_locked
 from .classify_rules import _read_bank_rules_list, _write_bank_rules_list, _recompute
 
 router = APIRouter(prefix="/api", tags=["transaction-types"])
@@ -45,6 +46,7 @@ class RenameTxTypePayload(BaseModel):
 
 
 @router.post("/transaction-types/rename")
+@processing_locked
 async def rename_transaction_type(payload: RenameTxTypePayload) -> Dict[str, Any]:
     old = (payload.from_type or "").strip().lower()
     new = (payload.to_type or "").strip().lower()
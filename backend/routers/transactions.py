@@ -4,11 +4,13 @@ from typing import List, Dict, Any
 
 from .. import main as state
 from .. import classify as classifier
-from ..property_sum import prepare_and_save_property_sum
-from ..company_sum import prepare_and_save_company_sum
+from ..aggregate import mark_processed_changed
+from ..summaries import prepare_and_save_summaries
+from ..tr_index import SOURCE_ADDENDUM, SOURCE_NORMALIZED, get_tr_index
+from ..core.records import Transaction, read_transactions, read_transactions_yaml, write_transactions
+from ..locks import processing_locked
 import csv
 from pathlib import Path
-import yaml
 
 router = APIRouter(prefix="/api", tags=["transactions"])
 
@@ -35,88 +37,29 @@ class TransactionsPayload(BaseModel):
 
 
 def _read_processed_csv(path: Path) -> List[Dict[str, Any]]:
-    rows: List[Dict[str, Any]] = []
     try:
-        with path.open('r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                # Normalize to expected keys; ignore extra
-                rows.append({
-                    'tr_id': row.get('tr_id',''),
-                    'date': row.get('date',''),
-                    'description': row.get('description',''),
-                    'credit': row.get('credit',''),
-                    'ruleid': row.get('ruleid',''),
-                    'comment': row.get('comment',''),
-                    'transaction_type': row.get('transaction_type',''),
-                    'tax_category': row.get('tax_category',''),
-                    'property': row.get('property',''),
-                    'group': row.get('group',''),
-                    'company': row.get('company',''),
-                    'otherentity': row.get('otherentity',''),
-                    'override': row.get('override',''),
-                    'fromaddendum': row.get('fromaddendum',''),
-                })
+        return [t.to_dict() for t in read_transactions(path)]
     except Exception:
         state.logger.exception(f"Failed reading processed CSV: {path}")
-    return rows
+        return []
 
 
 def _read_addendum_csv(path: Path) -> List[Dict[str, Any]]:
-    rows: List[Dict[str, Any]] = []
     try:
-        with path.open('r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                rows.append({
-                    'tr_id': row.get('tr_id',''),
-                    'date': row.get('date',''),
-                    'description': row.get('description',''),
-                    'credit': row.get('credit',''),
-                    'ruleid': '',
-                    'comment': '',
-                    'transaction_type': '',
-                    'tax_category': '',
-                    'property': '',
-                    'group': '',
-                    'company': '',
-                    'otherentity': '',
-                    'override': '',
-                    'fromaddendum': 'yes',
-                })
+        # Only the statement columns; the rest stay empty until classification
+        return [
+            Transaction(t.tr_id, t.date, t.description, t.credit, fromaddendum='yes').to_dict()
+            for t in read_transactions(path)
+        ]
     except Exception:
-        pass
-    return rows
+        return []
 
 
 def _read_processed_yaml(path: Path) -> List[Dict[str, Any]]:
-    rows: List[Dict[str, Any]] = []
     try:
-        with path.open('r', encoding='utf-8') as f:
-            data = yaml.safe_load(f) or []
-            if isinstance(data, list):
-                for item in data:
-                    if isinstance(item, dict):
-                        # Normalize to expected keys; ignore extra
-                        rows.append({
-                            'tr_id': item.get('tr_id',''),
-                            'date': item.get('date',''),
-                            'description': item.get('description',''),
-                            'credit': item.get('credit',''),
-                            'ruleid': item.get('ruleid',''),
-                            'comment': item.get('comment',''),
-                            'transaction_type': item.get('transaction_type',''),
-                            'tax_category': item.get('tax_category',''),
-                            'property': item.get('property',''),
-                            'group': item.get('group',''),
-                            'company': item.get('company',''),
-                            'otherentity': item.get('otherentity',''),
-                            'override': item.get('override',''),
-                            'fromaddendum': item.get('fromaddendum',''),
-                        })
+        return [t.to_dict() for t in read_transactions_yaml(path)]
     except Exception:
-        pass
-    return rows
+        return []
 
 
 @router.get("/transactions")
@@ -181,6 +124,7 @@ async def get_transactions(bankaccountname: str) -> Dict[str, Any]:
     return {"bankaccountname": key, "rows": rows}
 
 @router.post("/transactions/{bankaccountname}")
+@processing_locked
 async def save_transactions(bankaccountname: str, payload: TransactionsPayload) -> Dict[str, Any]:
     key = (bankaccountname or '').strip().lower()
     if not key:
@@ -194,7 +138,10 @@ async def save_transactions(bankaccountname: str, payload: TransactionsPayload)
     # Guard: Do not allow deletion of normalized rows (identified by tr_id from normalized CSV)
     try:
         required_tr_ids = set()
-        if state.NORMALIZED_DIR_PATH:
+        index = get_tr_index()
+        if index is not None:
+            required_tr_ids = index.ids(key, SOURCE_NORMALIZED)
+        elif state.NORMALIZED_DIR_PATH:
             norm_csv = state.NORMALIZED_DIR_PATH / f"{key}.csv"
             if norm_csv.exists():
                 with norm_csv.open('r', encoding='utf-8') as nf:
@@ -214,26 +161,19 @@ async def save_transactions(bankaccountname: str, payload: TransactionsPayload)
         # Fail safe: if guard check fails unexpectedly, reject to avoid destructive loss
         raise HTTPException(status_code=500, detail=f"Validation failed: {e}")
     # Write CSV with fixed header
-    header = [
-        'tr_id','date','description','credit','ruleid','comment','transaction_type','tax_category','property','group','company','otherentity','override','fromaddendum'
-    ]
     out_path = state.PROCESSED_DIR_PATH / f"{key}.csv"
     try:
-        with out_path.open('w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=header, extrasaction='ignore')
-            writer.writeheader()
-            for row in payload.rows:
-                d = row.dict()
-                try:
-                    desc = d.get('description') or ''
-                    # Collapse multiple spaces/tabs to a single space, trim, and lowercase
-                    desc = ' '.join(str(desc).split()).strip().lower()
-                    d['description'] = desc
-                except Exception:
-                    pass
-                writer.writerow(d)
+        rows: List[Transaction] = []
+        for row in payload.rows:
+            tr = Transaction.from_mapping(row.dict())
+            # Collapse multiple spaces/tabs to a single space, trim, and lowercase
+            tr.description = ' '.join(tr.description.split()).strip().lower()
+            rows.append(tr)
+        write_transactions(out_path, rows)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to write CSV: {e}")
+    # The rows are served from here on even if reclassification below does not run
+    mark_processed_changed(key)
 
     # Also write addendum CSV under <statement_location>/<CURRENT_YEAR>/addendum/<bankaccountname>.csv
     try:
@@ -276,19 +216,16 @@ async def save_transactions(bankaccountname: str, payload: TransactionsPayload)
     except Exception:
         # Do not fail the request if regeneration fails, but log details
         state.logger.exception(f"Failed to reclassify after save for {key}")
-    # Update rental summaries
-    try:
-        prepare_and_save_property_sum()
-    except Exception:
-        state.logger.exception("Failed to update property summary after save")
+    # Update rental and company summaries
     try:
-        prepare_and_save_company_sum()
+        prepare_and_save_summaries()
     except Exception:
-        state.logger.exception("Failed to update company summary after save")
+        state.logger.exception("Failed to update summaries after save")
     return {"ok": True, "path": str(out_path)}
 
 
 @router.delete("/transactions/{bankaccountname}")
+@processing_locked
 async def delete_transaction(bankaccountname: str, payload: TransactionRow) -> Dict[str, Any]:
     key = (bankaccountname or '').strip().lower()
     if not key:
@@ -305,6 +242,10 @@ async def delete_transaction(bankaccountname: str, payload: TransactionRow) -> D
     addendum_path = addendum_dir / f"{key}.csv"
     if not addendum_path.exists():
         raise HTTPException(status_code=404, detail="Addendum file not found for this bank account")
+    target_tid = (payload.tr_id or '').strip()
+    index = get_tr_index()
+    if target_tid and index is not None and not index.contains(target_tid, key, SOURCE_ADDENDUM):
+        raise HTTPException(status_code=404, detail="Addendum row not found")
     # Read, filter out matching row by tr_id if present, else by fields
     try:
         rows: List[Dict[str, str]] = []
@@ -312,7 +253,6 @@ async def delete_transaction(bankaccountname: str, payload: TransactionRow) -> D
             reader = csv.DictReader(rf)
             for row in reader:
                 rows.append(row)
-        target_tid = (payload.tr_id or '').strip()
         def _matches(r: Dict[str,str]) -> bool:
             if target_tid:
                 return (r.get('tr_id','').strip() == target_tid)
@@ -348,11 +288,7 @@ async def delete_transaction(bankaccountname: str, payload: TransactionRow) -> D
     except Exception:
         pass
     try:
-        prepare_and_save_property_sum()
-    except Exception:
-        pass
-    try:
-        prepare_and_save_company_sum()
+        prepare_and_save_summaries()
     except Exception:
         pass
     return {"ok": True}
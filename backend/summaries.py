@@ -0,0 +1,21 @@
+from . import main as state
+from .aggregate import aggregate_processed
+from .company_sum import prepare_and_save_company_sum
+from .property_sum import prepare_and_save_property_sum
+
+
+def prepare_and_save_summaries() -> None:
+    """Rebuild the rental and company summaries from a single scan of the processed rows."""
+    agg = aggregate_processed()
+    if agg is None:
+        return
+    # the company summary takes the rental summary from here rather than re-reading its YAML
+    rental_summary = None
+    try:
+        rental_summary = prepare_and_save_property_sum(agg)
+    except Exception:
+        state.logger.exception("Failed to update property summary")
+    try:
+        prepare_and_save_company_sum(agg, rental_summary)
+    except Exception:
+        state.logger.exception("Failed to update company summary")
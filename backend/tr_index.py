@@ -0,0 +1,270 @@
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+import csv
+import os
+import yaml
+
+from . import main as state
+
+# Sources whose rows carry a tr_id; processed CSVs are rebuilt from these two
+SOURCE_NORMALIZED = 'normalized'
+SOURCE_ADDENDUM = 'addendum'
+SOURCES = (SOURCE_NORMALIZED, SOURCE_ADDENDUM)
+INDEX_DIR_NAME = 'tr_index'
+STAMPS_NAME = 'sources.yaml'
+
+
+class TrIdIndex:
+    """Per-year index of tr_id -> (bankaccountname, source, byte offset of the row).
+
+    One small CSV per (account, source) is kept under ACCOUNTS_DIR/YEAR/tr_index/
+    together with the size/mtime of the file it was built from. A source is only
+    rescanned when its file changed, so duplicate checks and the deletion guard
+    are dictionary lookups instead of full-file scans.
+    """
+
+    def __init__(self, index_dir: Path) -> None:
+        self.index_dir = index_dir
+        self._ids: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._owners: Dict[str, List[Tuple[str, str]]] = {}
+        self._paths: Dict[Tuple[str, str], Path] = {}
+        self._stamps: Dict[str, Dict[str, Any]] = {}
+        self._load_stamps()
+
+    # ---- source paths ----
+    @staticmethod
+    def source_path(bankaccountname: str, source: str) -> Optional[Path]:
+        if source == SOURCE_NORMALIZED:
+            if not state.NORMALIZED_DIR_PATH:
+                return None
+            return state.NORMALIZED_DIR_PATH / f"{bankaccountname}.csv"
+        ba = state.BA_DB.get(bankaccountname) or {}
+        sl = (ba.get('statement_location') or '').strip()
+        if not (sl and state.CURRENT_YEAR):
+            return None
+        return Path(sl) / state.CURRENT_YEAR / 'addendum' / f"{bankaccountname}.csv"
+
+    # ---- queries ----
+    def __len__(self) -> int:
+        return sum(len(ids) for ids in self._ids.values())
+
+    def ids(self, bankaccountname: str, source: str) -> Set[str]:
+        return set(self._source_ids(bankaccountname, source))
+
+    def contains(self, tr_id: str, bankaccountname: str, source: str) -> bool:
+        return tr_id in self._source_ids(bankaccountname, source)
+
+    def collisions(self) -> Dict[str, List[Tuple[str, str]]]:
+        """tr_ids that appear under more than one bank account."""
+        return {tid: keys for tid, keys in self._owners.items() if len({k[0] for k in keys}) > 1}
+
+    # ---- maintenance ----
+    def refresh_all(self) -> None:
+        wanted = {(ba, src) for ba in state.BA_DB.keys() for src in SOURCES}
+        for key in list(self._ids.keys()):
+            if key not in wanted:
+                self._forget(key)
+        for ba, src in sorted(wanted):
+            self._source_ids(ba, src)
+        for tid, keys in self.collisions().items():
+            state.logger.warning(f"tr_id collision: {tid} appears in {', '.join(f'{a}/{s}' for a, s in keys)}")
+
+    def append(self, bankaccountname: str, source: str, tr_id: str, offset: int) -> None:
+        """Record a row just appended to a source file at byte offset, without rescanning it.
+
+        Meant for right after contains()/ids() on the same source, which brought
+        its ids up to date: the file is re-stamped so its new size and mtime count
+        as indexed. If the source's ids are not loaded (e.g. the file is new),
+        nothing is recorded and the next query scans the file.
+        """
+        key = (bankaccountname, source)
+        ids = self._ids.get(key)
+        path = self._paths.get(key)
+        if ids is None or path is None:
+            return
+        if tr_id not in ids:
+            ids[tr_id] = offset
+            self._owners.setdefault(tr_id, []).append(key)
+            try:
+                with self._index_path(key).open('a', newline='', encoding='utf-8') as f:
+                    csv.writer(f).writerow([tr_id, offset])
+            except Exception:
+                state.logger.exception(f"Failed appending to tr_id index for {bankaccountname}/{source}")
+                self._stamps.pop(self._stamp_key(key), None)
+                self._save_stamps()
+                return
+        self._stamp(key, path, len(ids))
+
+    # ---- internals ----
+    def _source_ids(self, bankaccountname: str, source: str) -> Dict[str, int]:
+        key = (bankaccountname, source)
+        path = self.source_path(bankaccountname, source)
+        if path is None:
+            self._forget(key)
+            return {}
+        self._paths[key] = path
+        try:
+            st = path.stat()
+        except OSError:
+            if key in self._ids or self._stamp_key(key) in self._stamps:
+                self._forget(key)
+            return {}
+        stamp = self._stamps.get(self._stamp_key(key)) or {}
+        fresh = (
+            stamp.get('path') == str(path)
+            and stamp.get('size') == int(st.st_size)
+            and stamp.get('mtime_ns') == int(st.st_mtime_ns)
+        )
+        if fresh and key in self._ids:
+            return self._ids[key]
+        ids = self._load_index_file(key) if fresh else None
+        if ids is None:
+            ids = self._scan_source(key, path)
+            self._write_index_file(key, ids)
+            self._stamp(key, path, len(ids), st)
+        self._set_ids(key, ids)
+        return ids
+
+    def _scan_source(self, key: Tuple[str, str], path: Path) -> Dict[str, int]:
+        ids: Dict[str, int] = {}
+        try:
+            with path.open('rb') as f:
+                header = next(csv.reader([f.readline().decode('utf-8')]), [])
+                col = header.index('tr_id') if 'tr_id' in header else -1
+                if col < 0:
+                    return ids
+                starts: List[int] = []
+                reader = csv.reader(_iter_decoded(f, starts))
+                for row in reader:
+                    offset = starts[0]
+                    starts.clear()
+                    tid = row[col].strip() if len(row) > col else ''
+                    if not tid:
+                        continue
+                    if tid in ids:
+                        state.logger.warning(f"tr_id collision: {tid} repeated in {key[0]}/{key[1]}")
+                        continue
+                    ids[tid] = offset
+        except Exception:
+            state.logger.exception(f"Failed indexing tr_ids in {path}")
+        return ids
+
+    def _set_ids(self, key: Tuple[str, str], ids: Dict[str, int]) -> None:
+        self._drop_owners(key)
+        self._ids[key] = ids
+        for tid in ids:
+            self._owners.setdefault(tid, []).append(key)
+
+    def _drop_owners(self, key: Tuple[str, str]) -> None:
+        for tid in self._ids.get(key, ()):
+            keys = self._owners.get(tid)
+            if keys and key in keys:
+                keys.remove(key)
+                if not keys:
+                    del self._owners[tid]
+
+    def _forget(self, key: Tuple[str, str]) -> None:
+        self._drop_owners(key)
+        self._ids.pop(key, None)
+        self._paths.pop(key, None)
+        if self._stamps.pop(self._stamp_key(key), None) is not None:
+            self._save_stamps()
+            try:
+                self._index_path(key).unlink()
+            except OSError:
+                pass
+
+    @staticmethod
+    def _stamp_key(key: Tuple[str, str]) -> str:
+        return f"{key[0]}.{key[1]}"
+
+    def _index_path(self, key: Tuple[str, str]) -> Path:
+        return self.index_dir / f"{self._stamp_key(key)}.csv"
+
+    def _load_index_file(self, key: Tuple[str, str]) -> Optional[Dict[str, int]]:
+        try:
+            ids: Dict[str, int] = {}
+            with self._index_path(key).open('r', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    ids[row['tr_id']] = int(row['offset'])
+            return ids
+        except Exception:
+            return None
+
+    def _write_index_file(self, key: Tuple[str, str], ids: Dict[str, int]) -> None:
+        path = self._index_path(key)
+        tmp = path.with_name(path.name + '.tmp')
+        try:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            with tmp.open('w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['tr_id', 'offset'])
+                for tid, offset in ids.items():
+                    writer.writerow([tid, offset])
+            os.replace(tmp, path)
+        except Exception:
+            state.logger.exception(f"Failed writing tr_id index {path}")
+
+    def _stamp(self, key: Tuple[str, str], path: Path, rows: int, st: Optional[os.stat_result] = None) -> None:
+        try:
+            st = st or path.stat()
+        except OSError:
+            return
+        self._stamps[self._stamp_key(key)] = {
+            'path': str(path),
+            'size': int(st.st_size),
+            'mtime_ns': int(st.st_mtime_ns),
+            'rows': int(rows),
+        }
+        self._save_stamps()
+
+    def _load_stamps(self) -> None:
+        try:
+            with (self.index_dir / STAMPS_NAME).open('r', encoding='utf-8') as f:
+                data = yaml.safe_load(f) or {}
+            self._stamps = {k: v for k, v in data.items() if isinstance(v, dict)}
+        except Exception:
+            self._stamps = {}
+
+    def _save_stamps(self) -> None:
+        path = self.index_dir / STAMPS_NAME
+        tmp = path.with_name(path.name + '.tmp')
+        try:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            with tmp.open('w', encoding='utf-8') as f:
+                yaml.safe_dump(self._stamps, f, sort_keys=True, allow_unicode=True)
+            os.replace(tmp, path)
+        except Exception:
+            state.logger.exception(f"Failed writing tr_id index stamps {path}")
+
+
+def _iter_decoded(f, starts: Optional[List[int]] = None) -> Iterator[str]:
+    """Decode a binary file line by line, recording the byte offset where each line starts."""
+    pos = f.tell()
+    for raw in f:
+        if starts is not None:
+            starts.append(pos)
+        pos += len(raw)
+        yield raw.decode('utf-8')
+
+
+_INDEX: Optional[TrIdIndex] = None
+
+
+def get_tr_index() -> Optional[TrIdIndex]:
+    """Return the tr_id index for the current ACCOUNTS_DIR/CURRENT_YEAR (built on first use)."""
+    global _INDEX
+    if not (state.ACCOUNTS_DIR_PATH and state.CURRENT_YEAR):
+        return None
+    index_dir = state.ACCOUNTS_DIR_PATH / state.CURRENT_YEAR / INDEX_DIR_NAME
+    if _INDEX is None or _INDEX.index_dir != index_dir:
+        _INDEX = TrIdIndex(index_dir)
+    return _INDEX
+
+
+def build_tr_index() -> None:
+    index = get_tr_index()
+    if index is None:
+        return
+    index.refresh_all()
+    state.logger.info(f"tr_id index: {len(index)} ids")
@@ -0,0 +1,320 @@
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+
+from . import main as state
+from .bank_statement_parser import process_bank_statements_from_sources
+from .classify import classify_bank
+from .locks import PROCESSING_LOCK, ROUTE_HOOKS
+from .summaries import prepare_and_save_summaries
+
+# Per-year folders under statement_location and the file suffix each holds (<bankaccountname><suffix>)
+WATCHED_DIRS = {
+    'bank_stmts': '.csv',
+    'addendum': '.csv',
+    'bank_rules': '.yaml',
+}
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT_HEADER = struct.Struct('iIII')
+
+Stamp = Optional[Tuple[int, int]]
+
+
+def _stamp(path: Path) -> Stamp:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return int(st.st_size), int(st.st_mtime_ns)
+
+
+class _Inotify:
+    """Minimal inotify binding over ctypes (Linux only); raises OSError when unavailable."""
+
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._libc = libc
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.fd = fd
+        self._dirs: Dict[int, Path] = {}
+
+    def add(self, directory: Path) -> bool:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), _IN_MASK)
+        if wd < 0:
+            return False
+        self._dirs[wd] = directory
+        return True
+
+    def read(self, timeout: float) -> Tuple[List[Path], bool]:
+        """Return (changed paths, overflowed) seen within timeout seconds."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return [], False
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return [], False
+        paths: List[Path] = []
+        overflow = False
+        pos = 0
+        while pos + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, name_len = _EVENT_HEADER.unpack_from(data, pos)
+            pos += _EVENT_HEADER.size
+            name = data[pos:pos + name_len].split(b'\0', 1)[0]
+            pos += name_len
+            if mask & _IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            directory = self._dirs.get(wd)
+            if directory is not None and name:
+                paths.append(directory / os.fsdecode(name))
+        return paths, overflow
+
+    def close(self) -> None:
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class StatementWatcher:
+    """Background thread that re-runs the pipeline for accounts whose inputs change.
+
+    Watches statement_location/CURRENT_YEAR/{bank_stmts,addendum,bank_rules} of every
+    bank account, with inotify when available and by polling stat() otherwise.
+    Events are collected until the tree has been quiet for `debounce` seconds, then
+    only the affected accounts are normalized (unchanged statements are skipped via
+    the normalization manifest) and classified, and the summaries are rebuilt once.
+    Each pass holds PROCESSING_LOCK, so it never interleaves with an API route
+    rewriting the same files. Files written by that pass itself, or by a locked
+    API route (which reprocesses the account on its own), are ignored.
+    Folders are never created in the statement trees: until a watched folder
+    exists, its parent is watched for it to appear.
+    """
+
+    def __init__(self, debounce: float = 2.0, poll_interval: float = 5.0, use_inotify: bool = True) -> None:
+        self.debounce = max(0.0, debounce)
+        self.poll_interval = max(0.5, poll_interval)
+        self.use_inotify = use_inotify
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._inotify: Optional[_Inotify] = None
+        self._watched: Set[Path] = set()
+        # watched dir -> (kind, accounts whose files live there)
+        self._dirs: Dict[Path, Tuple[str, Set[str]]] = {}
+        # Stamp of each watched file as last processed; only updated under PROCESSING_LOCK
+        self._seen: Dict[Path, Stamp] = {}
+
+    @property
+    def mode(self) -> str:
+        return 'inotify' if self._inotify is not None else 'poll'
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        if self.use_inotify:
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                state.logger.info(f"inotify unavailable ({e}); polling statement folders every {self.poll_interval}s")
+                self._inotify = None
+        self._refresh_targets()
+        for path in self._iter_watched_files():
+            self._seen[path] = _stamp(path)
+        ROUTE_HOOKS.append(self._route_hook)
+        self._thread = threading.Thread(target=self._run, name='statement-watcher', daemon=True)
+        self._thread.start()
+        state.logger.info(f"Watching {len(self._dirs)} statement folders ({self.mode})")
+
+    def stop(self) -> None:
+        if self._route_hook in ROUTE_HOOKS:
+            ROUTE_HOOKS.remove(self._route_hook)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    # ---- targets ----
+    def _refresh_targets(self) -> List[Path]:
+        """Recompute the watched folders; returns those that just got an inotify watch."""
+        dirs: Dict[Path, Tuple[str, Set[str]]] = {}
+        if state.CURRENT_YEAR:
+            for key, ba in list(state.BA_DB.items()):
+                sl = (ba.get('statement_location') or '').strip()
+                if not sl:
+                    continue
+                year_dir = Path(sl).expanduser().resolve() / state.CURRENT_YEAR
+                for kind in WATCHED_DIRS:
+                    d = year_dir / kind
+                    dirs.setdefault(d, (kind, set()))[1].add(key)
+        self._dirs = dirs
+        added: List[Path] = []
+        if self._inotify is not None:
+            for d in dirs:
+                if d in self._watched:
+                    continue
+                if d.is_dir():
+                    if self._inotify.add(d):
+                        self._watched.add(d)
+                        added.append(d)
+                    continue
+                # not there yet: watch the year folder (or statement_location) for it to appear
+                for parent in (d.parent, d.parent.parent):
+                    if parent.is_dir():
+                        if parent not in self._watched and self._inotify.add(parent):
+                            self._watched.add(parent)
+                        break
+        return added
+
+    def _iter_watched_files(self) -> Iterable[Path]:
+        for d, (kind, accounts) in self._dirs.items():
+            for key in accounts:
+                yield d / f"{key}{WATCHED_DIRS[kind]}"
+
+    def _account_for(self, path: Path) -> Optional[Tuple[str, str]]:
+        target = self._dirs.get(path.parent)
+        if target is None:
+            return None
+        kind, accounts = target
+        suffix = WATCHED_DIRS[kind]
+        if not path.name.endswith(suffix):
+            return None
+        key = path.name[:-len(suffix)]
+        return (key, kind) if key in accounts else None
+
+    # ---- loop ----
+    def _route_hook(self) -> Callable[[], None]:
+        """Snapshot the watched files before a locked API route; afterwards mark what it wrote as seen."""
+        before = {path: _stamp(path) for path in self._iter_watched_files()}
+
+        def after() -> None:
+            for path, old in before.items():
+                # a change still pending from before the route stays pending
+                if self._seen.get(path) == old:
+                    self._seen[path] = _stamp(path)
+        return after
+
+    def _run(self) -> None:
+        # changed path -> ((account, kind), stamp when it was noticed)
+        pending: Dict[Path, Tuple[Tuple[str, str], Stamp]] = {}
+        last_event = 0.0
+        next_poll = time.monotonic() + self.poll_interval
+        while not self._stop.is_set():
+            timeout = self.debounce if pending else 1.0
+            candidates: List[Path] = []
+            try:
+                added: List[Path] = []
+                if self._inotify is not None:
+                    paths, overflow = self._inotify.read(min(timeout, 1.0))
+                    candidates = list(self._iter_watched_files()) if overflow else paths
+                    if any(p.is_dir() for p in paths if p not in self._watched and self._account_for(p) is None):
+                        # a statement folder (or the year folder above it) appeared
+                        added = self._refresh_targets()
+                else:
+                    self._stop.wait(min(timeout, max(0.0, next_poll - time.monotonic())))
+                if time.monotonic() >= next_poll:
+                    # pick up bank accounts added since startup; polling mode also stats every file here
+                    next_poll = time.monotonic() + self.poll_interval
+                    added += self._refresh_targets()
+                    if self._inotify is None:
+                        candidates = list(self._iter_watched_files())
+                # files already in a newly watched folder were written before its watch existed
+                candidates += [p for p in self._iter_watched_files() if p.parent in added]
+            except Exception:
+                state.logger.exception("Statement watcher failed reading events")
+                self._stop.wait(self.poll_interval)
+                continue
+            for path in candidates:
+                hit = self._account_for(path)
+                if hit is None:
+                    continue
+                stamp = _stamp(path)
+                if self._seen.get(path) == stamp:
+                    continue
+                if path in pending and pending[path][1] == stamp:
+                    continue
+                pending[path] = (hit, stamp)
+                last_event = time.monotonic()
+            if pending and time.monotonic() - last_event >= self.debounce:
+                batch, pending = pending, {}
+                self._process(batch)
+
+    def _process(self, changed: Dict[Path, Tuple[Tuple[str, str], Stamp]]) -> None:
+        with PROCESSING_LOCK:
+            batch: Dict[str, Set[str]] = {}
+            for path, ((key, kind), _noticed) in changed.items():
+                stamp = _stamp(path)
+                if self._seen.get(path) == stamp:
+                    # written by a locked API route in the meantime
+                    continue
+                self._seen[path] = stamp
+                batch.setdefault(key, set()).add(kind)
+            if batch:
+                self._process_locked(batch)
+
+    def _process_locked(self, batch: Dict[str, Set[str]]) -> None:
+        stmt_accounts = sorted(k for k, kinds in batch.items() if 'bank_stmts' in kinds)
+        to_classify: Set[str] = {k for k, kinds in batch.items() if kinds - {'bank_stmts'}}
+        if stmt_accounts:
+            try:
+                to_classify.update(process_bank_statements_from_sources(
+                    state.BA_DB, state.BANKS_CFG_DB, state.CURRENT_YEAR, state.NORMALIZED_DIR_PATH,
+                    state.logger, workers=state.NORMALIZE_WORKERS, accounts=stmt_accounts,
+                ))
+            except Exception:
+                state.logger.exception(f"Watcher failed normalizing {', '.join(stmt_accounts)}")
+        if not to_classify:
+            return
+        state.logger.info(f"Watcher reprocessing {', '.join(sorted(to_classify))}")
+        for key in sorted(to_classify):
+            try:
+                classify_bank(key)
+            except Exception:
+                state.logger.exception(f"Watcher failed classifying {key}")
+        try:
+            prepare_and_save_summaries()
+        except Exception:
+            state.logger.exception("Watcher failed updating summaries")
+        # Forget any writes made by this pass to the watched files
+        for path in self._iter_watched_files():
+            hit = self._account_for(path)
+            if hit is not None and (hit[0] in batch or hit[0] in to_classify):
+                self._seen[path] = _stamp(path)
+
+
+_WATCHER: Optional[StatementWatcher] = None
+
+
+def start_statement_watcher(mode: str, debounce: float, poll_interval: float) -> Optional[StatementWatcher]:
+    """Start the background watcher; mode is 'auto' (inotify, else polling) or 'poll'."""
+    global _WATCHER
+    if _WATCHER is not None:
+        return _WATCHER
+    _WATCHER = StatementWatcher(debounce=debounce, poll_interval=poll_interval, use_inotify=(mode != 'poll'))
+    _WATCHER.start()
+    return _WATCHER
+
+
+def stop_statement_watcher() -> None:
+    global _WATCHER
+    if _WATCHER is not None:
+        _WATCHER.stop()
+        _WATCHER = None
@@ -19,7 +19,14 @@ function ClassifyRulesTabs({ classifyRules, loading, load, bankaccounts, items,
       } catch (_) {}
     }
   }, []);
-  const [commonFilter, setCommonFilter] = useState({ transaction_type: '', pattern_match_logic: '' });
+  const [commonFilter, setCommonFilter] = useState(() => {
+    // set once by the transactions view when jumping to a common rule
+    try {
+      const ttype = window.localStorage.getItem('commonrules_filter_ttype') || '';
+      window.localStorage.removeItem('commonrules_filter_ttype');
+      return { transaction_type: ttype, pattern_match_logic: '' };
+    } catch(_) { return { transaction_type: '', pattern_match_logic: '' }; }
+  });
   const [inheritFilter, setInheritFilter] = useState({ bankaccountname: '', tax_category: '', property: '', group: '', otherentity: '' });
   const [commonRules, setCommonRules] = useState([]);
   const [inheritRules, setInheritRules] = useState([]);
@@ -1,5 +1,16 @@
 const { useState } = React;
 
+// Rows classified by a shared common rule carry ruleid "common:<n>" rather than a bank rule order
+const COMMON_RULEID_PREFIX = 'common:';
+const isCommonRuleId = (ruleid) => String(ruleid == null ? '' : ruleid).trim().startsWith(COMMON_RULEID_PREFIX);
+const openCommonRules = (r, setTopTab) => {
+  try {
+    window.localStorage.setItem('crSubTab','common');
+    window.localStorage.setItem('commonrules_filter_ttype', String(r.transaction_type||''));
+  } catch(_) {}
+  setTopTab('classifyrules');
+};
+
 function TransactionsPanel({
   bankaccounts,
   transactionsByBA,
@@ -205,6 +216,7 @@ function TransactionsPanel({
                                   className="link"
                                   onClick={(e)=>{
                                     e.preventDefault();
+                                    if (isCommonRuleId(r.ruleid)) { openCommonRules(r, setTopTab); return; }
                                     try {
                                       window.localStorage.setItem('crSubTab','bank');
                                       window.localStorage.setItem('bankrules_active', (currentBA.bankaccountname||'').toLowerCase());
@@ -242,7 +254,7 @@ function TransactionsPanel({
                                         }
                                       } catch(_) {}
                                       const patt = `desc_contains=${(r.description||'').toString()}`;
-                                      const ordFromRow = (r.ruleid != null && String(r.ruleid).trim() !== '') ? Number(String(r.ruleid).trim()) : null;
+                                      const ordFromRow = (r.ruleid != null && String(r.ruleid).trim() !== '' && !isCommonRuleId(r.ruleid)) ? Number(String(r.ruleid).trim()) : null;
                                       const insertOrder = (Number.isFinite(ordFromRow) && ordFromRow > 0) ? ordFromRow : (maxOrder + 1);
                                       window.localStorage.setItem('crSubTab','bank');
                                       window.localStorage.setItem('bankrules_active', bank);
@@ -267,6 +279,8 @@ function TransactionsPanel({
                                     className="px-2 py-1 bg-gray-700 text-white rounded hover:bg-gray-800 disabled:opacity-60"
                                     disabled={!(r.ruleid != null && String(r.ruleid).trim() !== '')}
                                     onClick={async()=>{ try {
+                                      // common rules are edited on their own tab
+                                      if (isCommonRuleId(r.ruleid)) { openCommonRules(r, setTopTab); return; }
                                       const bank = (currentBA.bankaccountname||'').toLowerCase();
                                       const hasRuleId = (r.ruleid != null && String(r.ruleid).trim() !== '');
                                       let pref = null;
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark the summary aggregation (backend/aggregate.py add_rows) row by row
+versus over the NumPy columnar store (SUMMARY_COLUMNAR).
+
+For each size a synthetic year of processed rows is generated (rental rows on
+properties and groups, company rows, personal rows) and aggregated by each path
+in its own subprocess, so memory of one run does not carry into the next. That
+both paths produce identical aggregates is checked by tests/test_columnar.py.
+
+Reported per size and path:
+  build   seconds to build the columnar store (columnar only)
+  total   seconds for add_rows, including the build
+  rss     peak resident set size of the process (ru_maxrss)
+
+Usage:
+  python scripts/bench_summary_columnar.py [--sizes 100000,1000000,5000000]
+"""
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from backend import main as state  # noqa: E402
+from backend import aggregate  # noqa: E402
+from backend.core import columnar  # noqa: E402
+from backend.core.records import Transaction  # noqa: E402
+
+MODES = ('rows', 'columnar')
+PROPERTIES = [f'p{i}' for i in range(40)]
+GROUPS = {f'g{i}': {'groupname': f'g{i}', 'propertylist': random.Random(i).sample(PROPERTIES, 2 + i % 4)} for i in range(8)}
+
+
+def _sample_rows(n: int):
+    rnd = random.Random(n)
+    words = ['zelle', 'rent', 'hoa', 'payroll', 'fee', 'transfer', 'repair', 'utility', 'insurance', 'tax']
+    descs = [' '.join(rnd.choice(words) for _ in range(3)) + f' {i}' for i in range(2000)]
+    dates = [f'2024-{m:02d}-{d:02d}' for m in range(1, 13) for d in range(1, 29)]
+    rental_types = ['rent', 'tenantfees', 'repairs', 'hoa', 'utilities', 'insurance', 'mortgageinterest']
+    company_types = ['bankfees', 'c_auto', 'c_phone', 'proffees', 'utilities']
+    rows = []
+    for i in range(n):
+        kind = rnd.random()
+        tr = Transaction(
+            tr_id=f'{rnd.getrandbits(48):012x}', date=rnd.choice(dates), description=rnd.choice(descs),
+            credit=f'{rnd.randint(-300000, 300000) / 100:.2f}',
+        )
+        if kind < 0.2:
+            tr.tax_category, tr.transaction_type, tr.property = 'rental', rnd.choice(rental_types), rnd.choice(PROPERTIES)
+        elif kind < 0.3:
+            tr.tax_category, tr.transaction_type, tr.group = 'rental', rnd.choice(rental_types), rnd.choice(list(GROUPS))
+        elif kind < 0.4:
+            tr.transaction_type, tr.company = rnd.choice(company_types), rnd.choice(['acme', 'apex', 'zeta'])
+        elif kind < 0.9:
+            tr.tax_category, tr.transaction_type = 'personal', rnd.choice(['groceries', 'dining', 'travel'])
+        rows.append(tr)
+    return rows
+
+
+def _run(mode: str, size: int) -> dict:
+    state.GROUP_DB.clear()
+    state.GROUP_DB.update(GROUPS)
+    state.SUMMARY_COLUMNAR = mode == 'columnar'
+    rows = _sample_rows(size)
+    build = 0.0
+    if mode == 'columnar':
+        t0 = time.perf_counter()
+        columnar.TransactionColumns(rows)
+        build = time.perf_counter() - t0
+    agg = aggregate.SummaryAggregates()
+    t0 = time.perf_counter()
+    aggregate.add_rows(agg, 'bench', rows)
+    total = time.perf_counter() - t0
+    return {
+        'mode': mode, 'size': size, 'build_s': build, 'total_s': total,
+        'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Compare row-by-row and columnar summary aggregation')
+    parser.add_argument('--sizes', default='100000,1000000,5000000', help='Comma-separated row counts')
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--size', type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(_run(args.mode, args.size)))
+        return 0
+    if not columnar.available():
+        print('Error: numpy is not installed', file=sys.stderr)
+        return 1
+
+    print(f"{'rows':>9}  {'mode':<9}{'build s':>9}{'total s':>9}{'rss MB':>9}  speedup")
+    for size in [int(s) for s in args.sizes.split(',') if s.strip()]:
+        results = []
+        for mode in MODES:
+            out = subprocess.run(
+                [sys.executable, __file__, '--mode', mode, '--size', str(size)],
+                check=True, capture_output=True, text=True,
+            )
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        base = results[0]['total_s']
+        for r in results:
+            speedup = f"{base / r['total_s']:.1f}x" if r['total_s'] else '-'
+            print(f"{r['size']:>9}  {r['mode']:<9}{r['build_s']:>9.2f}{r['total_s']:>9.2f}{r['rss_mb']:>9.0f}  {speedup}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
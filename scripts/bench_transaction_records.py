@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark holding a year of processed transactions as csv.DictReader dicts versus
+the shared slotted Transaction record (backend/core/records.py).
+
+A processed CSV with --rows rows is generated in a temporary directory, then each
+representation is loaded in its own subprocess (so peak RSS is not shared) and
+walked once the way the summaries do. Reported per representation:
+  blocks   live allocated blocks held by the loaded rows (sys.getallocatedblocks delta)
+  rss      peak resident set size of the process (ru_maxrss)
+  load     seconds to read the file
+  walk     seconds for one pass summing credit by transaction_type
+
+Usage:
+  python scripts/bench_transaction_records.py [--rows 1000000]
+"""
+import argparse
+import csv
+import gc
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from backend.core.records import TRANSACTION_FIELDS, read_transactions  # noqa: E402
+
+MODES = ('dict', 'record')
+
+
+def _write_sample(path: Path, rows: int) -> None:
+    rnd = random.Random(7)
+    words = ['amazon', 'zelle', 'rent', 'hoa', 'payroll', 'fee', 'transfer', 'grocery', 'utility', 'insurance']
+    types = ['expense', 'income', 'transfer', '']
+    with path.open('w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(TRANSACTION_FIELDS)
+        for i in range(rows):
+            desc = ' '.join(rnd.choice(words) for _ in range(3)) + f' {rnd.randint(0, 99999)}'
+            writer.writerow((
+                f'{i:012x}', f'2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}', desc,
+                f'{rnd.randint(-200000, 200000) / 100:.2f}', str(rnd.randint(1, 200)), '',
+                rnd.choice(types), rnd.choice(['rental', 'personal', '']), rnd.choice(['', 'p1', 'p2']),
+                '', '', '', '', '',
+            ))
+
+
+def _load(mode: str, path: Path) -> list:
+    if mode == 'dict':
+        with path.open('r', encoding='utf-8') as f:
+            return [dict(row) for row in csv.DictReader(f)]
+    return read_transactions(path)
+
+
+def _run(mode: str, path: Path) -> dict:
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    t0 = time.perf_counter()
+    rows = _load(mode, path)
+    t1 = time.perf_counter()
+    totals: dict = {}
+    for r in rows:
+        tx = r.get('transaction_type') or ''
+        totals[tx] = totals.get(tx, 0) + int(round(float(r.get('credit') or 0) * 100))
+    t2 = time.perf_counter()
+    gc.collect()
+    return {
+        'mode': mode,
+        'rows': len(rows),
+        'blocks': sys.getallocatedblocks() - blocks,
+        'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'load_s': t1 - t0,
+        'walk_s': t2 - t1,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Compare dict rows with Transaction records on a generated processed CSV')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Rows in the generated processed CSV')
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--csv', default='', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(_run(args.mode, Path(args.csv))))
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'processed.csv'
+        _write_sample(path, args.rows)
+        results = []
+        for mode in MODES:
+            out = subprocess.run(
+                [sys.executable, __file__, '--mode', mode, '--csv', str(path)],
+                check=True, capture_output=True, text=True,
+            )
+            results.append(json.loads(out.stdout))
+
+    print(f"{'mode':<8}{'rows':>10}{'blocks':>12}{'rss MB':>10}{'load s':>9}{'walk s':>9}")
+    for r in results:
+        print(f"{r['mode']:<8}{r['rows']:>10}{r['blocks']:>12}{r['rss_mb']:>10.1f}{r['load_s']:>9.2f}{r['walk_s']:>9.2f}")
+    base, rec = results
+    if base['blocks'] and base['rss_mb']:
+        print(f"record/dict: blocks {rec['blocks'] / base['blocks']:.2f}x, rss {rec['rss_mb'] / base['rss_mb']:.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
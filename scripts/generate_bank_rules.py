@@ -5,6 +5,18 @@ One-time utility to generate per-bank rule files by merging:
 - common_rules.yaml (transaction_type, pattern_match_logic)
 - classify_rules.yaml (explicit bank rules)
 
+Common rules are no longer copied into the per-bank files: the classifier
+evaluates common_rules.yaml once per description, ranked among a bank's own
+rules by transaction_type as in the expanded files, and applies the bank's
+inherit attributes (see backend/classify.py). Pass --expand-common to write the
+full inherit x common cross product as before.
+
+Migration: per-bank files generated before (or with --expand-common) need no
+change. A common rule whose expanded copy is already in the bank file, with the
+bank's inherit attributes, is classified by that copy and keeps its numeric
+ruleid; regenerating without --expand-common shrinks the files and gives those
+rows ruleid "common:<n>" instead.
+
 Algorithm:
 1) For each inherit rule I and each common rule C, create a merged rule R with:
    bankaccountname=I.bankaccountname
@@ -16,12 +28,13 @@ Algorithm:
    otherentity=I.otherentity
    Add to merged_common_rules set (by composite key).
 2) For each rule in classify_rules.yaml, if its composite key exists in merged_common_rules, skip; else include.
-3) Output per bank files under bank_rules/<bankaccountname>.yaml as the union:
-   merged_common_rules ∪ extra_classify_rules (merged rules take precedence), sorted deterministically.
+3) Output per bank files under bank_rules/<bankaccountname>.yaml: the extra classify
+   rules, plus merged_common_rules with --expand-common (merged rules take
+   precedence), sorted deterministically.
 
 Usage:
-  python scripts/generate_bank_rules.py --entities-dir /path/to/entities
-If --entities-dir is omitted
+  python scripts/generate_bank_rules.py --entities-dir /path/to/entities [--expand-common]
+If --entities-dir is omitted the script exits with an error.
 """
 import argparse
 import os
@@ -83,7 +96,9 @@ def _write_yaml_list(path: Path, items: List[Dict[str, Any]]) -> None:
 
 def main() -> int:
     parser = argparse.ArgumentParser(description='Generate bank_rules.yaml by merging inherit and common rules with classify overrides')
-    parser.add_argument('--entities-dir', dest='entities_dir', ''), help='Path to entities containing YAML files')
+    parser.add_argument('--entities-dir', dest='entities_dir', default='', help='Path to entities containing YAML files')
+    parser.add_argument('--expand-common', dest='expand_common', action='store_true',
+                        help='Also write every inherit x common rule into the per-bank files')
     args = parser.parse_args()
 
     if not args.entities_dir:
@@ -154,8 +169,8 @@ def main() -> int:
             continue
         final_map[k] = rec
 
-    # Union: include merged common rules and classify extras for output
-    union_map: Dict[str, Dict[str, Any]] = dict(merged_map)
+    # Union: classify extras, plus the merged common rules when expanding them
+    union_map: Dict[str, Dict[str, Any]] = dict(merged_map) if args.expand_common else {}
     # Only extras remain in final_map; merged_map takes precedence by construction
     union_map.update(final_map)
 
@@ -0,0 +1,52 @@
+import csv
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pytest
+import yaml
+
+import backend.main as state
+
+YEAR = '2024'
+
+
+class YearTree:
+    """ACCOUNTS_DIR/CURRENT_YEAR and a statement_location tree under tmp_path, wired into backend.main."""
+
+    def __init__(self, root: Path) -> None:
+        self.accounts = root / 'accounts'
+        self.statements = root / 'statements'
+        self.normalized = self.accounts / YEAR / 'normalized'
+        self.processed = self.accounts / YEAR / 'processed'
+        for d in (self.normalized, self.processed, self.statements / YEAR / 'bank_rules'):
+            d.mkdir(parents=True)
+
+    def add_account(
+        self, bank: str, rows: Iterable[Tuple[str, str, str]] = (), rules: Optional[List[Dict]] = None,
+    ) -> None:
+        """Register bank with normalized (date, description, credit) rows and optional bank rules."""
+        state.BA_DB[bank] = {'bankaccountname': bank, 'statement_location': str(self.statements)}
+        with (self.normalized / f'{bank}.csv').open('w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['tr_id', 'date', 'description', 'credit'])
+            for i, (date, desc, credit) in enumerate(rows, 1):
+                writer.writerow([f'{bank}-{i}', date, desc, credit])
+        if rules is not None:
+            self.rules_path(bank).write_text(yaml.safe_dump(rules))
+
+    def rules_path(self, bank: str) -> Path:
+        return self.statements / YEAR / 'bank_rules' / f'{bank}.yaml'
+
+
+@pytest.fixture
+def year_tree(tmp_path, monkeypatch) -> YearTree:
+    tree = YearTree(tmp_path)
+    monkeypatch.setattr(state, 'BA_DB', {})
+    monkeypatch.setattr(state, 'COMMON_RULES_DB', {})
+    monkeypatch.setattr(state, 'INHERIT_RULES_DB', {})
+    monkeypatch.setattr(state, 'GROUP_DB', {})
+    monkeypatch.setattr(state, 'CURRENT_YEAR', YEAR)
+    monkeypatch.setattr(state, 'ACCOUNTS_DIR_PATH', tree.accounts)
+    monkeypatch.setattr(state, 'NORMALIZED_DIR_PATH', tree.normalized)
+    monkeypatch.setattr(state, 'PROCESSED_DIR_PATH', tree.processed)
+    return tree
@@ -0,0 +1,67 @@
+import pytest
+
+from backend.core.amounts import canonical_amount, format_cents, parse_cents, split_cents
+
+
+@pytest.mark.parametrize('raw, cents', [
+    ('$1,234.50', 123450),
+    ('€1.234', 123),
+    ('£ 12', 1200),
+    ('¥7', 700),
+    ('(45.00)', -4500),
+    ('-(45.00)', None),
+    ('-12', -1200),
+    ('+.5', 50),
+    ('1.005', 100),   # half-to-even
+    ('1.015', 102),
+    ('-2.675', -268),
+    ('-0', 0),
+    ('(0.00)', 0),
+    (12, 1200),
+    ('', None),
+    ('  ', None),
+    ('.', None),
+    ('abc', None),
+    (None, None),
+])
+def test_parse_cents(raw, cents):
+    assert parse_cents(raw) == cents
+
+
+@pytest.mark.parametrize('raw, text', [
+    ('1500.00', '1500'),
+    ('-1,234.50', '-1234.5'),
+    ('$0.10', '0.1'),
+    ('007.07', '7.07'),
+    ('(12.30)', '-12.3'),
+    ('-0.00', '0'),
+    ('(0)', '0'),
+    ('1.005', None),
+    ('x', None),
+    ('9999999999999.99', '9999999999999.99'),
+    ('-9999999999999', '-9999999999999'),
+    ('10000000000000', None),
+    ('00010000000000000.5', None),
+])
+def test_canonical_amount(raw, text):
+    assert canonical_amount(raw) == text
+
+
+@pytest.mark.parametrize('raw', ['1500.00', '-1234.5', '0.1', '-0.01', '42'])
+def test_canonical_amount_round_trips_through_cents(raw):
+    assert format_cents(parse_cents(raw)) == canonical_amount(raw)
+
+
+@pytest.mark.parametrize('cents, parts, offset, shares', [
+    (10000, 3, 0, [3334, 3333, 3333]),
+    (10000, 3, 1, [3333, 3334, 3333]),
+    (10000, 3, 5, [3333, 3333, 3334]),
+    (10001, 3, 2, [3334, 3333, 3334]),
+    (-10000, 3, 0, [-3333, -3333, -3334]),
+    (2, 4, 3, [1, 0, 0, 1]),
+    (0, 3, 0, [0, 0, 0]),
+    (500, 1, 7, [500]),
+])
+def test_split_cents(cents, parts, offset, shares):
+    assert split_cents(cents, parts, offset) == shares
+    assert sum(shares) == cents
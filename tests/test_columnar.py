@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from backend import aggregate
+from backend.aggregate import SummaryAggregates, add_rows
+from backend.core.records import Transaction
+
+pytest.importorskip('numpy')
+
+PROPERTIES = [f'p{i}' for i in range(12)]
+GROUPS = {
+    'g0': {'propertylist': ['p1', 'P2 ', 'p3']},
+    'g1': {'propertylist': ['p4', 'new']},
+    'g2': {'propertylist': []},
+    'g3': {'propertylist': ['p5']},
+}
+
+
+def _sample_rows(n, seed):
+    rnd = random.Random(seed)
+    dates = [f'2024-{m:02d}-{d:02d}' for m in range(1, 13) for d in (1, 15, 28)] + ['', '2024/03/04', 'bad']
+    rental_types = ['rent', 'tenantfees', 'Repairs', 'hoa', ' utilities']
+    credits = ['', 'abc', '0', '-0.00', '(12.50)', '99999999999999999999.99']
+    rows = []
+    for i in range(n):
+        kind = rnd.random()
+        credit = rnd.choice(credits) if rnd.random() < 0.05 else f'{rnd.randint(-300000, 300000) / 100:.2f}'
+        tr = Transaction(
+            tr_id=rnd.choice([f'{rnd.getrandbits(40):010x}', '', 'not-hex']), date=rnd.choice(dates),
+            description=f' row {i} ', credit=credit,
+        )
+        if kind < 0.3:
+            tr.tax_category, tr.transaction_type = rnd.choice(['rental', 'Rental ']), rnd.choice(rental_types)
+            tr.property = rnd.choice(PROPERTIES + [' P3', ''])
+        elif kind < 0.5:
+            tr.tax_category, tr.transaction_type = 'rental', rnd.choice(rental_types)
+            tr.group = rnd.choice(list(GROUPS) + ['G0', 'missing'])
+        elif kind < 0.65:
+            tr.transaction_type, tr.company = rnd.choice(['bankfees', 'c_auto', '']), rnd.choice(['acme', ' Apex'])
+            tr.tax_category = rnd.choice(['', 'rental'])
+            tr.property = rnd.choice(['', 'p1'])
+        elif kind < 0.9:
+            tr.tax_category, tr.transaction_type = 'personal', rnd.choice(['groceries', 'dining'])
+        rows.append(tr)
+    return rows
+
+
+def _aggregate(monkeypatch, columnar_on, batches):
+    monkeypatch.setattr(aggregate.state, 'SUMMARY_COLUMNAR', columnar_on)
+    agg = SummaryAggregates()
+    for ba, rows in batches:
+        add_rows(agg, ba, rows)
+    return agg
+
+
+@pytest.fixture(autouse=True)
+def groups(monkeypatch):
+    monkeypatch.setattr(aggregate.state, 'GROUP_DB', GROUPS)
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_columnar_path_matches_row_path(monkeypatch, caplog, seed):
+    batches = [('chk', _sample_rows(3000, seed)), ('sav', _sample_rows(500, seed + 100)), ('empty', [])]
+    rows_agg = _aggregate(monkeypatch, False, batches)
+    columnar_agg = _aggregate(monkeypatch, True, batches)
+    assert 'aggregating row by row' not in caplog.text
+    assert columnar_agg.rental == rows_agg.rental
+    assert columnar_agg.company == rows_agg.company
+    assert columnar_agg.rent_months == rows_agg.rent_months
+    assert columnar_agg.reverse == rows_agg.reverse
+
+
+def test_credits_beyond_int64_fall_back_to_the_row_path(monkeypatch, caplog):
+    rows = [
+        Transaction(tr_id='1', date='2024-01-01', description='a', credit=f'{9 * 10 ** 16}',
+                    transaction_type='rent', tax_category='rental', property='p1'),
+        Transaction(tr_id='2', date='2024-01-02', description='b', credit=f'{9 * 10 ** 16}',
+                    transaction_type='rent', tax_category='rental', property='p1'),
+    ]
+    rows_agg = _aggregate(monkeypatch, False, [('chk', rows)])
+    columnar_agg = _aggregate(monkeypatch, True, [('chk', rows)])
+    assert 'aggregating row by row' in caplog.text
+    assert columnar_agg == rows_agg
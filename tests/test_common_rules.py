@@ -0,0 +1,175 @@
+"""Common rules evaluated once per row keep the precedence of the generated per-bank files."""
+import logging
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+import backend.main as state
+from backend import classify
+from backend import load_entities as loaders
+from backend.core.records import read_transactions
+
+ROOT = Path(__file__).resolve().parent.parent
+GENERATOR = ROOT / 'scripts' / 'generate_bank_rules.py'
+YEAR = '2024'
+
+INHERIT = [
+    {'bankaccountname': 'chk', 'tax_category': 'rental', 'property': 'elm', 'group': 'g1', 'otherentity': 'Elm LLC'},
+]
+COMMON = [
+    {'transaction_type': 'utilities', 'pattern_match_logic': 'desc_contains=city water'},
+    {'transaction_type': 'fees', 'pattern_match_logic': 'desc_contains=fee'},
+    {'transaction_type': 'transfer', 'pattern_match_logic': 'desc_contains=zelle'},
+    {'transaction_type': 'rent', 'pattern_match_logic': 'desc_contains=rent'},
+    {'transaction_type': 'mortgage', 'pattern_match_logic': 'desc_contains="loan" AND credit_between=..0'},
+]
+BANK = [
+    # (transaction_type, pattern): each overlaps a common rule one way or the other
+    ('rent', 'desc_contains=zelle from joe'),
+    ('utilities', 'desc_contains=monthly fee'),
+    ('rent', 'desc_contains=rent deposit'),
+    ('zz_other', 'desc_contains=water'),
+    ('insurance', 'credit_equals=-100.00'),
+    ('repairs', 'desc_startswith=home depot'),
+]
+ROWS = [
+    ('2024-01-02', 'zelle from joe', '1200.00'),
+    ('2024-01-03', 'zelle to amy', '-50.00'),
+    ('2024-01-04', 'monthly fee', '-12.00'),
+    ('2024-01-05', 'rent deposit', '1500.00'),
+    ('2024-01-06', 'city water', '-80.00'),
+    ('2024-01-07', 'well water', '-30.00'),
+    ('2024-01-08', 'loan pmt', '-100.00'),
+    ('2024-01-09', 'loan pmt', '-900.00'),
+    ('2024-01-10', 'home depot rent supplies', '-45.00'),
+    ('2024-01-11', 'bagels', '-4.00'),
+]
+COMPARED = ('transaction_type', 'tax_category', 'property', 'group', 'company', 'otherentity')
+
+
+def _generate(entities: Path, expand: bool) -> Path:
+    """Run the real generator over the entity files and return the rule file it wrote for chk."""
+    args = [sys.executable, str(GENERATOR), '--entities-dir', str(entities)]
+    if expand:
+        args.append('--expand-common')
+    subprocess.run(args, check=True, capture_output=True)
+    return entities / 'bank_rules' / 'chk.yaml'
+
+
+@pytest.fixture
+def accounts(tmp_path, monkeypatch):
+    """Account chk uses the generated extras plus the shared common rules; exp uses the expanded file."""
+    for name, expand in (('extras', False), ('expanded', True)):
+        entities = tmp_path / name
+        entities.mkdir()
+        (entities / 'inherit_common_to_bank.yaml').write_text(yaml.safe_dump(INHERIT))
+        (entities / 'common_rules.yaml').write_text(yaml.safe_dump(COMMON))
+        (entities / 'classify_rules.yaml').write_text(yaml.safe_dump([
+            {'bankaccountname': 'chk', 'transaction_type': t, 'pattern_match_logic': p,
+             'tax_category': 'rental', 'property': 'elm', 'group': 'g1', 'otherentity': 'Elm LLC'}
+            for t, p in BANK
+        ]))
+        _generate(entities, expand)
+
+    statements = tmp_path / 'statements'
+    rules_dir = statements / YEAR / 'bank_rules'
+    rules_dir.mkdir(parents=True)
+    (rules_dir / 'chk.yaml').write_bytes((tmp_path / 'extras' / 'bank_rules' / 'chk.yaml').read_bytes())
+    (rules_dir / 'exp.yaml').write_bytes((tmp_path / 'expanded' / 'bank_rules' / 'chk.yaml').read_bytes())
+
+    normalized = tmp_path / 'accounts' / YEAR / 'normalized'
+    processed = tmp_path / 'accounts' / YEAR / 'processed'
+    normalized.mkdir(parents=True)
+    processed.mkdir(parents=True)
+    lines = ['tr_id,date,description,credit'] + [f"{i},{d},{desc},{c}" for i, (d, desc, c) in enumerate(ROWS, 1)]
+    for bank in ('chk', 'exp'):
+        (normalized / f'{bank}.csv').write_text('\n'.join(lines) + '\n')
+
+    common_db, inherit_db = {}, {}
+    log = logging.getLogger(__name__)
+    loaders.load_common_rules_yaml_into_memory(tmp_path / 'extras' / 'common_rules.yaml', common_db, log)
+    loaders.load_inherit_rules_yaml_into_memory(tmp_path / 'extras' / 'inherit_common_to_bank.yaml', inherit_db, log)
+    account = {'statement_location': str(statements)}
+    monkeypatch.setattr(state, 'BA_DB', {'chk': account, 'exp': account})
+    monkeypatch.setattr(state, 'COMMON_RULES_DB', common_db)
+    monkeypatch.setattr(state, 'INHERIT_RULES_DB', inherit_db)
+    monkeypatch.setattr(state, 'CURRENT_YEAR', YEAR)
+    monkeypatch.setattr(state, 'ACCOUNTS_DIR_PATH', tmp_path / 'accounts')
+    monkeypatch.setattr(state, 'NORMALIZED_DIR_PATH', normalized)
+    monkeypatch.setattr(state, 'PROCESSED_DIR_PATH', processed)
+    return rules_dir, processed
+
+
+def _classified(processed: Path, bank: str):
+    return {(t.date, t.description, t.credit): tuple(getattr(t, k) for k in COMPARED)
+            for t in read_transactions(processed / f'{bank}.csv')}
+
+
+def test_generator_writes_only_extras_without_expand(accounts):
+    rules_dir, _ = accounts
+    extras = yaml.safe_load((rules_dir / 'chk.yaml').read_text())
+    expanded = yaml.safe_load((rules_dir / 'exp.yaml').read_text())
+    assert len(extras) == len(BANK)
+    assert len(expanded) == len(BANK) + len(COMMON)
+
+
+def test_common_rules_keep_generated_precedence(accounts):
+    _, processed = accounts
+    assert not classify.classify_bank('chk').error
+    assert not classify.classify_bank('exp').error
+    got, expected = _classified(processed, 'chk'), _classified(processed, 'exp')
+    assert got == expected
+    # a common rule of an earlier transaction_type wins over a matching bank rule, and ties go to it
+    assert got[('2024-01-04', 'monthly fee', '-12.00')][0] == 'fees'
+    assert got[('2024-01-05', 'rent deposit', '1500.00')][0] == 'rent'
+    assert got[('2024-01-02', 'zelle from joe', '1200.00')][0] == 'rent'
+    assert got[('2024-01-08', 'loan pmt', '-100.00')][0] == 'insurance'
+    assert got[('2024-01-11', 'bagels', '-4.00')][0] == ''
+
+
+def test_expanded_rule_file_is_not_matched_twice(accounts):
+    rules_dir, processed = accounts
+    # a file generated before the common rules were shared, for an account that inherits them
+    (rules_dir / 'chk.yaml').write_bytes((rules_dir / 'exp.yaml').read_bytes())
+    assert not classify.classify_bank('chk').error
+    assert not classify.classify_bank('exp').error
+    assert _classified(processed, 'chk') == _classified(processed, 'exp')
+    assert not any(t.ruleid.startswith(classify.COMMON_RULEID_PREFIX) for t in read_transactions(processed / 'chk.csv'))
+
+
+def _move_fee_rule_first(rule):
+    if rule['pattern_match_logic'] == 'desc_contains=monthly fee':
+        # ahead of every other rule, and of the common 'fees' rule by transaction_type
+        rule['order'] = 0
+        rule['transaction_type'] = 'bank charges'
+
+
+def _retype_repairs_rule(rule):
+    if rule['transaction_type'] == 'repairs':
+        rule['transaction_type'] = 'water'
+        rule['pattern_match_logic'] = 'desc_contains=supplies'
+
+
+@pytest.mark.parametrize('edit', [_move_fee_rule_first, _retype_repairs_rule])
+def test_incremental_reclassify_matches_full_classification(accounts, caplog, edit):
+    rules_dir, processed = accounts
+    assert not classify.classify_bank('chk').error
+    path = rules_dir / 'chk.yaml'
+    previous = yaml.safe_load(path.read_text())
+    edited = [dict(r) for r in previous]
+    for rule in edited:
+        edit(rule)
+    path.write_text(yaml.safe_dump(edited))
+
+    with caplog.at_level(logging.INFO, logger=classify.logger.name):
+        classify.reclassify_after_rule_edit('chk', previous)
+    assert 'Reclassified chk from rule position' in caplog.text
+    incremental = _classified(processed, 'chk')
+    if edit is _move_fee_rule_first:
+        assert incremental[('2024-01-04', 'monthly fee', '-12.00')][0] == 'bank charges'
+
+    assert not classify.classify_bank('chk').error
+    assert _classified(processed, 'chk') == incremental
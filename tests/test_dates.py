@@ -0,0 +1,52 @@
+from datetime import datetime
+
+import pytest
+
+from backend.bank_statement_parser import DateNormalizer, _py_strptime
+
+INPUTS = [
+    '1/5/2024', '01/05/2024', '12/31/2024', '2/29/2024', '2/29/2023', '13/1/2024', '0/1/2024',
+    '2024-01-05', '2024-1-5', '2024-02-30', ' 3/4/2024 ', '05.01.2024', '05-01-2024', '5/1/24',
+    '1/5/02024', '١/٥/٢٠٢٤', '2024/01/05', 'pending', '',
+]
+
+
+def _reference(s, raw_fmt):
+    """The per-row strptime loop DateNormalizer replaces."""
+    ss = s.strip()
+    if not ss:
+        return ''
+    py_fmt = _py_strptime(raw_fmt) if raw_fmt else ''
+    for f in ([py_fmt] if py_fmt else []) + ['%m/%d/%Y', '%-m/%-d/%Y', '%Y-%m-%d']:
+        try:
+            return datetime.strptime(ss, f).strftime('%Y-%m-%d')
+        except Exception:
+            continue
+    return ss
+
+
+@pytest.mark.parametrize('raw_fmt', ['', 'M/d/yyyy', 'MM/dd/yyyy', 'yyyy-MM-dd', 'dd.MM.yyyy', 'dd-MM-yyyy', 'M/d/yy'])
+def test_matches_the_strptime_loop(raw_fmt):
+    dn = DateNormalizer(raw_fmt)
+    for s in INPUTS:
+        assert dn.normalize(s) == _reference(s, raw_fmt), (raw_fmt, s)
+
+
+def test_results_are_memoized_and_bounded():
+    dn = DateNormalizer('', memo_size=2)
+    assert dn.normalize_with_format('1/5/2024') == ('2024-01-05', DateNormalizer.FAST_MDY)
+    assert dn.normalize('1/5/2024') == '2024-01-05'
+    info = dn.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+    for s in ('2024-01-05', 'pending', '1/5/2024'):
+        dn.normalize(s)
+    assert dn.cache_info().currsize == 2
+    assert dn.cache_info().misses == 4
+
+
+def test_format_that_matched_is_reported():
+    dn = DateNormalizer('M/d/yyyy')
+    assert dn.custom_fmt == ''
+    assert dn.normalize_with_format('1/5/2024') == ('2024-01-05', DateNormalizer.FAST_MDY)
+    assert dn.normalize_with_format('2024-01-05') == ('2024-01-05', DateNormalizer.FAST_ISO)
+    assert dn.normalize_with_format('pending') == ('pending', '')
@@ -0,0 +1,38 @@
+import os
+import stat
+
+from backend.core import fileio
+
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_temp_path_is_unique_and_next_to_target(tmp_path):
+    target = tmp_path / 'chk.csv'
+    a, b = fileio.temp_path(target), fileio.temp_path(target)
+    assert a != b
+    assert a.parent == b.parent == tmp_path
+    assert a.name.startswith('chk.csv.') and a.name.endswith('.tmp')
+
+
+def test_temp_path_copies_the_mode_of_an_existing_target(tmp_path):
+    target = tmp_path / 'chk.csv'
+    target.write_text('x')
+    os.chmod(target, 0o640)
+    assert _mode(fileio.temp_path(target)) == 0o640
+
+
+def test_temp_path_uses_the_umask_for_a_new_target(tmp_path, monkeypatch):
+    monkeypatch.setattr(fileio, '_UMASK', 0o027)
+    assert _mode(fileio.temp_path(tmp_path / 'new.csv')) == 0o640
+
+
+def test_read_umask_leaves_the_umask_unchanged(monkeypatch):
+    monkeypatch.setattr(fileio, '_UMASK', None)
+    before = os.umask(0o077)
+    try:
+        assert fileio.read_umask() == 0o077
+        assert os.umask(0o077) == 0o077
+    finally:
+        os.umask(before)
@@ -0,0 +1,108 @@
+import logging
+import os
+
+import pytest
+import yaml
+
+from backend import bank_statement_parser as bsp
+
+YEAR = '2024'
+CFG = {'date_format': 'M/d/yyyy', 'ignore_lines_startswith': ['Date'], 'columns': [{'date': 1, 'description': 2, 'debit': 3}]}
+# No description column: the statement cannot be normalized
+BAD_CFG = {'date_format': 'M/d/yyyy', 'columns': [{'date': 1, 'debit': 3}]}
+LOG = logging.getLogger('test_manifest')
+
+
+class Statements:
+    def __init__(self, root):
+        self.root = root
+        self.normalized = root / 'normalized'
+        self.normalized.mkdir()
+        self.ba_db = {}
+        self.banks = {'good': CFG, 'bad': BAD_CFG}
+
+    def add(self, key, bankname, text):
+        self.ba_db[key] = {'bankname': bankname, 'statement_location': str(self.root / 'stmts')}
+        path = self.source(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+    def source(self, key):
+        return self.root / 'stmts' / YEAR / 'bank_stmts' / f'{key}.csv'
+
+    def run(self):
+        return bsp.process_bank_statements_from_sources(self.ba_db, self.banks, YEAR, self.normalized, LOG)
+
+    def manifest(self):
+        return yaml.safe_load((self.normalized / bsp.MANIFEST_NAME).read_text())['accounts']
+
+
+@pytest.fixture
+def stmts(tmp_path, monkeypatch):
+    calls = {'sha': 0, 'parse': 0}
+    file_sha256, run_account_job = bsp._file_sha256, bsp._run_account_job
+
+    def counting_sha(path):
+        calls['sha'] += 1
+        return file_sha256(path)
+
+    def counting_job(*args):
+        calls['parse'] += 1
+        return run_account_job(*args)
+
+    monkeypatch.setattr(bsp, '_file_sha256', counting_sha)
+    monkeypatch.setattr(bsp, '_run_account_job', counting_job)
+    s = Statements(tmp_path)
+    s.calls = calls
+    s.add('chk', 'good', 'Date,Description,Amount\n1/5/2024,Rent Jan,1500.00\n2/5/2024,Rent Feb,1500.00\n')
+    s.add('empty', 'good', 'Date,Description,Amount\n')
+    s.add('broken', 'bad', '1/5/2024,Rent Jan,1500.00\n')
+    return s
+
+
+def _reset(calls):
+    calls.update(sha=0, parse=0)
+
+
+def test_unchanged_statements_are_skipped_including_failures(stmts):
+    assert stmts.run() == ['chk', 'empty']
+    manifest = stmts.manifest()
+    assert manifest['chk']['rows'] == 2 and 'failed' not in manifest['chk']
+    assert manifest['empty']['rows'] == 0 and 'failed' not in manifest['empty']
+    assert manifest['broken']['rows'] == 0 and manifest['broken']['failed'] is True
+    _reset(stmts.calls)
+    assert stmts.run() == []
+    assert stmts.calls == {'sha': 0, 'parse': 0}
+    assert stmts.manifest() == manifest
+
+
+def test_touched_statement_is_rehashed_but_not_reparsed(stmts):
+    stmts.run()
+    for key in ('chk', 'broken'):
+        st = stmts.source(key).stat()
+        os.utime(stmts.source(key), ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    _reset(stmts.calls)
+    assert stmts.run() == []
+    assert stmts.calls == {'sha': 2, 'parse': 0}
+    assert stmts.manifest()['broken']['failed'] is True
+
+
+def test_changed_statement_or_config_is_renormalized(stmts):
+    stmts.run()
+    stmts.source('chk').write_text('Date,Description,Amount\n1/5/2024,Rent Jan,1500.00\n')
+    _reset(stmts.calls)
+    assert stmts.run() == ['chk']
+    assert stmts.calls['parse'] == 1
+    assert stmts.manifest()['chk']['rows'] == 1
+
+    stmts.banks['bad'] = dict(CFG, ignore_lines_startswith=[])
+    assert stmts.run() == ['broken']
+    entry = stmts.manifest()['broken']
+    assert entry['rows'] == 1 and 'failed' not in entry
+
+
+def test_missing_normalized_output_is_rebuilt(stmts):
+    stmts.run()
+    (stmts.normalized / 'chk.csv').unlink()
+    assert stmts.run() == ['chk']
+    assert (stmts.normalized / 'chk.csv').exists()
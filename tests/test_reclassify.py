@@ -0,0 +1,88 @@
+import logging
+
+import pytest
+import yaml
+
+from backend import classify
+from backend.core.records import read_transactions
+from backend.core.rules import CompiledRuleSet
+
+RULES = [
+    {'order': 1, 'transaction_type': 'rent', 'property': 'oak', 'pattern_match_logic': 'desc_contains=rent oak'},
+    {'order': 2, 'transaction_type': 'rent', 'property': 'elm', 'pattern_match_logic': 'desc_contains=rent'},
+    {'order': 3, 'transaction_type': 'fees', 'pattern_match_logic': 'credit_equals=-12.00'},
+    {'order': 4, 'transaction_type': 'utilities', 'pattern_match_logic': 'desc_startswith=city'},
+]
+ROWS = [
+    ('2024-01-01', 'rent oak jan', '1500.00'), ('2024-01-02', 'rent elm jan', '1400.00'),
+    ('2024-01-03', 'monthly fee', '-12.00'), ('2024-01-04', 'city water', '-80.00'),
+    ('2024-01-05', 'bagels', '-4.00'), ('2024-01-06', 'city rent refund', '20.00'),
+]
+
+
+def _insert_first(rules):
+    return [{'order': 0, 'transaction_type': 'refund', 'pattern_match_logic': 'desc_contains=refund'}] + rules
+
+
+def _change_third(rules):
+    rules[2] = dict(rules[2], pattern_match_logic='desc_contains=fee')
+    return rules
+
+
+def _delete_second(rules):
+    return rules[:1] + rules[2:]
+
+
+def _append_last(rules):
+    return rules + [{'order': 9, 'transaction_type': 'food', 'pattern_match_logic': 'desc_contains=bagels'}]
+
+
+def _usedcount_only(rules):
+    return [dict(r, usedcount=7) for r in rules]
+
+
+def test_first_difference():
+    base = CompiledRuleSet(RULES)
+    assert base.first_difference(CompiledRuleSet([dict(r) for r in RULES])) == len(RULES)
+    assert base.first_difference(CompiledRuleSet(_usedcount_only([dict(r) for r in RULES]))) == len(RULES)
+    assert base.first_difference(CompiledRuleSet(_insert_first([dict(r) for r in RULES]))) == 0
+    assert base.first_difference(CompiledRuleSet(_change_third([dict(r) for r in RULES]))) == 2
+    assert base.first_difference(CompiledRuleSet(_delete_second([dict(r) for r in RULES]))) == 1
+    assert base.first_difference(CompiledRuleSet(_append_last([dict(r) for r in RULES]))) == len(RULES)
+
+
+@pytest.mark.parametrize('edit, start', [
+    (_insert_first, 0), (_change_third, 2), (_delete_second, 1), (_append_last, 4), (_usedcount_only, 4),
+])
+def test_incremental_reclassify_matches_full_classification(year_tree, caplog, edit, start):
+    year_tree.add_account('chk', ROWS, RULES)
+    assert not classify.classify_bank('chk').error
+    path = year_tree.rules_path('chk')
+    previous = yaml.safe_load(path.read_text())
+    path.write_text(yaml.safe_dump(edit([dict(r) for r in previous])))
+
+    with caplog.at_level(logging.INFO, logger=classify.logger.name):
+        res = classify.reclassify_after_rule_edit('chk', previous)
+    assert f'Reclassified chk from rule position {start + 1}' in caplog.text
+    out = year_tree.processed / 'chk.csv'
+    incremental = out.read_bytes()
+
+    assert not classify.classify_bank('chk').error
+    assert out.read_bytes() == incremental
+    assert res.rows == len(ROWS)
+
+
+def test_stale_processed_csv_falls_back_to_full_classification(year_tree, caplog):
+    year_tree.add_account('chk', ROWS, RULES)
+    classify.classify_bank('chk')
+    out = year_tree.processed / 'chk.csv'
+    rows = read_transactions(out)
+    out.write_text(out.read_text() + '\n')  # changed behind the classifier's back
+    path = year_tree.rules_path('chk')
+    path.write_text(yaml.safe_dump(_change_third([dict(r) for r in RULES])))
+
+    with caplog.at_level(logging.INFO, logger=classify.logger.name):
+        classify.reclassify_after_rule_edit('chk', RULES)
+    assert 'is not current; classifying in full' in caplog.text
+    fee = [r for r in read_transactions(out) if r.description == 'monthly fee'][0]
+    assert fee.transaction_type == 'fees' and len(read_transactions(out)) == len(rows)
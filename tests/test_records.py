@@ -0,0 +1,34 @@
+import os
+import stat
+
+import pytest
+
+from backend.core.records import Transaction, read_transactions, write_transactions
+
+
+def _rows():
+    return [Transaction(tr_id='1', date='2024-01-05', description='rent jan', credit='1500')]
+
+
+def test_write_transactions_keeps_mode_and_leaves_no_temp_file(tmp_path):
+    path = tmp_path / 'chk.csv'
+    write_transactions(path, _rows())
+    os.chmod(path, 0o640)
+    write_transactions(path, _rows() * 2)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    assert [r.description for r in read_transactions(path)] == ['rent jan', 'rent jan']
+    assert [p.name for p in tmp_path.iterdir()] == ['chk.csv']
+
+
+def test_failed_write_keeps_the_previous_file(tmp_path):
+    path = tmp_path / 'chk.csv'
+    write_transactions(path, _rows())
+
+    def broken():
+        yield from _rows()
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        write_transactions(path, broken())
+    assert len(read_transactions(path)) == 1
+    assert [p.name for p in tmp_path.iterdir()] == ['chk.csv']
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from backend import aggregate, classify
+from backend.aggregate import PartialAggregates, mark_processed_changed
+from backend.core.records import Transaction, write_transactions
+from backend.routers import renttracker
+
+RULES = [{'order': 1, 'transaction_type': 'rent', 'tax_category': 'rental', 'property': 'oak', 'pattern_match_logic': 'desc_contains=rent'}]
+ROWS = [('2024-01-05', 'rent jan', '1500.00'), ('2024-02-05', 'rent feb', '1450.00')]
+
+
+def _rent_tracker():
+    return asyncio.run(renttracker.get_rent_tracker())
+
+
+@pytest.fixture
+def tracker(year_tree, monkeypatch):
+    monkeypatch.setattr(aggregate, 'PARTIALS', PartialAggregates())
+    monkeypatch.setattr(renttracker, '_VIEW', None)
+    monkeypatch.setattr(aggregate.state, 'SUMMARY_COLUMNAR', False)
+    year_tree.add_account('chk', ROWS, RULES)
+    assert not classify.classify_bank('chk').error
+    return year_tree
+
+
+def test_view_is_reused_until_the_processed_output_changes(tracker):
+    first = _rent_tracker()
+    assert [(r['property'], r['jan'], r['feb']) for r in first] == [('oak', 1500.0, 1450.0)]
+    assert _rent_tracker() is first
+    mark_processed_changed('chk')
+    second = _rent_tracker()
+    assert second is not first and second == first
+
+
+def test_unmarked_write_rebuilds_the_view(tracker):
+    first = _rent_tracker()
+    write_transactions(tracker.processed / 'chk.csv', [Transaction(
+        tr_id='1', date='2024-03-05', description='rent mar', credit='1400', ruleid='1',
+        transaction_type='rent', tax_category='rental', property='oak',
+    )])
+    rows = _rent_tracker()
+    assert rows is not first
+    assert [(r['jan'], r['mar']) for r in rows] == [(0.0, 1400.0)]
+
+
+def test_reclassification_rebuilds_the_view(tracker):
+    _rent_tracker()
+    tracker.rules_path('chk').write_text(tracker.rules_path('chk').read_text().replace('oak', 'elm'))
+    assert not classify.classify_bank('chk').error
+    assert [r['property'] for r in _rent_tracker()] == ['elm']
@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from backend.core.rules import INDEX_MIN_PATTERNS, CompiledRuleSet
+from backend.core.textmatch import AhoCorasick, PrefixTrie
+
+_WORDS = ['ach', 'achme', 'pos', 'zelle', 'zel', 'rent', 'ren', 'hoa', 'city water', 'water', 'fee', 'e', 'amazon mktp']
+
+
+def _linear_position(ruleset, desc, credit, start=0):
+    for pos in range(start, len(ruleset.compiled)):
+        if ruleset.compiled[pos].matches(desc, credit):
+            return pos
+    return len(ruleset.compiled)
+
+
+def _descriptions(rng, n):
+    for _ in range(n):
+        yield ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(1, 4)))
+
+
+def test_automaton_and_trie_find_every_occurrence():
+    items = [(w, i) for i, w in enumerate(_WORDS)]
+    ac, trie = AhoCorasick(items), PrefixTrie(items)
+    for desc in _descriptions(random.Random(1), 500):
+        assert sorted(set(ac.iter_values(desc))) == [i for w, i in items if w in desc]
+        assert sorted(set(trie.iter_values(desc))) == [i for w, i in items if desc.startswith(w)]
+        assert ac.matches(desc) == any(w in desc for w in _WORDS)
+        assert trie.matches(desc) == any(desc.startswith(w) for w in _WORDS)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_desc_indexes_agree_with_linear_scan(seed):
+    rng = random.Random(seed)
+    rules = [
+        {'order': rng.randint(1, 20), 'pattern_match_logic': f'{rng.choice(["desc_contains", "desc_startswith"])}={rng.choice(_WORDS)}'}
+        for _ in range(80)
+    ]
+    ruleset = CompiledRuleSet(rules)
+    assert ruleset._indexed and ruleset._contains is not None and ruleset._starts is not None
+    for desc in _descriptions(rng, 1500):
+        start = rng.choice([0, 0, rng.randrange(len(ruleset))])
+        assert ruleset.first_position(desc, None, '', start) == _linear_position(ruleset, desc, None, start), (desc, start)
+
+
+def test_ties_on_order_keep_file_order():
+    rules = [{'order': 5, 'pattern_match_logic': f'desc_contains=w{i}'} for i in range(INDEX_MIN_PATTERNS)]
+    rules += [{'order': 5, 'pattern_match_logic': 'desc_startswith=w1'}, {'order': 1, 'pattern_match_logic': 'desc_contains=w3'}]
+    ruleset = CompiledRuleSet(rules)
+    assert ruleset._indexed
+    assert ruleset.first_match('w1 w3', None).rule is rules[-1]
+    assert ruleset.first_match('w1 w2', None).rule is rules[1]
+    assert ruleset.first_match('w2 w1', None).rule is rules[1]
+    assert ruleset.first_match('w1 w2', None, start=4).rule is rules[-2]
+    assert ruleset.first_match('nothing', None) is None
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_credit_index_agrees_with_linear_scan(seed):
+    rng = random.Random(seed)
+    amounts = [rng.randint(-500, 500) for _ in range(30)]
+    rules = [
+        {'order': rng.randint(1, 20), 'pattern_match_logic': f'credit_equals={rng.choice(amounts) / 100:.2f}'}
+        for _ in range(60)
+    ]
+    rules += [{'order': 3, 'pattern_match_logic': f'desc_contains={w}'} for w in _WORDS]
+    ruleset = CompiledRuleSet(rules)
+    assert ruleset._indexed and ruleset._credit_cents == sorted(ruleset._credit_cents)
+    for desc in _descriptions(rng, 1500):
+        credit = None if rng.random() < 0.1 else rng.choice(amounts) + rng.randint(-12, 12)
+        start = rng.choice([0, 0, rng.randrange(len(ruleset))])
+        assert ruleset.first_position(desc, credit, '', start) == _linear_position(ruleset, desc, credit, start), \
+            (desc, credit, start)
+
+
+def test_credit_tolerance_window_is_exclusive():
+    rules = [{'order': 1, 'pattern_match_logic': 'credit_equals=-12.00'}, {'order': 2, 'pattern_match_logic': 'credit_equals=-12.00'}]
+    rules += [{'order': 9, 'pattern_match_logic': f'desc_contains=w{i}'} for i in range(INDEX_MIN_PATTERNS)]
+    ruleset = CompiledRuleSet(rules)
+    assert ruleset._indexed and ruleset._credit_pos == [[0, 1]]
+    assert ruleset.first_position('x', -1200) == 0
+    assert ruleset.first_position('x', -1209) == 0
+    assert ruleset.first_position('x', -1191) == 0
+    assert ruleset.first_position('x', -1210) == len(ruleset)
+    assert ruleset.first_position('x', -1190) == len(ruleset)
+    assert ruleset.first_position('x', -1200, start=1) == 1
+    assert ruleset.first_position('x', -1200, start=2) == len(ruleset)
+    assert ruleset.first_position('x', None) == len(ruleset)
@@ -0,0 +1,68 @@
+import pytest
+
+from backend import classify
+from backend.core.rules import RuleMatchMemo, compile_rule_list
+
+RULES = [
+    {'order': 1, 'transaction_type': 'rent', 'pattern_match_logic': 'desc_contains=rent'},
+    {'order': 2, 'transaction_type': 'fees', 'pattern_match_logic': 'credit_equals=-12.00'},
+]
+ROWS = [('2024-01-0%d' % d, desc, credit) for d, (desc, credit) in enumerate(
+    [('rent jan', '1500.00'), ('monthly fee', '-12.00'), ('coffee', '-4.00'), ('rent feb', '1500.00')], 1)]
+
+
+def test_memo_collects_and_merges_new_entries():
+    ruleset = compile_rule_list(RULES)
+    worker = RuleMatchMemo(100)
+    worker.first_position(ruleset, 'before tracking', None)
+    worker.track_new()
+    assert worker.first_position(ruleset, 'rent jan', 150000) == 0
+    assert worker.first_position(ruleset, 'rent jan', 150000) == 0  # a hit adds nothing
+    assert worker.first_position(ruleset, 'coffee', -400) == len(ruleset)
+    new = worker.take_new()
+    assert [pos for _key, pos in new] == [0, len(ruleset)]
+    assert worker.take_new() == []
+
+    parent = RuleMatchMemo(100)
+    assert parent.merge(new) == 2
+    assert parent.first_position(ruleset, 'rent jan', 150000) == 0
+    assert parent.stats()['hits'] == 1
+
+
+def test_memo_merge_keeps_maxsize():
+    ruleset = compile_rule_list(RULES)
+    worker = RuleMatchMemo(100)
+    worker.track_new()
+    for i in range(10):
+        worker.first_position(ruleset, f'desc {i}', None)
+    parent = RuleMatchMemo(4)
+    parent.merge(worker.take_new())
+    assert len(parent) == 4
+
+
+def test_memo_save_and_load_round_trip(tmp_path):
+    ruleset = compile_rule_list(RULES)
+    memo = RuleMatchMemo(100)
+    for desc, credit in (('rent jan', 150000), ('monthly fee', -1200), ('coffee', -400)):
+        memo.first_position(ruleset, desc, credit)
+    path = tmp_path / 'rule_stats' / 'rule_memo.csv'
+    memo.save(path)
+    assert [p.name for p in path.parent.iterdir()] == ['rule_memo.csv']
+    loaded = RuleMatchMemo(100)
+    assert loaded.load(path) == 3
+    assert loaded.first_position(ruleset, 'monthly fee', -1200) == 1
+    assert loaded.stats()['hits'] == 1
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_classify_all_keeps_worker_memo_entries(year_tree, monkeypatch, caplog, workers):
+    monkeypatch.setattr(classify, 'RULE_MEMO', RuleMatchMemo(1000))
+    monkeypatch.setattr(classify.state, 'RULE_MEMO_SIZE', 1000)
+    year_tree.add_account('chk', ROWS, RULES)
+    year_tree.add_account('sav', ROWS[:2], RULES)
+    results = classify.classify_all(workers=workers)
+    assert 'falling back to serial' not in caplog.text
+    assert not any(r.error for r in results.values())
+    assert all(r.memo_entries is None for r in results.values())
+    # three distinct (description, credit bucket) pairs per ruleset; both accounts share the ruleset
+    assert len(classify.RULE_MEMO) == 4
@@ -0,0 +1,39 @@
+import yaml
+
+from backend import classify
+from backend.core.rule_stats import load_rule_stats, rule_key, save_year_stats, stats_path, usage_for
+
+RULES = [
+    {'order': 1, 'transaction_type': 'rent', 'property': 'oak', 'pattern_match_logic': 'desc_contains=rent'},
+    {'order': 2, 'transaction_type': 'rent', 'property': 'elm', 'pattern_match_logic': 'desc_contains=RENT'},
+    {'order': 3, 'transaction_type': 'fees', 'pattern_match_logic': 'credit_equals=-12.00'},
+]
+ROWS = [('2024-01-05', 'rent jan', '1500.00'), ('2024-02-05', 'rent feb', '1500.00'), ('2024-02-09', 'fee', '-12.00')]
+
+
+def test_rules_sharing_a_pattern_are_counted_separately(year_tree):
+    year_tree.add_account('chk', ROWS, RULES)
+    classify.classify_bank('chk')
+    stats = load_rule_stats(stats_path(year_tree.accounts, 'chk'))
+    usage = [usage_for(stats, rule, '2024') for rule in RULES]
+    assert [u['usedcount'] for u in usage] == [2, 0, 1]
+    assert usage[0]['last_matched'] == '2024-02-05'
+    assert usage[1]['last_matched'] == ''
+
+
+def test_pattern_keyed_stats_are_read_as_a_fallback(tmp_path):
+    path = tmp_path / 'chk.yaml'
+    path.write_text(yaml.safe_dump({'desc_contains=rent': {'2023': {'hits': 4, 'last_matched': '2023-12-05'}}}))
+    stats = load_rule_stats(path)
+    assert usage_for(stats, RULES[1], '2023')['usedcount'] == 4
+    save_year_stats(path, '2024', [(rule_key(RULES[1]), 1, '2024-01-05')])
+    stats = load_rule_stats(path)
+    assert usage_for(stats, RULES[1], '2024')['usedcount_by_year'] == {'2024': 1}
+    assert usage_for(stats, RULES[0], '2023')['usedcount'] == 4
+
+
+def test_save_year_stats_leaves_no_temp_file(tmp_path):
+    path = tmp_path / 'rule_stats' / 'chk.yaml'
+    assert save_year_stats(path, '2024', [(rule_key(RULES[0]), 2, '2024-02-05')])
+    assert not save_year_stats(path, '2024', [(rule_key(RULES[0]), 2, '2024-02-05')])
+    assert [p.name for p in path.parent.iterdir()] == ['chk.yaml']
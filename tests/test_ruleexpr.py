@@ -0,0 +1,252 @@
+import random
+
+import pytest
+
+from backend.core.ruleexpr import (
+    CREDIT_TOLERANCE_CENTS,
+    And,
+    Not,
+    Or,
+    Pred,
+    compile_expression,
+    parse_expression,
+    required_literals,
+)
+from backend.core.rules import INDEX_MIN_PATTERNS, CompiledRule, CompiledRuleSet
+
+
+def _eval(text, desc='', credit=None, date=''):
+    node = parse_expression(text)
+    assert node is not None, text
+    return compile_expression(node)(desc, credit, date)
+
+
+# --- parsing ---------------------------------------------------------------
+
+def test_precedence_not_and_or():
+    node = parse_expression('desc_contains="a" or desc_contains="b" and not desc_contains="c"')
+    assert node == Or((
+        Pred('desc_contains', 'a'),
+        And((Pred('desc_contains', 'b'), Not(Pred('desc_contains', 'c')))),
+    ))
+
+
+def test_parentheses_override_precedence():
+    node = parse_expression('(desc_contains="a" OR desc_contains="b") AND desc_contains="c"')
+    assert node == And((
+        Or((Pred('desc_contains', 'a'), Pred('desc_contains', 'b'))),
+        Pred('desc_contains', 'c'),
+    ))
+
+
+def test_keywords_and_fields_are_case_insensitive():
+    assert parse_expression('DESC_CONTAINS="x" And NoT desc_contains="y"') == And((
+        Pred('desc_contains', 'x'), Not(Pred('desc_contains', 'y')),
+    ))
+
+
+def test_string_quotes_and_escapes():
+    assert parse_expression("desc_contains='joe''s'") is None
+    assert parse_expression(r"desc_contains='joe\'s'") == Pred('desc_contains', "joe's")
+    assert parse_expression(r'desc_contains="say \"hi\""') == Pred('desc_contains', 'say "hi"')
+    assert parse_expression(r'desc_contains="a\\b"') == Pred('desc_contains', 'a\\b')
+    # desc_contains/desc_startswith values are lowercased, regexes kept as written
+    assert parse_expression('desc_startswith="ZELLE From"') == Pred('desc_startswith', 'zelle from')
+    assert parse_expression('desc_regex="A\\d+"') == Pred('desc_regex', 'A\\d+')
+
+
+def test_amounts_parse_to_cents():
+    assert parse_expression('credit_equals=-1234.56') == Pred('credit_equals', -123456)
+    assert parse_expression('credit_equals=.5') == Pred('credit_equals', 50)
+    assert parse_expression('credit_between=-2000..') == Pred('credit_between', (-200000, None))
+    assert parse_expression('credit_between=..15') == Pred('credit_between', (None, 1500))
+
+
+@pytest.mark.parametrize('text', [
+    '',
+    '   ',
+    'desc_contains=amazon',                      # unquoted string
+    'desc_contains="a" and',                     # dangling operator
+    '(desc_contains="a"',                        # unbalanced parenthesis
+    'desc_contains="a" desc_contains="b"',       # missing operator
+    'desc_regex="("',                            # invalid regex
+    'credit_between=..',                         # no bounds
+    'date_between=2024-01-01..12-31',            # mixed date forms
+    'date_between=12-15..',                      # MM-DD window needs both bounds
+    'amount_equals=5',                           # unknown predicate
+    'desc_contains="a" & desc_contains="b"',     # unknown character
+])
+def test_invalid_expressions_are_not_expressions(text):
+    assert parse_expression(text) is None
+
+
+# --- evaluation ------------------------------------------------------------
+
+def test_string_predicates():
+    assert _eval('desc_contains="amazon"', 'pos amazon mktp')
+    assert not _eval('desc_contains="amazon"', 'pos amzn mktp')
+    assert _eval('desc_startswith="zelle"', 'zelle from joe')
+    assert not _eval('desc_startswith="zelle"', 'to zelle')
+    assert _eval('desc_regex="ref(und)?\\s*#\\d+"', 'amazon REFUND #12')
+    assert not _eval('desc_regex="^refund"', 'amazon refund')
+
+
+def test_not_and_or_short_circuit_like_python():
+    text = 'desc_contains="amazon" AND NOT desc_regex="refund|return"'
+    assert _eval(text, 'amazon order')
+    assert not _eval(text, 'amazon return')
+    assert not _eval(text, 'walmart order')
+    text = '(credit_between=-2000..-1500 OR credit_equals=-1234.56) AND desc_contains="rent"'
+    assert _eval(text, 'rent', -175000)
+    assert _eval(text, 'rent', -123456)
+    assert not _eval(text, 'rent', -100000)
+    assert not _eval(text, 'rent', None)
+    assert not _eval(text, 'fee', -175000)
+
+
+def test_credit_equals_tolerance():
+    exact = -123456
+    assert _eval('credit_equals=-1234.56', credit=exact)
+    assert _eval('credit_equals=-1234.56', credit=exact + CREDIT_TOLERANCE_CENTS - 1)
+    assert _eval('credit_equals=-1234.56', credit=exact - CREDIT_TOLERANCE_CENTS + 1)
+    assert not _eval('credit_equals=-1234.56', credit=exact + CREDIT_TOLERANCE_CENTS)
+    assert not _eval('credit_equals=-1234.56', credit=None)
+
+
+def test_credit_between_bounds_are_inclusive_and_may_be_open():
+    assert _eval('credit_between=10..20', credit=1000)
+    assert _eval('credit_between=10..20', credit=2000)
+    assert not _eval('credit_between=10..20', credit=2001)
+    assert _eval('credit_between=..0', credit=-5)
+    assert not _eval('credit_between=..0', credit=1)
+    assert _eval('credit_between=100..', credit=10000)
+    assert not _eval('credit_between=100..', credit=9999)
+
+
+def test_full_date_window():
+    text = 'date_between=2024-01-01..2024-06-30'
+    assert _eval(text, date='2024-01-01')
+    assert _eval(text, date='2024-06-30')
+    assert not _eval(text, date='2024-07-01')
+    assert not _eval(text, date='')
+    assert _eval('date_between=..2024-03-31', date='2023-12-31')
+    assert not _eval('date_between=2024-04-01..', date='2024-03-31')
+
+
+def test_month_day_window_repeats_every_year():
+    text = 'date_between=03-01..03-31'
+    assert _eval(text, date='2023-03-15')
+    assert _eval(text, date='2024-03-31')
+    assert not _eval(text, date='2024-04-01')
+
+
+def test_month_day_window_wraps_past_new_year():
+    text = 'date_between=12-15..01-15'
+    for date in ('2024-12-15', '2024-12-31', '2025-01-01', '2025-01-15'):
+        assert _eval(text, date=date), date
+    for date in ('2024-12-14', '2025-01-16', '2024-06-30', ''):
+        assert not _eval(text, date=date), date
+
+
+# --- required literals -----------------------------------------------------
+
+def test_required_literals():
+    assert required_literals(parse_expression('desc_contains="a" AND credit_equals=5')) == [('contains', 'a')]
+    assert required_literals(parse_expression(
+        'desc_startswith="x" OR desc_contains="y"')) == [('startswith', 'x'), ('contains', 'y')]
+    # the narrower alternative of an AND is enough
+    assert required_literals(parse_expression(
+        '(desc_contains="a" OR desc_contains="b") AND desc_contains="c"')) == [('contains', 'c')]
+    assert required_literals(parse_expression('desc_contains="a" OR credit_equals=5')) is None
+    assert required_literals(parse_expression('NOT desc_contains="a"')) is None
+    assert required_literals(parse_expression('desc_regex="a"')) is None
+
+
+# --- legacy pattern_match_logic --------------------------------------------
+
+def test_legacy_pattern_falls_back_to_literal_predicates():
+    cr = CompiledRule({'pattern_match_logic': 'desc_contains=Joe\'s Pizza & Co'})
+    assert cr.expr is None
+    assert cr.contains == "joe's pizza & co"
+    assert cr.matches("pos joe's pizza & co", None)
+    cr = CompiledRule({'pattern_match_logic': 'credit_equals=-45.10'})
+    assert cr.expr is None and cr.credit_cents == -4510
+    assert cr.matches('anything', -4505)
+    assert not cr.matches('anything', -4520)
+
+
+def test_quoted_legacy_predicate_matches_the_quotes():
+    cr = CompiledRule({'pattern_match_logic': 'desc_contains="foo"'})
+    assert cr.expr is None and cr.contains == '"foo"'
+    assert cr.matches('ach "foo" llc', None)
+    assert not cr.matches('ach foo llc', None)
+    cr = CompiledRule({'pattern_match_logic': "desc_startswith='ZELLE from'"})
+    assert cr.expr is None and cr.startswith == "'zelle from'"
+
+
+def test_expression_syntax_takes_the_expression_path():
+    cr = CompiledRule({'pattern_match_logic': '(desc_startswith="ZELLE from")'})
+    assert cr.expr is None and cr.startswith == 'zelle from'
+    cr = CompiledRule({'pattern_match_logic': 'desc_contains="foo" AND credit_equals=5'})
+    assert cr.expr is not None
+    assert cr.matches('ach foo llc', 500)
+    cr = CompiledRule({'pattern_match_logic': 'desc_regex="^ach"'})
+    assert cr.expr is not None and cr.matches('ach foo', None)
+
+
+# --- indexed vs linear scan ------------------------------------------------
+
+_WORDS = ['amazon', 'zelle', 'rent', 'from', 'joe', 'pizza', 'refund', 'water', 'city',
+          'hoa', 'fee', 'deposit', 'transfer', 'mktp', 'pos', 'ach', 'payroll', 'tax']
+
+
+def _random_pattern(rng):
+    kind = rng.randrange(7)
+    word = rng.choice(_WORDS)
+    if kind == 0:
+        return f'(desc_contains="{word}")'
+    if kind == 1:
+        return f'desc_startswith={word} {rng.choice(_WORDS)}'
+    if kind == 2:
+        return f'credit_equals={rng.randint(-300, 300) / 10:.2f}'
+    if kind == 3:
+        return f'desc_contains={word} {rng.choice(_WORDS)}'
+    if kind == 4:
+        return f'desc_contains="{word}" AND NOT desc_contains="{rng.choice(_WORDS)}"'
+    if kind == 5:
+        return f'desc_startswith="{word}" OR credit_between={rng.randint(-30, 0)}..{rng.randint(0, 30)}'
+    return f'date_between=12-{rng.randint(10, 31):02d}..01-{rng.randint(1, 20):02d} AND credit_between=..0'
+
+
+def _linear_position(ruleset, desc, credit, date, start):
+    for pos in range(start, len(ruleset.compiled)):
+        if ruleset.compiled[pos].matches(desc, credit, date):
+            return pos
+    return len(ruleset.compiled)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_indexed_scan_agrees_with_linear_scan(seed):
+    rng = random.Random(seed)
+    rules = [
+        {'order': rng.randint(1, 40), 'pattern_match_logic': _random_pattern(rng)}
+        for _ in range(120)
+    ]
+    ruleset = CompiledRuleSet(rules)
+    assert ruleset._indexed
+    for _ in range(2000):
+        desc = ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(1, 4)))
+        credit = None if rng.random() < 0.1 else rng.randint(-4000, 4000)
+        date = rng.choice(['', '2024-12-20', '2025-01-05', '2024-06-01'])
+        start = rng.choice([0, 0, rng.randrange(len(ruleset))])
+        assert ruleset.first_position(desc, credit, date, start) == \
+            _linear_position(ruleset, desc, credit, date, start), (desc, credit, date, start)
+
+
+def test_small_ruleset_is_not_indexed():
+    rules = [{'order': i, 'pattern_match_logic': f'desc_contains=w{i}'} for i in range(INDEX_MIN_PATTERNS - 1)]
+    ruleset = CompiledRuleSet(rules)
+    assert not ruleset._indexed
+    assert ruleset.first_position('w3 w1', None) == 1
+    assert ruleset.first_position('w3 w1', None, start=2) == 3
+    assert ruleset.first_position('none', None) == len(ruleset)
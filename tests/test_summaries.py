@@ -0,0 +1,159 @@
+import os
+
+import pytest
+import yaml
+
+from backend import aggregate, property_sum, summaries
+from backend.company_sum import prepare_and_save_company_sum
+from backend.aggregate import PartialAggregates, SummaryAggregates, add_rows
+from backend.core.records import Transaction, read_transactions, write_transactions
+
+
+def _rental(tr_id, credit, **fields):
+    return Transaction(
+        tr_id=tr_id, date='2024-03-01', description=f'row {tr_id}', credit=credit,
+        transaction_type='rent', tax_category='rental', **fields,
+    )
+
+
+@pytest.fixture
+def groups(monkeypatch):
+    monkeypatch.setattr(property_sum.state, 'GROUP_DB', {'trio': {'propertylist': ['P1', 'p2', 'p3']}})
+    monkeypatch.setattr(property_sum.state, 'SUMMARY_COLUMNAR', False)
+
+
+def test_group_credit_is_split_to_the_cent(groups):
+    agg = SummaryAggregates()
+    # the leftover cent goes to share int(tr_id, 16) % 3
+    add_rows(agg, 'chk', [_rental('a0', '100.00', group='trio'), _rental('a2', '-0.02', group='trio')])
+    assert agg.rental == {'p1': {'rent': 3333}, 'p2': {'rent': 3333}, 'p3': {'rent': 3332}}
+    add_rows(agg, 'chk', [_rental('01', '100.00', group='trio')])
+    assert agg.rental['p2'] == {'rent': 6667}
+    assert sum(t['rent'] for t in agg.rental.values()) == 20000 - 2
+    assert [r['credit'] for r in agg.reverse['p2']['rent']] == [33.34, -0.01, 33.34]
+    assert agg.rent_months['p1'] == {3: 6666}
+
+
+def test_reverse_files_are_rewritten_only_when_their_content_changes(year_tree, groups, monkeypatch):
+    monkeypatch.setattr(property_sum.state, 'DB', {})
+    monkeypatch.setattr(property_sum.state, 'COMP_DB', {})
+    monkeypatch.setattr(property_sum, '_WRITTEN_REVERSE', {})
+    rev = year_tree.accounts / '2024' / 'rentalsummary_reverse' / 'p1.yaml'
+
+    def summarize(*rows):
+        agg = SummaryAggregates()
+        add_rows(agg, 'chk', list(rows))
+        property_sum.prepare_and_save_property_sum(agg)
+        return agg
+
+    agg = summarize(_rental('01', '10.00', property='p1'))
+    os.utime(rev, ns=(0, 0))
+    summarize(_rental('01', '10.00', property='p1'))
+    assert rev.stat().st_mtime_ns == 0
+    # same object, changed in place
+    agg.reverse['p1']['rent'][0]['credit'] = 12.0
+    property_sum.prepare_and_save_property_sum(agg)
+    assert rev.stat().st_mtime_ns != 0
+    assert 'credit: 12.0' in rev.read_text()
+    rev.unlink()
+    summarize(_rental('01', '10.00', property='p1'))
+    assert 'credit: 10.0' in rev.read_text()
+
+
+# --- per-account partial aggregates ------------------------------------------
+
+def _processed_rows(ba, n, scale=1):
+    rows = []
+    for i in range(n):
+        rows.append(Transaction(
+            tr_id=f'{i:x}', date=f'2024-{i % 12 + 1:02d}-03', description=f'{ba} row {i}',
+            credit=f'{(i + 1) * scale * 10.01:.2f}', transaction_type=('rent', 'repairs', 'utilities')[i % 3],
+            tax_category='rental', company=('apex' if i % 2 else ''),
+            **({'group': 'trio'} if i % 4 == 0 else {'property': ('p1', 'p2')[i % 2]}),
+        ))
+    return rows
+
+
+def _full_scan(processed, accounts):
+    agg = SummaryAggregates()
+    for ba in accounts:
+        add_rows(agg, ba, read_transactions(processed / f'{ba}.csv'))
+    return agg
+
+
+@pytest.fixture
+def partials(year_tree, groups):
+    for ba, n in (('chk', 9), ('sav', 5)):
+        write_transactions(year_tree.processed / f'{ba}.csv', _processed_rows(ba, n))
+    return PartialAggregates()
+
+
+def test_partials_match_a_full_scan_and_reread_only_changed_accounts(partials, year_tree):
+    processed = year_tree.processed
+    accounts = ['chk', 'sav']
+    assert partials.refresh(processed, accounts) == _full_scan(processed, accounts)
+    assert partials._reads == 2
+    assert partials.refresh(processed, accounts) == _full_scan(processed, accounts)
+    assert partials._reads == 0
+
+    write_transactions(processed / 'sav.csv', _processed_rows('sav', 7, scale=3))
+    assert partials.refresh(processed, accounts) == _full_scan(processed, accounts)
+    assert partials._reads == 1
+
+    # same content, new mtime: the digest matches and nothing is re-read
+    st = (processed / 'chk.csv').stat()
+    os.utime(processed / 'chk.csv', ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    partials.refresh(processed, accounts)
+    assert partials._reads == 0
+
+
+def test_removed_account_and_reordering(partials, year_tree):
+    processed = year_tree.processed
+    partials.refresh(processed, ['chk', 'sav'])
+    assert partials.refresh(processed, ['chk']) == _full_scan(processed, ['chk'])
+    assert partials._reads == 0
+    agg = partials.refresh(processed, ['sav', 'chk'])
+    assert agg == _full_scan(processed, ['sav', 'chk'])
+    # reverse entries follow account order
+    assert agg.reverse['p1']['rent'][0]['bankaccountname'] == 'sav'
+
+
+def test_partials_survive_a_restart_and_follow_group_changes(partials, year_tree, monkeypatch):
+    processed = year_tree.processed
+    partials.refresh(processed, ['chk', 'sav'])
+    restarted = PartialAggregates()
+    assert restarted.refresh(processed, ['chk', 'sav']) == _full_scan(processed, ['chk', 'sav'])
+    assert restarted._reads == 0
+
+    monkeypatch.setattr(property_sum.state, 'GROUP_DB', {'trio': {'propertylist': ['p1', 'p4']}})
+    agg = restarted.refresh(processed, ['chk', 'sav'])
+    assert restarted._reads == 2
+    assert agg == _full_scan(processed, ['chk', 'sav'])
+    assert 'p3' not in agg.rental
+
+
+# --- property -> company summary handoff -------------------------------------
+
+def _read_yaml_dir(path):
+    return {p.stem: yaml.safe_load(p.read_text()) for p in sorted(path.glob('*.yaml'))}
+
+
+def test_company_summary_from_the_handoff_matches_the_written_rental_summary(partials, year_tree, monkeypatch):
+    monkeypatch.setattr(property_sum.state, 'DB', {
+        'p1': {'propMgmtComp': 'Apex', 'cost': 100000, 'purchaseDate': '2024-07-01'},
+        'p2': {'propMgmtComp': 'apex'},
+        'p3': {'propMgmtComp': 'birch'},
+    })
+    monkeypatch.setattr(property_sum.state, 'COMP_DB', {'apex': {'rentPercentage': 8}, 'birch': {'rentPercentage': 10}})
+    monkeypatch.setattr(property_sum, '_WRITTEN_REVERSE', {})
+    monkeypatch.setattr(aggregate, 'PARTIALS', partials)
+    monkeypatch.setattr(aggregate.state, 'BA_DB', {'chk': {}, 'sav': {}})
+    summaries.prepare_and_save_summaries()
+    year_dir = year_tree.accounts / '2024'
+    handed_off = _read_yaml_dir(year_dir / 'companysummary')
+    assert set(handed_off) == {'apex', 'birch'}
+    assert handed_off['birch']['rentpassedtoowners'] < 0
+
+    # what the company summary computed when it read rentalsummary/*.yaml back
+    prepare_and_save_company_sum(aggregate.aggregate_processed(), _read_yaml_dir(year_dir / 'rentalsummary'))
+    assert _read_yaml_dir(year_dir / 'companysummary') == handed_off
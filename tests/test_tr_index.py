@@ -0,0 +1,94 @@
+import csv
+import logging
+
+import pytest
+
+from backend import tr_index
+from backend.tr_index import SOURCE_ADDENDUM, SOURCE_NORMALIZED, TrIdIndex
+
+ROWS = [('2024-01-05', 'rent jan', '1500'), ('2024-02-05', 'rent feb', '1500'), ('2024-02-09', 'fee', '-12')]
+
+
+@pytest.fixture
+def index(year_tree, monkeypatch):
+    year_tree.add_account('chk', ROWS)
+    year_tree.add_account('sav', ROWS[:1])
+    scans = []
+    scan_source = TrIdIndex._scan_source
+
+    def counting_scan(self, key, path):
+        scans.append(key)
+        return scan_source(self, key, path)
+
+    monkeypatch.setattr(TrIdIndex, '_scan_source', counting_scan)
+    idx = TrIdIndex(year_tree.accounts / '2024' / tr_index.INDEX_DIR_NAME)
+    idx.scans = scans
+    return idx
+
+
+def _addendum(year_tree, bank):
+    path = year_tree.statements / '2024' / 'addendum' / f'{bank}.csv'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _append_row(path, tr_id):
+    with path.open('ab') as f:
+        offset = f.tell()
+        f.write(f'{tr_id},2024-03-01,late fee,-5\r\n'.encode('utf-8'))
+    return offset
+
+
+def test_offsets_point_at_the_rows(index, year_tree):
+    ids = index.ids('chk', SOURCE_NORMALIZED)
+    assert sorted(ids) == ['chk-1', 'chk-2', 'chk-3']
+    data = (year_tree.normalized / 'chk.csv').read_bytes()
+    for tid, offset in index._ids[('chk', SOURCE_NORMALIZED)].items():
+        assert data[offset:].startswith(tid.encode())
+    assert index.contains('chk-2', 'chk', SOURCE_NORMALIZED)
+    assert not index.contains('chk-2', 'chk', SOURCE_ADDENDUM)
+
+
+def test_append_updates_the_index_without_a_rescan(index, year_tree):
+    path = _addendum(year_tree, 'chk')
+    path.write_text('tr_id,date,description,credit\r\nadd-1,2024-03-01,late fee,-5\r\n')
+    assert index.ids('chk', SOURCE_ADDENDUM) == {'add-1'}
+    assert index.scans == [('chk', SOURCE_ADDENDUM)]
+    index.append('chk', SOURCE_ADDENDUM, 'add-2', _append_row(path, 'add-2'))
+    assert index.contains('add-2', 'chk', SOURCE_ADDENDUM)
+    assert index.scans == [('chk', SOURCE_ADDENDUM)]
+    # a fresh instance reads the index file written by append
+    fresh = TrIdIndex(index.index_dir)
+    assert fresh.ids('chk', SOURCE_ADDENDUM) == {'add-1', 'add-2'}
+    assert index.scans == [('chk', SOURCE_ADDENDUM)]
+    with (index.index_dir / 'chk.addendum.csv').open(newline='') as f:
+        offsets = {row['tr_id']: int(row['offset']) for row in csv.DictReader(f)}
+    assert path.read_bytes()[offsets['add-2']:].startswith(b'add-2,')
+
+
+def test_append_to_an_unloaded_source_leaves_it_to_the_next_query(index, year_tree):
+    path = _addendum(year_tree, 'sav')
+    path.write_text('tr_id,date,description,credit\r\n')
+    index.append('sav', SOURCE_ADDENDUM, 'add-1', _append_row(path, 'add-1'))
+    assert index.scans == []
+    assert index.contains('add-1', 'sav', SOURCE_ADDENDUM)
+    assert index.scans == [('sav', SOURCE_ADDENDUM)]
+
+
+def test_external_change_is_rescanned(index, year_tree):
+    assert len(index.ids('chk', SOURCE_NORMALIZED)) == 3
+    year_tree.add_account('chk', ROWS[:2])
+    assert index.ids('chk', SOURCE_NORMALIZED) == {'chk-1', 'chk-2'}
+    assert index.scans == [('chk', SOURCE_NORMALIZED)] * 2
+
+
+def test_collisions_across_accounts_and_within_a_file(index, year_tree, caplog):
+    norm = year_tree.normalized / 'sav.csv'
+    norm.write_text('tr_id,date,description,credit\nchk-1,2024-01-05,rent jan,1500\nsav-2,2024-01-06,x,1\nsav-2,2024-01-07,y,2\n')
+    with caplog.at_level(logging.WARNING):
+        index.refresh_all()
+    assert index.collisions() == {'chk-1': [('chk', SOURCE_NORMALIZED), ('sav', SOURCE_NORMALIZED)]}
+    assert 'sav-2 repeated in sav/normalized' in caplog.text
+    assert 'tr_id collision: chk-1 appears in chk/normalized, sav/normalized' in caplog.text
+    offset = index._ids[('sav', SOURCE_NORMALIZED)]['sav-2']
+    assert norm.read_bytes()[offset:].startswith(b'sav-2,2024-01-06')